@@ -0,0 +1,94 @@
+"""
+Аналитика корпуса статей без Elasticsearch: объемы по разделам и месяцам, доля статей
+с компаниями, людьми, суммами и другими полями, самые частые значения, суммы по валютам
+
+Использование:
+    python analyze_corpus.py rb_articles.parquet
+    python analyze_corpus.py rb_articles.jsonl --top 10
+    python analyze_corpus.py rb_articles.parquet --json rb_report.json
+    python analyze_corpus.py rb_articles.parquet --no-cache
+
+Корпус: Parquet (быстрее всего - читаются только нужные колонки), JSON массив или поток
+JSON Lines. Повторный запуск по тому же файлу берет отчет из кэша rb_analytics_cache.
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Dict
+
+from scraper.analytics import analyze, COVERAGE_FIELDS
+from scraper.config import ANALYTICS_CACHE_DIR, ANALYTICS_TOP_N
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def format_amount(value: float) -> str:
+    for factor, suffix in ((1e12, ' трлн'), (1e9, ' млрд'), (1e6, ' млн'), (1e3, ' тыс')):
+        if value >= factor:
+            return f'{value / factor:.4g}{suffix}'
+    return f'{value:.4g}'
+
+
+def print_report(report: Dict):
+    total = report['articles']
+    print(f"\nСтатей: {total}")
+
+    print("\nПо разделам:")
+    for section, count in report['sections'].items():
+        print(f"  {section:<16} {count:>7} ({count / total:.1%})")
+
+    print("\nПо месяцам:")
+    for month, count in report['months'].items():
+        print(f"  {month:<16} {count:>7}")
+
+    sections = list(report['sections'])
+    print("\nДоля статей с полем:")
+    print(f"  {'':<12} {'все':>7}" + ''.join(f" {section[:13]:>13}" for section in sections))
+    for field in COVERAGE_FIELDS:
+        rates = report['coverage'][field]
+        print(f"  {field:<12} {rates['all']:>7.1%}"
+              + ''.join(f" {rates.get(section, 0.0):>13.1%}" for section in sections))
+
+    for field, top in report['top'].items():
+        print(f"\nТоп {field} (разных {top['distinct']}, упоминаний {top['mentions']}):")
+        for value, count in top['values']:
+            print(f"  {count:>7}  {value}")
+
+    print("\nСуммы (в единицах валюты):")
+    print(f"  {'валюта':<7} {'множ.':<6} {'кол-во':>7} {'мин':>10} {'медиана':>10} {'p90':>10} "
+          f"{'макс':>10} {'итого':>10}")
+    for row in report['money']:
+        print(f"  {row['currency']:<7} {row['multiplier'] or 'все':<6} {row['count']:>7} "
+              f"{format_amount(row['min']):>10} {format_amount(row['p50']):>10} {format_amount(row['p90']):>10} "
+              f"{format_amount(row['max']):>10} {format_amount(row['total']):>10}")
+        if 'orders' in row:
+            print(f"  {'':<7} порядки: " + ', '.join(f"{order}: {count}" for order, count in row['orders'].items()))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Аналитика корпуса статей (Parquet, JSON, JSON Lines)')
+    parser.add_argument('corpus', help='файл корпуса: .parquet, .json или .jsonl[.gz|.zst]')
+    parser.add_argument('--top', type=int, default=ANALYTICS_TOP_N, help='длина списков самых частых значений')
+    parser.add_argument('--json', help='сохранить отчет в JSON файл')
+    parser.add_argument('--cache-dir', default=ANALYTICS_CACHE_DIR, help='каталог кэша отчетов')
+    parser.add_argument('--no-cache', action='store_true', help='считать заново, не читая и не записывая кэш')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = analyze(args.corpus, args.top, None if args.no_cache else args.cache_dir)
+    elapsed = time.perf_counter() - start
+
+    print_report(report)
+    print(f"\nОтчет {'из кэша' if report['cached'] else 'посчитан'} за {elapsed:.2f} с")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчет сохранен в {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
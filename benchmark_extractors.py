@@ -0,0 +1,125 @@
+"""
+Замер времени извлечения денег, компаний и людей из текстов статей:
+текущий DataExtractor против версии из другой ревизии git (или файла)
+
+Использование:
+    python benchmark_extractors.py rb_articles.json
+    python benchmark_extractors.py rb_articles.jsonl.gz --baseline HEAD~1
+    python benchmark_extractors.py saved_texts/ --baseline old_extractors.py --repeat 5
+
+Корпус: JSON массив статей, поток JSON Lines (.jsonl/.jsonl.gz/.jsonl.zst)
+или каталог с *.txt (один текст на файл).
+"""
+
+import sys
+import json
+import time
+import types
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+from scraper.extractors import DataExtractor
+from scraper.storage import ArticleSink
+
+EXTRACTORS_PATH = 'scraper/extractors.py'
+FIELDS = ('money', 'companies', 'people')
+
+
+def load_texts(corpus: str) -> List[str]:
+    """Тексты для извлечения (как в парсере: текст + описание + заголовок)"""
+    path = Path(corpus)
+    if path.is_dir():
+        return [p.read_text(encoding='utf-8') for p in sorted(path.glob('*.txt'))]
+    if path.suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            articles = json.load(f)
+    else:
+        articles = ArticleSink.read(str(path))
+    return [f"{a.get('text', '')} {a.get('description', '')} {a.get('title', '')}" for a in articles]
+
+
+def load_baseline(source: str):
+    """DataExtractor из файла или из ревизии git (относительные импорты - из текущего пакета)"""
+    if Path(source).is_file():
+        code = Path(source).read_text(encoding='utf-8')
+    else:
+        code = subprocess.run(['git', 'show', f'{source}:{EXTRACTORS_PATH}'],
+                              capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType('scraper._baseline_extractors')
+    module.__package__ = 'scraper'
+    exec(compile(code, f'{source}:{EXTRACTORS_PATH}', 'exec'), module.__dict__)
+    return module.DataExtractor
+
+
+def extract(extractor, text: str) -> Dict[str, List]:
+    if hasattr(extractor, 'extract_all'):
+        return extractor.extract_all(text)
+    return {
+        'money': extractor.extract_money(text),
+        'companies': extractor.extract_companies(text),
+        'people': extractor.extract_people(text),
+    }
+
+
+def measure(extractor, texts: List[str], repeat: int) -> float:
+    """Лучшее из repeat прогонов: среднее время на статью (секунды)"""
+    extract(extractor, texts[0])  # Прогрев (ленивая инициализация словарей)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            extract(extractor, text)
+        elapsed = (time.perf_counter() - start) / len(texts)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def comparable(field: str, values: List) -> set:
+    if field == 'money':
+        return {m['original'].lower() for m in values}
+    return set(values)
+
+
+def count_diffs(baseline, texts: List[str]) -> Dict[str, int]:
+    """Количество статей, в которых результаты различаются (по каждому полю)"""
+    diffs = dict.fromkeys(FIELDS, 0)
+    for text in texts:
+        expected, actual = extract(baseline, text), extract(DataExtractor, text)
+        for field in FIELDS:
+            a, b = expected[field], actual[field]
+            # Старая версия выбирала 10 людей в произвольном порядке
+            if field == 'people' and max(len(a), len(b)) >= 10:
+                continue
+            if comparable(field, a) != comparable(field, b):
+                diffs[field] += 1
+    return diffs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Замер скорости извлечения сущностей')
+    parser.add_argument('corpus', help='JSON/JSONL со статьями или каталог *.txt')
+    parser.add_argument('--baseline', default='HEAD', help='ревизия git или путь к extractors.py')
+    parser.add_argument('--repeat', type=int, default=3, help='количество прогонов')
+    args = parser.parse_args()
+
+    texts = [text for text in load_texts(args.corpus) if text.strip()]
+    if not texts:
+        print(f"В {args.corpus} нет текстов")
+        return 1
+    baseline = load_baseline(args.baseline)
+
+    before = measure(baseline, texts, args.repeat)
+    after = measure(DataExtractor, texts, args.repeat)
+    diffs = count_diffs(baseline, texts)
+
+    print(f"Статей: {len(texts)}, средняя длина текста: {sum(map(len, texts)) // len(texts)} символов")
+    print(f"до ({args.baseline}): {before * 1e6:.0f} мкс/статья")
+    print(f"после:  {after * 1e6:.0f} мкс/статья (x{before / after:.2f})")
+    print("Статей с различиями: " + ', '.join(f"{field} {count}" for field, count in diffs.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
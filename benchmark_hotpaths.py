@@ -0,0 +1,267 @@
+"""
+Микробенчмарки горячих путей парсинга и извлечения данных на сохраненном корпусе
+с базовыми результатами в репозитории
+
+Использование:
+    python benchmark_hotpaths.py run                        # замер на benchmarks/corpus
+    python benchmark_hotpaths.py run --filter extract_ --rounds 10
+    python benchmark_hotpaths.py compare                    # против benchmarks/baseline.json, код 1 при замедлении
+    python benchmark_hotpaths.py compare --threshold 1.2
+    python benchmark_hotpaths.py run --save benchmarks/baseline.json   # обновить базовые результаты
+    python benchmark_hotpaths.py corpus                     # пересоздать корпус симулятором rb.ru
+
+Корпус: articles/*.html (страницы статей, имя файла - путь URL через '__', как в
+compare_parsers.py), listings/*.html (страницы листинга), texts/*.txt (тексты для
+извлечения). Сохраненные страницы rb.ru можно положить в корпус вместо синтетических,
+после чего базовые результаты нужно пересохранить.
+
+Время - на один вызов, лучшее из раундов (как в timeit): оно меньше всего зависит от фона.
+При сравнении лучший текущий раунд делится на медиану базовых раундов, так что удачно
+быстрый базовый замер не дает ложных срабатываний, а замедления в разы видны сразу.
+Парсеры меняют дерево страницы, поэтому деревья для parse_article строятся заново
+для каждого вызова вне замера.
+"""
+
+import gc
+import sys
+import json
+import math
+import time
+import argparse
+import logging
+import platform
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from bs4 import BeautifulSoup
+
+from scraper.config import BASE_URL, SECTIONS, PARSER_BACKENDS
+from scraper.extractors import DataExtractor
+from scraper.parsers import create_parser
+from scraper.simulator import SiteSimulator
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_CORPUS = 'benchmarks/corpus'
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+DEFAULT_THRESHOLD = 1.5
+EXTRACTOR_METHODS = ('extract_money', 'extract_companies', 'extract_people', 'extract_all')
+
+
+def page_url(path: Path) -> str:
+    """URL страницы по имени файла: news__slug.html -> https://rb.ru/news/slug/"""
+    return f"{BASE_URL}/{path.stem.replace('__', '/')}/"
+
+
+def load_corpus(corpus: str) -> Dict[str, List]:
+    """Страницы статей [(url, html)], листингов [html] и тексты [text]"""
+    root = Path(corpus)
+    if not root.is_dir():
+        raise SystemExit(f"Корпус {corpus} не найден (создать: python benchmark_hotpaths.py corpus)")
+    return {
+        'articles': [(page_url(p), p.read_text(encoding='utf-8')) for p in sorted((root / 'articles').glob('*.html'))],
+        'listings': [p.read_text(encoding='utf-8') for p in sorted((root / 'listings').glob('*.html'))],
+        'texts': [p.read_text(encoding='utf-8') for p in sorted((root / 'texts').glob('*.txt'))],
+    }
+
+
+def build_cases(corpus: Dict[str, List], parsers: List[str]) -> List[Dict]:
+    """
+    Набор замеров
+
+    Returns:
+        Словари: name, fn, items (аргументы вызовов), setup (подготовка аргументов
+        каждого вызова вне замера или None)
+    """
+    cases = []
+    articles = corpus['articles']
+    for backend in parsers:
+        parser = create_parser(backend)
+        if backend == 'lxml':
+            tree, parse = parser.build_tree, parser.parse_tree
+        else:
+            tree, parse = (lambda html: BeautifulSoup(html, 'lxml')), parser.parse_article
+        cases.append({'name': f'parse_html[{backend}]', 'fn': parser.parse_html, 'items': articles, 'setup': None})
+        cases.append({'name': f'parse_article[{backend}]', 'fn': parse, 'items': articles,
+                      'setup': lambda url, html, tree=tree: (url, tree(html))})
+        cases.append({'name': f'detect_content_type[{backend}]', 'fn': parser.detect_content_type,
+                      'items': [(url, tree(html)) for url, html in articles], 'setup': None})
+
+    parser = create_parser('bs4')
+    cases.append({'name': 'extract_article_links', 'fn': parser.extract_article_links,
+                  'items': [(BeautifulSoup(html, 'lxml'),) for html in corpus['listings']], 'setup': None})
+
+    texts = [(text,) for text in corpus['texts']]
+    for method in EXTRACTOR_METHODS:
+        cases.append({'name': method, 'fn': getattr(DataExtractor, method), 'items': texts, 'setup': None})
+    return cases
+
+
+def measure(fn: Callable, items: List[tuple], setup: Optional[Callable] = None,
+            rounds: int = 7, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Время одного вызова fn по всем items
+
+    Первый проход - прогрев (кэш селекторов, словарь компаний), он не учитывается.
+    Число повторов корпуса в раунде подбирается так, чтобы раунд длился не меньше min_time.
+
+    Returns:
+        min_us, median_us - время вызова в микросекундах (лучший и средний раунд), calls - вызовов в раунде
+    """
+    def prepare(loops: int) -> List[tuple]:
+        return [setup(*item) if setup else item for _ in range(loops) for item in items]
+
+    def run(calls: List[tuple]) -> float:
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for args in calls:
+                fn(*args)
+            return time.perf_counter() - start
+        finally:
+            gc.enable()
+
+    first = run(prepare(1))
+    loops = max(1, math.ceil(min_time / first)) if first > 0 else 1000
+    per_call = []
+    for _ in range(rounds):
+        calls = prepare(loops)
+        per_call.append(run(calls) / len(calls))
+    return {'min_us': round(min(per_call) * 1e6, 2), 'median_us': round(statistics.median(per_call) * 1e6, 2),
+            'calls': loops * len(items)}
+
+
+def run_cases(args, baseline: Optional[Dict] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Все замеры корпуса
+
+    Если задан baseline, замер медленнее порога повторяется до args.confirm раз
+    и берется лучший результат: одиночный выброс из-за фоновой нагрузки не считается регрессией.
+    """
+    corpus = load_corpus(args.corpus)
+    print(f"Корпус {args.corpus}: статей {len(corpus['articles'])}, листингов {len(corpus['listings'])}, "
+          f"текстов {len(corpus['texts'])}")
+    results = {}
+    for case in build_cases(corpus, args.parsers):
+        if args.filter and args.filter not in case['name']:
+            continue
+        if not case['items']:
+            print(f"{case['name']}: нет данных в корпусе, пропускаю")
+            continue
+        result = measure(case['fn'], case['items'], case['setup'], args.rounds, args.min_time)
+        base = (baseline or {}).get(case['name'])
+        for _ in range(args.confirm if base else 0):
+            if result['min_us'] <= base['median_us'] * args.threshold:
+                break
+            retry = measure(case['fn'], case['items'], case['setup'], args.rounds, args.min_time)
+            if retry['min_us'] < result['min_us']:
+                result = retry
+        results[case['name']] = result
+    return results
+
+
+def print_results(results: Dict[str, Dict], baseline: Optional[Dict] = None,
+                  threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Таблица результатов; возвращает замедлившиеся замеры"""
+    slower = []
+    header = f"{'Замер':<28} {'min, мкс':>12} {'медиана, мкс':>14}"
+    if baseline is not None:
+        header += f" {'база (мед.)':>12} {'отношение':>10}"
+    print(header)
+    for name, result in results.items():
+        line = f"{name:<28} {result['min_us']:>12.1f} {result['median_us']:>14.1f}"
+        base = (baseline or {}).get(name)
+        if base:
+            ratio = result['min_us'] / base['median_us']
+            line += f" {base['median_us']:>12.1f} {ratio:>9.2f}x"
+            if ratio > threshold:
+                line += '  МЕДЛЕННЕЕ'
+                slower.append(f"{name}: {base['median_us']:.1f} -> {result['min_us']:.1f} мкс ({ratio:.2f}x)")
+        elif baseline is not None:
+            line += f" {'-':>12} {'новый':>10}"
+        print(line)
+    return slower
+
+
+def environment() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system()}
+
+
+def make_corpus(out: str, per_section: int, seed: int):
+    """Корпус из симулятора rb.ru: статьи и листинги каждого раздела, тексты статей"""
+    root = Path(out)
+    for name in ('articles', 'listings', 'texts'):
+        (root / name).mkdir(parents=True, exist_ok=True)
+    simulator = SiteSimulator(max_pages=1, per_page=per_section, seed=seed, port=0)
+    parser = create_parser('bs4')
+    try:
+        for section, path in SECTIONS.items():
+            content_type, html, _ = simulator.render(path)
+            (root / 'listings' / f'{section}.html').write_text(html, encoding='utf-8')
+            for url in simulator.listings[path]:
+                _, html, _ = simulator.render(url[len(BASE_URL):])
+                stem = url[len(BASE_URL):].strip('/').replace('/', '__')
+                (root / 'articles' / f'{stem}.html').write_text(html, encoding='utf-8')
+                article = parser.parse_html(url, html)
+                text = f"{article['text']} {article['description']} {article['title']}"
+                (root / 'texts' / f'{stem}.txt').write_text(text, encoding='utf-8')
+    finally:
+        simulator.server.server_close()
+    print(f"Корпус записан в {out}: {per_section} статей на раздел, {len(SECTIONS)} разделов")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Микробенчмарки парсера и извлечения данных')
+    parser.add_argument('command', choices=('run', 'compare', 'corpus'),
+                        help='run - замер, compare - замер и сравнение с базовыми результатами, '
+                             'corpus - создать корпус симулятором')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='каталог корпуса')
+    parser.add_argument('--parsers', nargs='+', default=list(PARSER_BACKENDS), choices=PARSER_BACKENDS)
+    parser.add_argument('--filter', default=None, help='только замеры, в имени которых есть подстрока')
+    parser.add_argument('--rounds', type=int, default=7, help='раундов на замер')
+    parser.add_argument('--min-time', type=float, default=0.05, help='минимальная длительность раунда (секунды)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='файл базовых результатов')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='замедление (во сколько раз), которое считается регрессией')
+    parser.add_argument('--confirm', type=int, default=2,
+                        help='compare: сколько раз перемерить замер, оказавшийся медленнее порога')
+    parser.add_argument('--save', default=None, help='сохранить результаты как базовые в файл')
+    parser.add_argument('--per-section', type=int, default=3, help='corpus: статей на раздел')
+    parser.add_argument('--seed', type=int, default=0, help='corpus: seed симулятора')
+    args = parser.parse_args()
+
+    if args.command == 'corpus':
+        make_corpus(args.corpus, args.per_section, args.seed)
+        return 0
+
+    baseline = None
+    if args.command == 'compare':
+        with open(args.baseline, encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('environment') != environment():
+            print(f"Базовые результаты сняты в другом окружении: {stored.get('environment')}, "
+                  f"сейчас {environment()} - сравнение приблизительное")
+        baseline = stored['results']
+    results = run_cases(args, baseline)
+    slower = print_results(results, baseline, args.threshold)
+
+    if args.save:
+        # С --filter остальные замеры базового файла сохраняются
+        saved = {}
+        if args.filter and Path(args.save).exists():
+            with open(args.save, encoding='utf-8') as f:
+                saved = json.load(f)['results']
+        saved.update(results)
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'corpus': args.corpus, 'results': saved},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Базовые результаты сохранены в {args.save}")
+
+    for line in slower:
+        print(f"Замедление {line}")
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Память на статью и скорость кодирования статей: словари (как раньше) против записей
+Article со слотами, компактного JSON и двоичного формата scraper/records.py
+
+Использование:
+    python benchmark_records.py                          # статьи корпуса benchmarks/corpus
+    python benchmark_records.py rb_articles.jsonl --limit 5000
+    python benchmark_records.py benchmarks/corpus --copies 200   # память на 3600 статьях
+
+Корпус: каталог корпуса микробенчмарков (страницы статей парсятся), JSON массив статей
+или поток JSON Lines. Память считается по tracemalloc для статей, декодированных из JSON
+(у каждой статьи свои строки, как при чтении потока), время - как в benchmark_hotpaths.py.
+"""
+
+import sys
+import json
+import pickle
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmark_hotpaths import load_corpus, measure
+from scraper.parsers import create_parser
+from scraper.records import Article, dumps_json, loads_json, dumps_binary, loads_binary
+from scraper.storage import DataStorage
+
+
+def load_articles(source: str, limit: int) -> List[Article]:
+    path = Path(source)
+    if path.is_dir():
+        parser = create_parser('bs4')
+        articles = [parser.parse_html(url, html) for url, html in load_corpus(source)['articles']]
+    else:
+        articles = DataStorage.load_articles(source)
+    result = []
+    for article in articles:
+        if article:
+            result.append(Article.from_dict(article))
+            if limit and len(result) >= limit:
+                break
+    return result
+
+
+def memory_per_article(lines: List[str], decode: Callable) -> float:
+    """Прирост памяти (байт) на одну декодированную статью"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    decoded = [decode(line) for line in lines]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del decoded
+    return (after - before) / len(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Память и скорость кодирования статей: словари и записи')
+    parser.add_argument('corpus', nargs='?', default='benchmarks/corpus', help='каталог корпуса, .json или .jsonl')
+    parser.add_argument('--limit', type=int, default=0, help='не больше стольких статей')
+    parser.add_argument('--copies', type=int, default=50, help='повторов корпуса для замера памяти')
+    parser.add_argument('--rounds', type=int, default=7, help='раундов на замер времени')
+    args = parser.parse_args()
+
+    articles = load_articles(args.corpus, args.limit)
+    if not articles:
+        print(f"В {args.corpus} нет статей")
+        return 1
+    dicts = [article.to_dict() for article in articles]
+    lines = [dumps_json(article) for article in articles]
+    blobs = [dumps_binary(article) for article in articles]
+    text_bytes = sum(len(a.text.encode('utf-8')) for a in articles) / len(articles)
+    print(f"Статей: {len(articles)}, текст в среднем {text_bytes / 1024:.1f} КБ, "
+          f"сумм в среднем {sum(len(a.money) for a in articles) / len(articles):.1f}")
+
+    corpus = lines * args.copies
+    as_dict = memory_per_article(corpus, json.loads)
+    as_record = memory_per_article(corpus, loads_json)
+    print(f"\nПамять на статью ({len(corpus)} статей): словарь {as_dict:.0f} Б, Article {as_record:.0f} Б "
+          f"({as_dict - as_record:+.0f} Б, {(as_dict - as_record) / as_dict:.0%})")
+
+    # (замер, функция, аргументы, размер результата на статью)
+    cases = [
+        ('encode dict json.dumps', lambda a: json.dumps(a, ensure_ascii=False), dicts),
+        ('encode dict indent=2', lambda a: json.dumps(a, ensure_ascii=False, indent=2), dicts),
+        ('encode Article json', dumps_json, articles),
+        ('encode Article binary', dumps_binary, articles),
+        ('decode dict json.loads', json.loads, lines),
+        ('decode Article json', loads_json, lines),
+        ('decode Article binary', loads_binary, blobs),
+        ('pickle dict', pickle.dumps, dicts),
+        ('pickle Article', pickle.dumps, articles),
+        ('unpickle dict', pickle.loads, [pickle.dumps(d) for d in dicts]),
+        ('unpickle Article', pickle.loads, [pickle.dumps(a) for a in articles]),
+    ]
+    sizes: Dict[str, float] = {
+        'encode dict json.dumps': sum(len(json.dumps(d, ensure_ascii=False).encode()) for d in dicts),
+        'encode dict indent=2': sum(len(json.dumps(d, ensure_ascii=False, indent=2).encode()) for d in dicts),
+        'encode Article json': sum(len(line.encode()) for line in lines),
+        'encode Article binary': sum(map(len, blobs)),
+        'pickle dict': sum(len(pickle.dumps(d)) for d in dicts),
+        'pickle Article': sum(len(pickle.dumps(a)) for a in articles),
+    }
+
+    print(f"\n{'Замер':<26} {'мкс/статья':>11} {'статей/с':>10} {'байт/статья':>12}")
+    for name, fn, items in cases:
+        result = measure(fn, [(item,) for item in items], rounds=args.rounds)
+        size = f"{sizes[name] / len(articles):>12.0f}" if name in sizes else f"{'':>12}"
+        print(f"{name:<26} {result['min_us']:>11.1f} {1e6 / result['min_us']:>10.0f} {size}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
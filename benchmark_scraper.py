@@ -0,0 +1,247 @@
+"""
+Сквозной бенчмарк скрапера без сети: RBScraper обходит локальный симулятор rb.ru
+(листинги и статьи с заданной задержкой, долей ошибок и размером страниц)
+
+Использование:
+    python benchmark_scraper.py
+    python benchmark_scraper.py --max-pages 20 --latency 0.1 --error-rate 0.02 --workers 50
+    python benchmark_scraper.py --backend async --parser lxml --parse-workers 4
+    python benchmark_scraper.py --max-pages 100 --latency 0.01 --streaming   # память потокового режима
+    python benchmark_scraper.py --duplicate-rate 0.3 --near-duplicates       # кластеры перепечаток
+    python benchmark_scraper.py --archive rb_archive --latency 0      # записанные страницы из архива
+    python benchmark_scraper.py --json bench.json                     # результат для сравнения
+    python benchmark_scraper.py --baseline bench.json --tolerance 0.2  # код 1 при регрессии (CI)
+
+Отчет: статей и запросов в секунду, процессорное время на статью (вместе с процессами
+парсинга), пиковая память (RSS) и p50/p99 времени ответа. Симулятор работает в отдельном
+процессе и в замеры процессора и памяти не попадает.
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+import resource
+import tempfile
+import threading
+import statistics
+from multiprocessing import Process, Queue
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from scraper import RBScraper
+from scraper.config import (BASE_URL, BACKENDS, DEFAULT_BACKEND, PARSER_BACKENDS, DEFAULT_PARSER_BACKEND,
+                            DISCOVERY_MODES, DEFAULT_DISCOVERY, SIM_PAGES, SIM_ARTICLES_PER_PAGE,
+                            SIM_LATENCY, SIM_JITTER, SIM_ERROR_RATE, SIM_PARAGRAPHS, SIM_DUPLICATE_RATE)
+from scraper.simulator import SiteSimulator
+
+logger = logging.getLogger(__name__)
+
+# Метрики для сравнения с базовым результатом: True - больше значит лучше
+METRICS = {
+    'articles_per_sec': True,
+    'cpu_ms_per_article': False,
+    'peak_rss_mb': False,
+    'latency_p50_ms': False,
+    'latency_p99_ms': False,
+}
+
+
+class LatencyRecorder:
+    """Наблюдатель HTTP клиентов: время и исход каждого запроса"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool, throttled: bool = False, revalidated: bool = False):
+        with self._lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.errors += 1
+
+    def percentile(self, q: int) -> float:
+        """Перцентиль q (1..99) в секундах"""
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100)[q - 1]
+
+
+def parse_pages(items) -> dict:
+    """news=20 stories=5 -> {'news': 20, 'stories': 5}"""
+    pages = {}
+    for item in items or []:
+        section, _, count = item.partition('=')
+        pages[section] = int(count)
+    return pages
+
+
+def serve(options: Dict, urls: Queue):
+    """Процесс симулятора: адрес сервера передается родителю через очередь"""
+    simulator = SiteSimulator(**options)
+    urls.put((simulator.url, simulator.articles))
+    simulator.serve_forever()
+
+
+def cpu_time() -> float:
+    """Процессорное время процесса и завершившихся дочерних процессов (пул парсинга)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса или самого большого дочернего процесса (ru_maxrss в КБ на Linux)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+
+def run_benchmark(args) -> Dict:
+    """Один сквозной прогон scrape_all против симулятора"""
+    options = {
+        'pages': parse_pages(args.pages), 'max_pages': args.max_pages, 'per_page': args.per_page,
+        'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate,
+        'paragraphs': args.paragraphs, 'duplicate_rate': args.duplicate_rate, 'archive_path': args.archive,
+        'seed': args.seed,
+    }
+    urls = Queue()
+    server = Process(target=serve, args=(options, urls), name='site-simulator', daemon=True)
+    server.start()
+    try:
+        origin, available = urls.get(timeout=60)
+        logger.info(f"Симулятор на {origin}: {available} статей")
+
+        recorder = LatencyRecorder()
+        with tempfile.TemporaryDirectory() as tmp:
+            scraper = RBScraper(
+                max_workers=args.workers,
+                delay=0,
+                backend=args.backend,
+                concurrency=args.workers,
+                rate=None,
+                sink_path=str(Path(tmp) / 'articles.jsonl'),
+                parse_workers=args.parse_workers,
+                parser_backend=args.parser,
+                discovery=args.discovery,
+                sitemap_urls=[f'{BASE_URL}/sitemap.xml'] if args.discovery == 'sitemap' else None,
+                adaptive=args.adaptive,
+                origin=origin,
+                observer=recorder,
+                streaming=args.streaming,
+                near_duplicates=args.near_duplicates,
+            )
+            # Лимит глубины: симулятор отдает пустой листинг после своих страниц
+            max_pages = max([args.max_pages] + list(parse_pages(args.pages).values())) + 1
+            cpu_start = cpu_time()
+            start = time.perf_counter()
+            result = scraper.scrape_all(max_pages_per_section=max_pages, save_milestones=True)
+            elapsed = time.perf_counter() - start
+            cpu = cpu_time() - cpu_start
+            rss = peak_rss_mb()
+    finally:
+        server.terminate()
+        server.join()
+
+    count = result['articles'] if args.streaming else len(result)
+    clusters = scraper.near_duplicates.stats()['clusters'] if scraper.near_duplicates is not None else None
+    return {
+        'articles': count,
+        'available': available,
+        'requests': len(recorder.latencies),
+        'errors': recorder.errors,
+        'seconds': round(elapsed, 2),
+        'articles_per_sec': round(count / elapsed, 1) if elapsed else 0.0,
+        'requests_per_sec': round(len(recorder.latencies) / elapsed, 1) if elapsed else 0.0,
+        'cpu_ms_per_article': round(cpu / count * 1000, 2) if count else 0.0,
+        'peak_rss_mb': round(rss, 1),
+        'latency_p50_ms': round(recorder.percentile(50) * 1000, 1),
+        'latency_p99_ms': round(recorder.percentile(99) * 1000, 1),
+        'clusters': clusters,
+        'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')},
+    }
+
+
+def print_report(result: Dict, baseline: Optional[Dict] = None):
+    print(f"Статей: {result['articles']} из {result['available']}, запросов {result['requests']} "
+          f"(ошибок {result['errors']}) за {result['seconds']} с")
+    if result.get('clusters') is not None:
+        print(f"Кластеров почти одинаковых статей: {result['clusters']}")
+    print(f"{'Метрика':<22} {'Значение':>12}" + (f" {'База':>12} {'Изменение':>10}" if baseline else ''))
+    for metric in ('articles_per_sec', 'requests_per_sec') + tuple(m for m in METRICS if m != 'articles_per_sec'):
+        line = f"{metric:<22} {result[metric]:>12}"
+        if baseline and metric in baseline:
+            base = baseline[metric]
+            change = f"{(result[metric] - base) / base:+.0%}" if base else '-'
+            line += f" {base:>12} {change:>10}"
+        print(line)
+
+
+def regressions(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Метрики, ухудшившиеся относительно базового результата больше чем на tolerance"""
+    failed = []
+    for metric, higher_is_better in METRICS.items():
+        base = baseline.get(metric)
+        if not base:
+            continue
+        change = (result[metric] - base) / base
+        if (-change if higher_is_better else change) > tolerance:
+            failed.append(f"{metric}: {base} -> {result[metric]} ({change:+.0%})")
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Сквозной бенчмарк скрапера на локальном симуляторе rb.ru')
+    parser.add_argument('--max-pages', type=int, default=SIM_PAGES, help='страниц листинга в каждом разделе')
+    parser.add_argument('--pages', nargs='*', help='страниц по разделам: news=20 stories=5 ...')
+    parser.add_argument('--per-page', type=int, default=SIM_ARTICLES_PER_PAGE, help='статей на странице листинга')
+    parser.add_argument('--latency', type=float, default=SIM_LATENCY, help='медиана задержки ответа (секунды)')
+    parser.add_argument('--jitter', type=float, default=SIM_JITTER, help='разброс задержки (sigma логнормального)')
+    parser.add_argument('--error-rate', type=float, default=SIM_ERROR_RATE, help='доля ответов 500')
+    parser.add_argument('--paragraphs', type=int, default=SIM_PARAGRAPHS, help='медиана числа абзацев статьи')
+    parser.add_argument('--duplicate-rate', type=float, default=SIM_DUPLICATE_RATE,
+                        help='доля статей вне /news/, перепечатывающих новость')
+    parser.add_argument('--archive', default=None, help='архив HTML: отдавать записанные страницы')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=20, help='потоков (threads) или слотов (async) загрузки')
+    parser.add_argument('--parse-workers', type=int, default=0, help='процессов парсинга (0 - в потоках загрузки)')
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument('--parser', default=DEFAULT_PARSER_BACKEND, choices=PARSER_BACKENDS)
+    parser.add_argument('--discovery', default=DEFAULT_DISCOVERY, choices=DISCOVERY_MODES)
+    parser.add_argument('--adaptive', action='store_true', help='адаптивная параллельность (AIMD)')
+    parser.add_argument('--streaming', action='store_true', help='потоковый режим (статьи не хранятся в памяти)')
+    parser.add_argument('--near-duplicates', action='store_true', help='кластеры почти одинаковых статей (MinHash)')
+    parser.add_argument('--json', default=None, help='сохранить результат в JSON')
+    parser.add_argument('--baseline', default=None, help='JSON прошлого результата для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое ухудшение метрик (доля)')
+    parser.add_argument('--verbose', action='store_true', help='логи скрапера')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    result = run_benchmark(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Результат сохранен в {args.json}")
+
+    if baseline:
+        failed = regressions(result, baseline, args.tolerance)
+        for line in failed:
+            print(f"Регрессия {line}")
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
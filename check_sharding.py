@@ -0,0 +1,195 @@
+"""
+Проверка шардированного обхода без сети: N шардов обходят локальный симулятор rb.ru
+процессами (как crawl_sharded.py run), потоки сливаются через merge_shards, итог
+сверяется со списком статей симулятора
+
+Использование:
+    python check_sharding.py
+    python check_sharding.py --shards 4 --max-pages 6
+    python check_sharding.py --discovery sitemap
+
+Проверяется: страницы листинга (owns_page) и URL из sitemap (shard_of) достаются ровно
+одному шарду, шарды не загружают одни и те же статьи, в слитом потоке каждая статья
+симулятора есть ровно один раз. Слияние назначает кластеры почти одинаковых статей
+(near_duplicates): симулятор перепечатывает часть новостей в других разделах, и статьи
+с одинаковым текстом должны получить общий cluster_id, а разные - разные.
+Код возврата 1 - есть расхождения.
+"""
+
+import sys
+import logging
+import argparse
+import tempfile
+from collections import Counter
+from multiprocessing import Process, Queue
+from pathlib import Path
+from typing import List, Set
+
+from benchmark_scraper import serve
+from scraper import RBScraper
+from scraper.config import BASE_URL, SECTIONS, DISCOVERY_MODES, SIM_ARTICLES_PER_PAGE, ARTICLES_PER_LISTING_PAGE
+from scraper.simulator import _article_segment
+from scraper.sharding import shard_of, owns_page, shard_paths, mark_done, missing_shards, merge_shards
+from scraper.storage import ArticleSink
+
+logger = logging.getLogger(__name__)
+
+
+def run_shard(origin: str, directory: str, index: int, count: int, depth: int, discovery: str):
+    """Обход одного шарда, как run_worker в crawl_sharded.py"""
+    paths = shard_paths(directory, index, count)
+    scraper = RBScraper(
+        max_workers=5,
+        delay=0,
+        discovery=discovery,
+        sitemap_urls=[f'{BASE_URL}/sitemap.xml'] if discovery == 'sitemap' else None,
+        frontier_path=paths['frontier'],
+        sink_path=paths['sink'],
+        shard=(index, count),
+        origin=origin,
+        streaming=True,
+    )
+    summary = scraper.scrape_all(max_pages_per_section=depth, save_milestones=True)
+    mark_done(directory, index, count, {'articles': summary['articles'], 'written': summary['written']})
+
+
+def sink_urls(path: str) -> List[str]:
+    """URL всех строк потока (без дедупликации при чтении)"""
+    urls = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                urls.append(line.split('"url":"', 1)[1].split('"', 1)[0])
+    return urls
+
+
+def check_partition(urls: List[str], count: int, max_pages: int) -> List[str]:
+    """Разбиение страниц листинга и URL между шардами: каждая ровно у одного шарда"""
+    problems = []
+    for page in range(1, max_pages + 2):
+        owners = [index for index in range(count) if owns_page(page, index, count)]
+        if len(owners) != 1:
+            problems.append(f"страница листинга {page}: шарды {owners}")
+    sizes = Counter(shard_of(url, count) for url in urls)
+    if sum(sizes.values()) != len(urls) or not set(sizes) <= set(range(count)):
+        problems.append(f"shard_of раздает URL вне шардов: {dict(sizes)}")
+    return problems
+
+
+def check_crawl(directory: str, count: int, expected: Set[str], output: str) -> List[str]:
+    problems = []
+    missing = missing_shards(directory, count)
+    if missing:
+        problems.append(f"не завершены шарды {missing}")
+
+    loaded = {}
+    for index in range(count):
+        path = shard_paths(directory, index, count)['sink']
+        loaded[index] = set(sink_urls(path)) if Path(path).exists() else set()
+    for index in range(count):
+        for other in range(index + 1, count):
+            common = loaded[index] & loaded[other]
+            if common:
+                problems.append(f"шарды {index} и {other} загрузили одни и те же {len(common)} статей")
+
+    merged = sink_urls(output)
+    repeated = [url for url, times in Counter(merged).items() if times > 1]
+    if repeated:
+        problems.append(f"в слитом потоке повторяются {len(repeated)} URL, например {repeated[0]}")
+    lost = expected - set(merged)
+    if lost:
+        problems.append(f"в слитом потоке нет {len(lost)} статей, например {sorted(lost)[0]}")
+    extra = set(merged) - expected
+    if extra:
+        problems.append(f"в слитом потоке {len(extra)} лишних URL, например {sorted(extra)[0]}")
+    articles = list(ArticleSink.read(output))
+    if len(articles) != len(set(merged)):
+        problems.append("ArticleSink.read отдает не все статьи слитого потока")
+    problems.extend(check_clusters(articles))
+    return problems
+
+
+def check_clusters(articles: List) -> List[str]:
+    """Кластеры слитого потока совпадают с группами статей по тексту"""
+    by_text = {}
+    for article in articles:
+        by_text.setdefault(article.text, set()).add(article.url)
+    by_cluster = {}
+    for article in articles:
+        by_cluster.setdefault(article.cluster_id, set()).add(article.url)
+    if not all(article.cluster_id for article in articles):
+        return ["у части статей нет cluster_id"]
+    groups = {frozenset(urls) for urls in by_text.values()}
+    clusters = {frozenset(urls) for urls in by_cluster.values()}
+    if groups != clusters:
+        return [f"кластеры не совпадают с группами одинаковых текстов: групп {len(groups)}, "
+                f"кластеров {len(clusters)}"]
+    return []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Проверка шардированного обхода и слияния на симуляторе rb.ru')
+    parser.add_argument('--shards', type=int, default=3, help='количество шардов')
+    parser.add_argument('--max-pages', type=int, default=4, help='страниц листинга в каждом разделе симулятора')
+    parser.add_argument('--per-page', type=int, default=SIM_ARTICLES_PER_PAGE, help='статей на странице листинга')
+    parser.add_argument('--duplicate-rate', type=float, default=0.2,
+                        help='доля статей вне /news/, перепечатывающих новость')
+    parser.add_argument('--discovery', nargs='*', default=list(DISCOVERY_MODES), choices=DISCOVERY_MODES,
+                        help='режимы поиска URL (по умолчанию все)')
+    parser.add_argument('--verbose', action='store_true', help='логи скрапера')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+
+    options = {'max_pages': args.max_pages, 'per_page': args.per_page, 'latency': 0, 'error_rate': 0,
+               'duplicate_rate': args.duplicate_rate}
+    urls = Queue()
+    server = Process(target=serve, args=(options, urls), name='site-simulator', daemon=True)
+    server.start()
+    failed = False
+    try:
+        origin, available = urls.get(timeout=60)
+        # Те же параметры, что у сервера: список статей симулятора детерминирован
+        expected = {f'{BASE_URL}/{_article_segment(section)}/sim-{section}-{i:06d}/'
+                    for section in SECTIONS for i in range(args.max_pages * args.per_page)}
+        if len(expected) != available:
+            print(f"Симулятор отдает {available} статей, ожидалось {len(expected)}")
+            return 1
+
+        problems = check_partition(sorted(expected), args.shards, args.max_pages)
+        print(f"Разбиение страниц и URL на {args.shards} шардов: {'ок' if not problems else 'ОШИБКА'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failed |= bool(problems)
+
+        for discovery in args.discovery:
+            # Лимит глубины: листинг симулятора пустой после его страниц; из sitemap раздел
+            # ограничивается depth * ARTICLES_PER_LISTING_PAGE статьями - берем все
+            depth = args.max_pages + 1
+            if discovery == 'sitemap':
+                depth = args.max_pages * args.per_page // ARTICLES_PER_LISTING_PAGE + 1
+            with tempfile.TemporaryDirectory() as tmp:
+                workers = [Process(target=run_shard, name=f'shard-{index}',
+                                   args=(origin, tmp, index, args.shards, depth, discovery))
+                           for index in range(args.shards)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                output = str(Path(tmp) / 'merged.jsonl')
+                written = merge_shards(tmp, args.shards, output, near_duplicates=True)
+                problems = check_crawl(tmp, args.shards, expected, output)
+            print(f"discovery={discovery}: {args.shards} шардов, в слитом потоке {written} из {len(expected)} "
+                  f"статей - {'ок' if not problems else 'ОШИБКА'}")
+            for problem in problems:
+                print(f"  {problem}")
+            failed |= bool(problems)
+    finally:
+        server.terminate()
+        server.join()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
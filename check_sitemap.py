@@ -0,0 +1,182 @@
+"""
+Проверка поиска URL по sitemap и лентам без сети: SitemapDiscovery.discover() читает
+сохраненные документы из benchmarks/corpus/sitemaps, результат сверяется с ожидаемым
+
+Использование:
+    python check_sitemap.py
+    python check_sitemap.py --dir benchmarks/corpus/sitemaps --verbose
+
+Документы: индекс sitemap_index.xml со вложенными sitemap-news.xml.gz (gzip) и
+sitemap-sections.xml (ищутся рядом с индексом по имени файла), лента RSS feed.rss
+и лента Atom feed.atom.
+
+Проверяется: URL статей попадают в свои разделы (/columns/ - opinions и т.д.),
+страницы разделов, тегов, URL с параметрами и прочие URL не статей отбрасываются,
+URL без слеша в конце дополняются им, при повторе URL берется самая поздняя дата,
+даты RSS переводятся в ISO. Затем то же через RBScraper в режиме discovery='sitemap':
+в раздел берутся самые свежие статьи, а в инкрементальном режиме заново загружаются
+только новые и те, у которых lastmod позже прошлой загрузки. Клиент HTTP заменен
+счетчиком: ни одного сетевого запроса быть не должно. Код возврата 1 - есть расхождения.
+"""
+
+import sys
+import json
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from scraper import RBScraper
+from scraper.config import ARTICLES_PER_LISTING_PAGE
+from scraper.sitemap import SitemapDiscovery
+
+DEFAULT_DIR = 'benchmarks/corpus/sitemaps'
+
+# Раздел -> URL -> дата изменения по документам из DEFAULT_DIR
+EXPECTED = {
+    'news': {
+        # sitemap-sections.xml: дата позже, чем в sitemap-news.xml.gz и в RSS
+        'https://rb.ru/news/alpha-raises-round/': '2026-10-16T08:00:00+03:00',
+        # без слеша в sitemap-news.xml.gz; более ранняя дата из sitemap-sections.xml не берется
+        'https://rb.ru/news/beta-opens-office/': '2026-10-14T12:00:00+03:00',
+        # iota-report/?utm_source=sitemap не берется: как и в листинге, URL с параметрами
+        # не считается ссылкой на статью
+        'https://rb.ru/news/gamma-ipo/': '2026-10-13T18:30:00+03:00',
+        'https://rb.ru/news/delta-layoffs/': None,
+        'https://rb.ru/news/eta-merger/': '2026-10-12T10:00:00+03:00',
+        'https://rb.ru/news/theta-license/': '2026-10-11T15:45:00+03:00',
+        # только в RSS: pubDate в ISO
+        'https://rb.ru/news/epsilon-round/': '2026-10-15T10:30:00+03:00',
+    },
+    'stories': {
+        'https://rb.ru/stories/founder-interview/': '2026-10-10T11:00:00+03:00',
+        # только в Atom: ссылка rel="alternate", а не rel="self"
+        'https://rb.ru/stories/zeta-story/': '2026-10-16T12:00:00+03:00',
+    },
+    'opinions': {
+        'https://rb.ru/columns/why-startups-fail/': '2026-10-09T09:00:00+03:00',
+        'https://rb.ru/opinions/remote-work/': '2026-10-08T09:00:00+03:00',
+    },
+    'neuroprofiles': {
+        'https://rb.ru/neuroprofiles/ivan-petrov/': '2026-10-07T13:00:00+03:00',
+    },
+    'reviews': {
+        # в RSS только guid
+        'https://rb.ru/reviews/crm-systems/': '2026-10-06T16:20:00+03:00',
+    },
+    'checklists': {
+        'https://rb.ru/checklists/launch-marketplace/': None,
+    },
+}
+
+# Прошлый результат для инкрементальной проверки: URL -> время загрузки
+KNOWN = {
+    # lastmod 2026-10-16 позже загрузки - статья изменилась
+    'https://rb.ru/news/alpha-raises-round/': '2026-10-15T12:00:00+03:00',
+    # lastmod 2026-10-14 раньше загрузки - без изменений
+    'https://rb.ru/news/beta-opens-office/': '2026-10-15T00:00:00+03:00',
+}
+
+
+class OfflineClient:
+    """Клиент HTTP без сети: считает обращения и ничего не загружает"""
+
+    def __init__(self):
+        self.calls: List[str] = []
+
+    def fetch_stream(self, url: str, *args, **kwargs):
+        self.calls.append(url)
+        return iter(())
+
+    def fetch_html(self, url: str, *args, **kwargs) -> Optional[str]:
+        self.calls.append(url)
+        return None
+
+
+def check_discover(directory: Path) -> List[str]:
+    """discover() по индексу sitemap и обеим лентам"""
+    problems = []
+    client = OfflineClient()
+    discovery = SitemapDiscovery(client, [str(directory / 'sitemap_index.xml')],
+                                 feed_urls=[str(directory / 'feed.rss'), str(directory / 'feed.atom')])
+    found = discovery.discover()
+
+    for section, entries in found.items():
+        urls = [url for url, _ in entries]
+        if len(urls) != len(set(urls)):
+            problems.append(f"в разделе {section} повторяются URL")
+    actual = {section: dict(entries) for section, entries in found.items()}
+    for section in sorted(set(EXPECTED) | set(actual)):
+        expected, got = EXPECTED.get(section, {}), actual.get(section, {})
+        for url in sorted(set(expected) - set(got)):
+            problems.append(f"{section}: нет {url}")
+        for url in sorted(set(got) - set(expected)):
+            problems.append(f"{section}: лишний {url}")
+        for url in sorted(set(expected) & set(got)):
+            if expected[url] != got[url]:
+                problems.append(f"{section}: дата {url} {got[url]!r}, ожидалась {expected[url]!r}")
+
+    if discovery.requests or client.calls:
+        problems.append(f"сетевых запросов {discovery.requests}: {client.calls}")
+    return problems
+
+
+def check_scraper(directory: Path) -> List[str]:
+    """Раздел news через RBScraper: самые свежие статьи и разделение на новые, изменившиеся и известные"""
+    problems = []
+    client = OfflineClient()
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = Path(tmp) / 'rb_articles.json'
+        previous.write_text(json.dumps([{'url': url, 'scraped_at': scraped_at} for url, scraped_at in KNOWN.items()]),
+                            encoding='utf-8')
+        scraper = RBScraper(discovery='sitemap', sitemap_urls=[str(directory / 'sitemap_index.xml')],
+                            incremental_from=str(previous), sink_path=str(Path(tmp) / 'rb_articles.jsonl'))
+        scraper.http_client = scraper.sitemap_discovery.http_client = client
+        urls = scraper.get_article_urls_from_sitemaps('news', max_pages=1)
+        fetch, known = scraper.split_known(urls)
+
+    # Ленты RBScraper не читает: в news только URL из sitemap, без даты - в конце
+    dated = sorted(((lastmod, url) for url, lastmod in EXPECTED['news'].items()
+                    if lastmod and url != 'https://rb.ru/news/epsilon-round/'), reverse=True)
+    freshest = [url for _, url in dated][:ARTICLES_PER_LISTING_PAGE]
+    if urls != freshest:
+        problems.append(f"news из sitemap: {urls}, ожидались {freshest}")
+    changed = [url for url in urls if url in KNOWN and url not in known]
+    if changed != ['https://rb.ru/news/alpha-raises-round/']:
+        problems.append(f"изменившиеся статьи: {changed}")
+    if known != ['https://rb.ru/news/beta-opens-office/']:
+        problems.append(f"статьи без изменений: {known}")
+    if sorted(fetch) != sorted(set(urls) - set(known)):
+        problems.append(f"к загрузке: {fetch}")
+    if scraper.sitemap_discovery.requests or client.calls:
+        problems.append(f"сетевых запросов {scraper.sitemap_discovery.requests}: {client.calls}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Проверка SitemapDiscovery на сохраненных sitemap и лентах')
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='каталог с sitemap_index.xml, feed.rss и feed.atom')
+    parser.add_argument('--verbose', action='store_true', help='логи разбора')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    directory = Path(args.dir)
+    if not (directory / 'sitemap_index.xml').exists():
+        print(f"В {directory} нет sitemap_index.xml")
+        return 1
+
+    failed = False
+    for name, check in (('discover()', check_discover), ('RBScraper, discovery=sitemap', check_scraper)):
+        problems = check(directory)
+        print(f"{name}: {'ок' if not problems else 'ОШИБКА'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Проверка паритета парсеров статей: BeautifulSoup ('bs4') против lxml ('lxml')
+на сохраненных HTML страницах
+
+Использование:
+    python compare_parsers.py                 # корпус benchmarks/corpus/articles
+    python compare_parsers.py saved_pages/
+
+Код возврата 1 - хотя бы одно поле хотя бы одной страницы различается.
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from lxml import etree
+
+from scraper.parsers import create_parser
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Поля, которые парсеры собирают через set(): порядок не определен
+UNORDERED_FIELDS = {'tags', 'companies', 'people'}
+IGNORED_FIELDS = {'scraped_at'}
+DEFAULT_PAGES_DIR = 'benchmarks/corpus/articles'
+
+
+def page_url(path: Path, html: str) -> str:
+    """URL страницы: canonical, og:url или имя файла"""
+    root = etree.fromstring(html, etree.HTMLParser()) if html.strip() else None
+    if root is not None:
+        for expr in ('//link[@rel="canonical"]/@href', '//meta[@property="og:url"]/@content'):
+            found = root.xpath(expr)
+            if found:
+                return found[0]
+    return f"https://rb.ru/{path.stem.replace('__', '/')}/"
+
+
+def diff_articles(expected: dict, actual: dict) -> list:
+    """Список различающихся полей"""
+    if expected is None or actual is None:
+        return [] if expected is actual else ['<article>']
+    diffs = []
+    for field in sorted(set(expected) | set(actual)):
+        if field in IGNORED_FIELDS:
+            continue
+        a, b = expected.get(field), actual.get(field)
+        if field in UNORDERED_FIELDS:
+            a, b = sorted(a or []), sorted(b or [])
+        if a != b:
+            diffs.append(field)
+    return diffs
+
+
+def compare(pages_dir: str) -> int:
+    paths = sorted(Path(pages_dir).glob('*.html'))
+    if not paths:
+        print(f"В {pages_dir} нет сохраненных страниц (*.html)")
+        return 1
+
+    bs4_parser = create_parser('bs4')
+    lxml_parser = create_parser('lxml')
+    bs4_time = lxml_time = 0.0
+    mismatches = 0
+
+    for path in paths:
+        html = path.read_text(encoding='utf-8')
+        url = page_url(path, html)
+
+        start = time.perf_counter()
+        expected = bs4_parser.parse_html(url, html)
+        bs4_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = lxml_parser.parse_html(url, html)
+        lxml_time += time.perf_counter() - start
+
+        diffs = diff_articles(expected, actual)
+        if diffs:
+            mismatches += 1
+            print(f"[РАЗЛИЧИЕ] {path.name}: {', '.join(diffs)}")
+            for field in diffs:
+                if field != '<article>':
+                    print(f"    bs4:  {expected.get(field)!r:.200}")
+                    print(f"    lxml: {actual.get(field)!r:.200}")
+
+    print(f"\nСтраниц: {len(paths)}, различий: {mismatches}")
+    print(f"bs4:  {bs4_time / len(paths) * 1000:.1f} мс/страница")
+    print(f"lxml: {lxml_time / len(paths) * 1000:.1f} мс/страница")
+    return 1 if mismatches else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Паритет парсеров bs4 и lxml на сохраненных HTML страницах')
+    parser.add_argument('pages_dir', nargs='?', default=DEFAULT_PAGES_DIR,
+                        help='каталог со страницами *.html (имена как news__slug.html)')
+    args = parser.parse_args()
+    return compare(args.pages_dir)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Шардированный обход: N воркеров делят страницы листинга (или URL из sitemap) между собой,
+каждый пишет свой поток статей в общий каталог, затем потоки сливаются с дедупликацией
+
+Использование:
+    # N процессов на этой машине + слияние
+    python crawl_sharded.py run --shards 4 --max-pages 50
+    python crawl_sharded.py run --shards 4 --pages news=2100 stories=440 opinions=420 --json rb_articles.json
+
+    # Несколько машин с общим каталогом: на каждой свой шард, затем слияние на любой из них
+    python crawl_sharded.py worker --shard 0 --shards 3 --dir /mnt/shared/rb_shards
+    python crawl_sharded.py merge --shards 3 --dir /mnt/shared/rb_shards --json rb_articles.json
+
+    # Кластеры почти одинаковых статей (cluster_id) назначаются при слиянии по всему корпусу
+    python crawl_sharded.py run --shards 4 --max-pages 50 --near-duplicates
+"""
+
+import sys
+import argparse
+import logging
+from multiprocessing import Process
+from pathlib import Path
+
+from scraper import RBScraper
+from scraper.config import (DEFAULT_MAX_WORKERS, DEFAULT_DELAY, BACKENDS, DEFAULT_BACKEND,
+                            PARSER_BACKENDS, DEFAULT_PARSER_BACKEND, DISCOVERY_MODES, DEFAULT_DISCOVERY)
+from scraper.sharding import shard_paths, mark_done, missing_shards, merge_shards
+from scraper.storage import ArticleSink, DataStorage
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(log_file: str = None):
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s',
+        handlers=handlers,
+        force=True
+    )
+
+
+def parse_pages(items) -> dict:
+    """news=2100 stories=440 -> {'news': 2100, 'stories': 440}"""
+    pages = {}
+    for item in items or []:
+        section, _, count = item.partition('=')
+        pages[section] = int(count)
+    return pages
+
+
+def run_worker(args, index: int):
+    """Обход одного шарда; по завершении в каталоге появляется отметка shard-...done.json"""
+    if args.command == 'run':
+        setup_logging(str(Path(args.dir) / f'shard-{index:03d}.log'))
+    paths = shard_paths(args.dir, index, args.shards)
+    scraper = RBScraper(
+        max_workers=args.workers,
+        delay=args.delay,
+        backend=args.backend,
+        # Лимит частоты общий для всего обхода: каждый шард получает свою долю
+        rate=args.rate / args.shards if args.rate else None,
+        parser_backend=args.parser,
+        discovery=args.discovery,
+        frontier_path=paths['frontier'],
+        sink_path=paths['sink'],
+        archive_path=paths['archive'] if args.archive else None,
+        shard=(index, args.shards),
+        # У каждого шарда свой эндпоинт метрик: порт + номер шарда
+        metrics_port=args.metrics_port + index if args.metrics_port is not None else None,
+        streaming=True,
+    )
+    summary = scraper.scrape_all(
+        max_pages_per_section=args.max_pages,
+        pages_config=parse_pages(args.pages),
+        save_milestones=True,
+        milestone_interval=100
+    )
+    mark_done(args.dir, index, args.shards, {'articles': summary['articles'], 'written': summary['written']})
+    logger.info(f"Шард {index}/{args.shards} завершен: {summary['articles']} статей в {paths['sink']}")
+
+
+def merge(args) -> int:
+    missing = missing_shards(args.dir, args.shards)
+    if missing and not args.partial:
+        logger.error(f"Не завершены шарды {missing}; дождитесь их или запустите слияние с --partial")
+        return 1
+    merge_shards(args.dir, args.shards, args.output, near_duplicates=args.near_duplicates)
+    if args.json:
+        DataStorage.save_to_json(ArticleSink.read(args.output), args.json)
+    if args.csv:
+        DataStorage.save_to_csv(ArticleSink.read(args.output), args.csv)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Шардированный обход rb.ru')
+    parser.add_argument('command', choices=('run', 'worker', 'merge'),
+                        help='run - все шарды процессами на этой машине и слияние, '
+                             'worker - один шард, merge - слияние готовых шардов')
+    parser.add_argument('--shards', type=int, required=True, help='количество шардов')
+    parser.add_argument('--shard', type=int, default=None, help='номер шарда для worker (с нуля)')
+    parser.add_argument('--dir', default='rb_shards', help='общий каталог шардов')
+    parser.add_argument('--max-pages', type=int, default=20, help='страниц листинга на раздел')
+    parser.add_argument('--pages', nargs='*', help='страниц по разделам: news=2100 stories=440 ...')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help='потоков загрузки в шарде')
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY, help='задержка между запросами')
+    parser.add_argument('--rate', type=float, default=None, help='общий лимит запросов в секунду на все шарды')
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument('--parser', default=DEFAULT_PARSER_BACKEND, choices=PARSER_BACKENDS)
+    parser.add_argument('--discovery', default=DEFAULT_DISCOVERY, choices=DISCOVERY_MODES)
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='метрики Prometheus: шард i слушает порт metrics-port + i')
+    parser.add_argument('--archive', action='store_true', help='сохранять исходный HTML (архив на шард)')
+    parser.add_argument('--output', default='rb_articles.jsonl', help='итоговый поток после слияния')
+    parser.add_argument('--json', default=None, help='дополнительно выгрузить в JSON')
+    parser.add_argument('--csv', default=None, help='дополнительно выгрузить в CSV')
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help='при слиянии назначить cluster_id почти одинаковым статьям')
+    parser.add_argument('--partial', action='store_true', help='сливать, даже если не все шарды завершены')
+    args = parser.parse_args()
+
+    if args.shards < 1:
+        parser.error('--shards должно быть не меньше 1')
+    Path(args.dir).mkdir(parents=True, exist_ok=True)
+
+    if args.command == 'worker':
+        if args.shard is None or not 0 <= args.shard < args.shards:
+            parser.error('для worker нужен --shard от 0 до --shards - 1')
+        setup_logging(str(Path(args.dir) / f'shard-{args.shard:03d}.log'))
+        run_worker(args, args.shard)
+        return 0
+
+    setup_logging()
+    if args.command == 'run':
+        # Шарды уже завершенные в прошлом запуске не перезапускаются
+        pending = missing_shards(args.dir, args.shards)
+        processes = [Process(target=run_worker, args=(args, index), name=f'shard-{index}') for index in pending]
+        logger.info(f"Запускаю {len(processes)} шардов из {args.shards} в каталоге {args.dir}")
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            if process.exitcode:
+                logger.error(f"Процесс {process.name} завершился с кодом {process.exitcode}")
+    return merge(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
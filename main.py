@@ -4,6 +4,7 @@
 
 import logging
 from scraper import RBScraper
+from scraper.config import DEFAULT_METRICS_PORT
 
 # Настройка логирования
 logging.basicConfig(
@@ -20,7 +21,12 @@ logger = logging.getLogger(__name__)
 def main():
     """Основная функция"""
     # Максимальная параллельность для скорости
-    scraper = RBScraper(max_workers=20, delay=0.3)  # 20 потоков, задержка 0.3 сек
+    # frontier_path - состояние обхода на диске: после падения повторный запуск продолжит с места остановки
+    scraper = RBScraper(max_workers=20, delay=0.3, frontier_path='rb_frontier.db',  # 20 потоков, задержка 0.3 сек
+                        archive_path='rb_archive',  # исходный HTML статей для reprocess.py
+                        metrics_port=DEFAULT_METRICS_PORT,  # метрики стадий: http://127.0.0.1:9108/metrics и сводка в конце
+                        streaming=True,  # статьи только в потоке rb_articles.jsonl, память не растет с корпусом
+                        near_duplicates=True)  # cluster_id почти одинаковых статей для сворачивания выдачи
     
     # Скрапинг всех разделов с разным количеством страниц
     # Цель: собрать 5-20к документов пропорционально объему каждого раздела
@@ -47,27 +53,31 @@ def main():
     }
     
     # Итого: ~15,000 статей (в пределах целевого диапазона 5-20к)
-    # save_milestones=True - сохраняет после каждого раздела
-    # milestone_interval=100 - сохранять каждые 100 статей
-    articles = scraper.scrape_all(
+    # Каждая статья сразу дописывается в поток rb_articles.jsonl и в памяти не хранится,
+    # поэтому scrape_all возвращает сводку (количество статей по разделам), а не список
+    # save_milestones=True - сбрасывать поток на диск после каждого раздела
+    # milestone_interval=100 - и дополнительно каждые 100 статей
+    summary = scraper.scrape_all(
         max_pages_per_section=50, 
         pages_config=pages_config,
         save_milestones=True,  # Сохранять после каждого раздела
         milestone_interval=100  # И дополнительно каждые 100 статей
     )
     
-    logger.info(f"Всего скраплено статей: {len(articles)}")
+    logger.info(f"Всего скраплено статей: {summary['articles']} ({summary['sections']})")
     
-    # Финальное сохранение данных
+    # Финальное сохранение данных: JSON и CSV строятся из потока rb_articles.jsonl
     # Можно сохранить только в один формат, если нужно:
-    scraper.save_to_json('rb_articles.json')  # Для программной обработки
-    scraper.save_to_csv('rb_articles.csv')    # Для Excel/pandas анализа
+    scraper.export('rb_articles.json', 'rb_articles.csv')
     
     # Или только JSON (быстрее):
-    # scraper.save_to_json('rb_articles.json')
+    # scraper.export('rb_articles.json', None)
     
     # Или только CSV:
-    # scraper.save_to_csv('rb_articles.csv')
+    # scraper.export(None, 'rb_articles.csv')
+    
+    # Колоночный корпус Parquet (полный текст, списки компаний/людей, суммы; нужен pyarrow):
+    # scraper.export(None, None, 'rb_articles.parquet')
     
     logger.info("Скрапинг завершен!")
 
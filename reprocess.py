@@ -0,0 +1,50 @@
+"""
+Повторный парсинг статей из архива исходного HTML (без загрузки из сети)
+Используется после изменений в парсере или извлечении данных
+
+Использование:
+    python reprocess.py [rb_archive] [--output rb_articles_reprocessed.jsonl] [--workers 8] [--parser lxml]
+                        [--near-duplicates]
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from scraper.config import DEFAULT_ARCHIVE_PATH, DEFAULT_PARSER_BACKEND, PARSER_BACKENDS
+from scraper.reprocess import reprocess
+from scraper.storage import ArticleSink, DataStorage
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Повторный парсинг статей из архива HTML')
+    parser.add_argument('archive', nargs='?', default=DEFAULT_ARCHIVE_PATH, help='каталог архива')
+    parser.add_argument('--output', default='rb_articles_reprocessed.jsonl', help='файл JSON Lines со статьями')
+    parser.add_argument('--workers', type=int, default=None, help='процессов-парсеров (по умолчанию - число ядер)')
+    parser.add_argument('--parser', default=DEFAULT_PARSER_BACKEND, choices=PARSER_BACKENDS, help='парсер статей')
+    parser.add_argument('--near-duplicates', action='store_true', help='назначить cluster_id почти одинаковым статьям')
+    parser.add_argument('--json', default=None, help='дополнительно выгрузить в JSON')
+    parser.add_argument('--csv', default=None, help='дополнительно выгрузить в CSV')
+    args = parser.parse_args()
+
+    if not (Path(args.archive) / 'index.db').exists():
+        logger.error(f"Архив {args.archive} не найден. Запустите скрапер с archive_path='{args.archive}'")
+        return
+
+    reprocess(args.archive, args.output, workers=args.workers, parser_backend=args.parser,
+              near_duplicates=args.near_duplicates)
+
+    if args.json:
+        DataStorage.save_to_json(ArticleSink.read(args.output), args.json)
+    if args.csv:
+        DataStorage.save_to_csv(ArticleSink.read(args.output), args.csv)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,14 @@
 """
 Скрипт для принудительного сохранения текущих статей
-Используйте если скрапер работает и нужно сохранить уже собранные данные
+Читает фронтир обхода (rb_frontier.db), поэтому работает и пока скрапер
+еще идет, и после его падения
 """
 
+import sys
 import logging
-from scraper import RBScraper
-import json
+from pathlib import Path
+from scraper.frontier import CrawlFrontier
+from scraper.storage import DataStorage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,20 +16,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Если у вас уже есть скрапер с данными, можно сохранить их так:
-# Но проще всего - дождаться завершения раздела или использовать Ctrl+C и сохранить
 
-# Альтернатива: если скрапер работает в другом процессе,
-# можно прочитать логи и понять, сколько статей собрано
+def main():
+    frontier_path = sys.argv[1] if len(sys.argv) > 1 else 'rb_frontier.db'
+    if not Path(frontier_path).exists():
+        logger.error(f"Фронтир {frontier_path} не найден. Запустите скрапер с frontier_path='{frontier_path}'")
+        return
+    
+    frontier = CrawlFrontier(frontier_path)
+    logger.info(f"Состояние обхода: {frontier.counts()}")
+    articles = frontier.load_articles()
+    frontier.close()
+    
+    DataStorage.save_to_json(articles, 'rb_articles_current.json')
+    DataStorage.save_to_csv(articles, 'rb_articles_current.csv')
+    logger.info(f"Сохранено {len(articles)} статей")
+    logger.info("Для продолжения скрапинга просто запустите main.py еще раз")
 
-logger.info("Для сохранения текущих данных:")
-logger.info("1. Если скрапер еще работает - дождитесь завершения раздела (сохранение происходит автоматически)")
-logger.info("2. Или прервите скрапер (Ctrl+C) и он сохранит данные при завершении")
-logger.info("3. Или используйте этот скрипт, если у вас есть доступ к объекту scraper")
-
-# Если у вас есть доступ к scraper объекту:
-# scraper = RBScraper()
-# scraper.articles = [...]  # Ваши статьи
-# scraper.save_to_json('rb_articles_current.json')
-# scraper.save_to_csv('rb_articles_current.csv')
 
+if __name__ == '__main__':
+    main()
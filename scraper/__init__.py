@@ -2,8 +2,14 @@
 Пакет скрапера для сайта rb.ru
 """
 
-from .scraper import RBScraper
-
 __all__ = ['RBScraper']
 __version__ = '1.0.0'
 
+
+def __getattr__(name):
+    # RBScraper импортируется при первом обращении: scraper.records и scraper.storage
+    # нужны индексатору search_app, у которого нет зависимостей скрапера (requests, bs4)
+    if name == 'RBScraper':
+        from .scraper import RBScraper
+        return RBScraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,294 @@
+"""
+Аналитика корпуса статей без Elasticsearch: объемы по разделам и месяцам, доля статей
+с извлеченными полями, самые частые компании, люди, теги и рубрики, распределение
+сумм по валютам и множителям
+
+Все расчеты - векторные операции Arrow и NumPy над колонками корпуса (без цикла
+по статьям). Отчет кэшируется на диске по хэшу файла корпуса.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+from .config import ANALYTICS_CACHE_DIR, ANALYTICS_TOP_N
+from .storage import DataStorage
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении состава отчета: старые записи кэша перестают совпадать
+ANALYTICS_VERSION = 1
+
+# Колонки, которые нужны отчету (текст статьи не читается)
+ANALYTICS_COLUMNS = ['url', 'content_type', 'author', 'date', 'tags', 'categories', 'companies',
+                     'people', 'money']
+TOP_FIELDS = ('companies', 'people', 'tags', 'categories')
+COVERAGE_FIELDS = ('author', 'date', 'tags', 'categories', 'companies', 'people', 'money')
+MULTIPLIER_VALUES = {'тыс': 1e3, 'млн': 1e6, 'млрд': 1e9}
+QUANTILES = (0.5, 0.9)
+UNKNOWN = 'unknown'
+
+_HASH_CHUNK = 4 * 1024 * 1024
+
+
+class CorpusAnalytics:
+    """
+    Расчет отчета по таблице Arrow с колонками ANALYTICS_COLUMNS
+
+    Пример:
+        analytics = CorpusAnalytics.from_file('rb_articles.parquet')
+        report = analytics.report()
+    """
+
+    def __init__(self, table: 'pa.Table', top: int = ANALYTICS_TOP_N):
+        """
+        Args:
+            table: Корпус (колонки как в article_schema(), хотя бы ANALYTICS_COLUMNS)
+            top: Длина списков самых частых значений
+        """
+        if pa is None:
+            raise ImportError("Для аналитики корпуса требуется библиотека pyarrow")
+        self.table = table
+        self.top = top
+        # Раздел статьи (пустой content_type - unknown): ключ всех разбивок по разделам
+        self.sections = pc.if_else(pc.equal(table['content_type'], ''), UNKNOWN,
+                                   pc.fill_null(table['content_type'], UNKNOWN))
+
+    @classmethod
+    def from_file(cls, filename: str, top: int = ANALYTICS_TOP_N) -> 'CorpusAnalytics':
+        return cls(DataStorage.load_table(filename, ANALYTICS_COLUMNS), top)
+
+    def report(self) -> Dict:
+        return {
+            'articles': self.table.num_rows,
+            'sections': self.section_volumes(),
+            'months': self.month_volumes(),
+            'coverage': self.coverage(),
+            'top': {field: self.top_values(field) for field in TOP_FIELDS},
+            'money': self.money_distribution(),
+        }
+
+    def section_volumes(self) -> Dict[str, int]:
+        """Статей по разделам (по убыванию)"""
+        return _counts(pc.value_counts(self.sections))
+
+    def month_volumes(self) -> Dict[str, int]:
+        """Статей по месяцам публикации (YYYY-MM; дата не в формате ISO - unknown)"""
+        dates = pc.fill_null(self.table['date'], '')
+        months = pc.if_else(pc.match_substring_regex(dates, r'^\d{4}-\d{2}'),
+                            pc.utf8_slice_codeunits(dates, 0, 7), UNKNOWN)
+        counts = _counts(pc.value_counts(months))
+        return dict(sorted(counts.items()))
+
+    def filled(self, field: str) -> np.ndarray:
+        """Маска статей, у которых поле заполнено (непустая строка или список)"""
+        column = self.table[field]
+        if pa.types.is_list(column.type):
+            mask = pc.greater(pc.list_value_length(column), 0)
+        else:
+            mask = pc.not_equal(column, '')
+        return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+    def coverage(self) -> Dict[str, Dict[str, float]]:
+        """
+        Доля статей с заполненным полем: по всему корпусу (all) и по разделам
+
+        Returns:
+            {'companies': {'all': 0.82, 'news': 0.85, ...}, ...}
+        """
+        sections, codes = np.unique(self.sections.to_numpy(zero_copy_only=False), return_inverse=True)
+        sizes = np.bincount(codes, minlength=len(sections))
+        result = {}
+        for field in COVERAGE_FIELDS:
+            mask = self.filled(field)
+            rates = {'all': float(mask.mean()) if len(mask) else 0.0}
+            hits = np.bincount(codes, weights=mask, minlength=len(sections))
+            rates.update((str(section), float(hit / size)) for section, hit, size in zip(sections, hits, sizes))
+            result[field] = rates
+        return result
+
+    def top_values(self, field: str) -> Dict:
+        """
+        Самые частые значения списочного поля
+
+        Returns:
+            {'distinct': число разных значений, 'mentions': всего упоминаний,
+             'values': [(значение, упоминаний), ...] по убыванию}
+        """
+        values = pc.list_flatten(self.table[field])
+        values = values.filter(pc.not_equal(values, ''))
+        counts = pc.value_counts(values)
+        names = counts.field('values').to_numpy(zero_copy_only=False)
+        numbers = counts.field('counts').to_numpy()
+        top = min(self.top, len(numbers))
+        # Частичная сортировка: полный порядок нужен только для первых top значений
+        order = np.argpartition(-numbers, top - 1)[:top] if top else np.array([], dtype=int)
+        order = order[np.lexsort((names[order], -numbers[order]))]
+        return {
+            'distinct': len(numbers),
+            'mentions': int(numbers.sum()),
+            'values': [(str(names[i]), int(numbers[i])) for i in order],
+        }
+
+    def money_amounts(self) -> Dict[str, np.ndarray]:
+        """
+        Все упоминания сумм колонками NumPy
+
+        Returns:
+            {'currencies' - названия валют, 'currency' - номер валюты в currencies,
+             'multiplier' - номер в MULTIPLIER_VALUES (len(MULTIPLIER_VALUES) - без множителя),
+             'amount' - число из текста, 'value' - сумма в единицах валюты (amount x множитель)}
+        """
+        money = pc.list_flatten(self.table['money'])
+        amounts = pc.struct_field(money, 'amount')
+        # Суммы из extract_money - числа с точкой; остальные (ручные правки корпуса) пропускаются
+        valid = pc.fill_null(pc.match_substring_regex(amounts, r'^\d+(\.\d+)?$'), False)
+        if not pc.all(valid).as_py():
+            money = money.filter(valid)
+            amounts = pc.struct_field(money, 'amount')
+        amount = pc.cast(amounts, pa.float64()).to_numpy(zero_copy_only=False)
+        # Валюты и множители - номерами: сравнение чисел, а не строк
+        currencies = pc.dictionary_encode(pc.fill_null(pc.struct_field(money, 'currency'), '')).combine_chunks()
+        multipliers = pc.fill_null(pc.index_in(pc.struct_field(money, 'multiplier'),
+                                               value_set=pa.array(list(MULTIPLIER_VALUES))),
+                                   len(MULTIPLIER_VALUES)).to_numpy(zero_copy_only=False)
+        # Множитель без числового значения считается единицей
+        factors = np.append(np.array(list(MULTIPLIER_VALUES.values())), 1.0)
+        return {
+            'currencies': currencies.dictionary.to_pylist(),
+            'currency': currencies.indices.to_numpy(zero_copy_only=False),
+            'multiplier': multipliers,
+            'amount': amount,
+            'value': amount * factors[multipliers],
+        }
+
+    def money_distribution(self) -> List[Dict]:
+        """
+        Распределение сумм по валютам и множителям
+
+        Для каждой валюты - строка по всем множителям (multiplier='') и строки по каждому:
+        количество, минимум, квантили, максимум и итог в единицах валюты, а также
+        гистограмма по порядкам величины ({'1e6': n, ...}, только в строке валюты).
+        """
+        money = self.money_amounts()
+        values = money['value']
+        groups = []
+        for code, currency in enumerate(money['currencies']):
+            in_currency = money['currency'] == code
+            if not in_currency.any():
+                continue
+            group = [_distribution(currency, '', values[in_currency], histogram=True)]
+            for index, multiplier in enumerate(MULTIPLIER_VALUES):
+                selected = in_currency & (money['multiplier'] == index)
+                if selected.any():
+                    group.append(_distribution(currency, multiplier, values[selected]))
+            groups.append(group)
+        # Валюты по убыванию числа упоминаний, внутри - строка валюты и множители по возрастанию
+        groups.sort(key=lambda group: (-group[0]['count'], group[0]['currency']))
+        return [row for group in groups for row in group]
+
+
+def _counts(value_counts: 'pa.StructArray') -> Dict[str, int]:
+    names = value_counts.field('values').to_pylist()
+    numbers = value_counts.field('counts').to_numpy()
+    order = np.argsort(-numbers, kind='stable')
+    return {str(names[i]): int(numbers[i]) for i in order}
+
+
+def _distribution(currency: str, multiplier: str, values: np.ndarray, histogram: bool = False) -> Dict:
+    quantiles = np.quantile(values, QUANTILES)
+    row = {
+        'currency': currency,
+        'multiplier': multiplier,
+        'count': int(len(values)),
+        'min': float(values.min()),
+        **{f'p{round(q * 100)}': float(value) for q, value in zip(QUANTILES, quantiles)},
+        'max': float(values.max()),
+        'total': float(values.sum()),
+    }
+    if histogram:
+        orders, counts = np.unique(np.floor(np.log10(np.maximum(values, 1))).astype(int), return_counts=True)
+        row['orders'] = {f'1e{order}': int(count) for order, count in zip(orders, counts)}
+    return row
+
+
+class AnalyticsCache:
+    """
+    Кэш отчетов на диске: файл JSON на каждый ключ
+
+    Ключ - хэш содержимого файла корпуса, версия отчета и его параметры, поэтому
+    измененный (дописанный, пересобранный) корпус считается заново, а повторный
+    запуск по тому же файлу читает готовый отчет.
+    """
+
+    def __init__(self, directory: str = ANALYTICS_CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def file_hash(filename: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, filename: str, top: int) -> str:
+        return f'{self.file_hash(filename)}-v{ANALYTICS_VERSION}-top{top}'
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self.path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Не удалось прочитать кэш аналитики {self.path(key)}: {e}")
+            return None
+
+    def put(self, key: str, report: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        # Запись через временный файл: прерванный запуск не оставляет обрезанный отчет
+        tmp_path = f'{self.path(key)}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path(key))
+
+
+def analyze(filename: str, top: int = ANALYTICS_TOP_N, cache_dir: Optional[str] = ANALYTICS_CACHE_DIR) -> Dict:
+    """
+    Отчет по файлу корпуса (.parquet, .json, .jsonl[.gz|.zst]) с кэшем
+
+    Args:
+        filename: Файл корпуса
+        top: Длина списков самых частых значений
+        cache_dir: Каталог кэша (None - без кэша)
+
+    Returns:
+        Отчет CorpusAnalytics.report() и поля corpus, cached (отчет взят из кэша)
+    """
+    cache = AnalyticsCache(cache_dir) if cache_dir else None
+    key = cache.key(filename, top) if cache else None
+    if cache:
+        report = cache.get(key)
+        if report is not None:
+            logger.info(f"Отчет по {filename} взят из кэша {cache.path(key)}")
+            return dict(report, cached=True)
+
+    report = CorpusAnalytics.from_file(filename, top).report()
+    report['corpus'] = filename
+    if cache:
+        cache.put(key, report)
+    return dict(report, cached=False)
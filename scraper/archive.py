@@ -0,0 +1,182 @@
+"""
+Архив исходного HTML статей: сегменты в формате WARC (по gzip-члену на запись)
+и индекс по URL в SQLite
+"""
+
+import gzip
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .config import DEFAULT_ARCHIVE_PATH, ARCHIVE_SEGMENT_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class PageArchive:
+    """
+    Хранилище страниц с адресацией по содержимому
+
+    Каждая уникальная страница (по SHA-256 HTML) пишется один раз отдельной записью
+    WARC 'resource', сжатой своим gzip-членом, поэтому сегмент читается и стандартными
+    инструментами для .warc.gz, и выборочно по смещению. Индекс хранит для URL хэш
+    содержимого и время загрузки, для хэша - сегмент, смещение и длину записи.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, segment_size: int = ARCHIVE_SEGMENT_SIZE):
+        """
+        Args:
+            path: Каталог архива (создается при необходимости)
+            segment_size: Размер сегмента (байты), после которого начинается новый файл
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path / 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+        row = self.conn.execute('SELECT MAX(segment) FROM blobs').fetchone()
+        self._segment = row[0] or 0
+        self._file = None
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.path / f'segment-{segment:05d}.warc.gz'
+
+    def _open_segment(self):
+        """Текущий сегмент для дозаписи (новый, если текущий заполнен)"""
+        if self._file is not None and self._file.tell() >= self.segment_size:
+            self._file.close()
+            self._file = None
+            self._segment += 1
+        if self._file is None:
+            path = self._segment_path(self._segment)
+            if path.exists() and path.stat().st_size >= self.segment_size:
+                self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+        return self._file
+
+    @staticmethod
+    def _record(url: str, payload: bytes, digest: str, fetched_at: str) -> bytes:
+        headers = (
+            'WARC/1.1\r\n'
+            'WARC-Type: resource\r\n'
+            f'WARC-Target-URI: {url}\r\n'
+            f'WARC-Date: {fetched_at}\r\n'
+            f'WARC-Payload-Digest: sha256:{digest}\r\n'
+            'Content-Type: text/html; charset=utf-8\r\n'
+            f'Content-Length: {len(payload)}\r\n'
+            '\r\n'
+        )
+        return gzip.compress(headers.encode('utf-8') + payload + b'\r\n\r\n')
+
+    def put(self, url: str, html: str) -> str:
+        """
+        Сохранение страницы
+
+        Args:
+            url: URL статьи
+            html: HTML страницы
+
+        Returns:
+            Хэш содержимого (повторная страница с тем же HTML не пишется второй раз)
+        """
+        payload = html.encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        fetched_at = datetime.now().isoformat()
+
+        with self._lock, self.conn:
+            known = self.conn.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            if not known:
+                record = self._record(url, payload, digest, fetched_at)
+                segment_file = self._open_segment()
+                offset = segment_file.tell()
+                segment_file.write(record)
+                segment_file.flush()
+                self.conn.execute('INSERT INTO blobs (digest, segment, offset, length) VALUES (?, ?, ?, ?)',
+                                  (digest, self._segment, offset, len(record)))
+            self.conn.execute('INSERT OR REPLACE INTO pages (url, digest, fetched_at) VALUES (?, ?, ?)',
+                              (url, digest, fetched_at))
+        return digest
+
+    def _read_record(self, segment: int, offset: int, length: int, handles: Dict[int, object]) -> str:
+        handle = handles.get(segment)
+        if handle is None:
+            handle = handles[segment] = open(self._segment_path(segment), 'rb')
+        handle.seek(offset)
+        record = gzip.decompress(handle.read(length))
+        _, payload = record.split(b'\r\n\r\n', 1)
+        return payload[:-4].decode('utf-8')
+
+    def get(self, url: str) -> Optional[str]:
+        """HTML страницы из архива или None"""
+        row = self.conn.execute(
+            'SELECT b.segment, b.offset, b.length FROM pages p JOIN blobs b ON b.digest = p.digest '
+            'WHERE p.url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        handles = {}
+        try:
+            return self._read_record(*row, handles)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def __contains__(self, url: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM pages WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def fetched_at(self) -> Dict[str, str]:
+        """Время загрузки каждой страницы: {url: ISO дата}"""
+        return dict(self.conn.execute('SELECT url, fetched_at FROM pages'))
+
+    def iter_pages(self) -> Iterator[Tuple[str, str]]:
+        """
+        Все страницы архива в порядке расположения в сегментах (последовательное чтение)
+
+        Yields:
+            Пары (url, html)
+        """
+        # Отдельное соединение: архив может читаться из другого потока
+        conn = sqlite3.connect(str(self.path / 'index.db'))
+        handles = {}
+        try:
+            rows = conn.execute(
+                'SELECT p.url, b.segment, b.offset, b.length FROM pages p JOIN blobs b ON b.digest = p.digest '
+                'ORDER BY b.segment, b.offset'
+            )
+            for url, segment, offset, length in rows:
+                yield url, self._read_record(segment, offset, length, handles)
+        finally:
+            conn.close()
+            for handle in handles.values():
+                handle.close()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.conn.close()
@@ -0,0 +1,284 @@
+"""
+Модуль асинхронной загрузки страниц (asyncio + aiohttp)
+"""
+
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple
+from fake_useragent import UserAgent
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .config import (BASE_URL, DEFAULT_TIMEOUT, DEFAULT_RETRIES, DEFAULT_ASYNC_CONCURRENCY,
+                     DEFAULT_POOL_SIZE, DEFAULT_KEEPALIVE_TIMEOUT, THREAD_WINDOW_FACTOR)
+from .rate_limiter import RateLimiter
+from .http_cache import HTTPCache
+from .concurrency import AdaptiveConcurrency, AsyncSlots
+from .retry_queue import RetryQueue
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPClient:
+    """
+    Асинхронный клиент с пулом keep-alive соединений
+
+    Все запросы выполняются в одном потоке: число одновременных запросов
+    ограничено семафором (concurrency), а число открытых TCP соединений - пулом (pool_size).
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_ASYNC_CONCURRENCY, pool_size: int = DEFAULT_POOL_SIZE,
+                 delay: float = 0.0, timeout: int = DEFAULT_TIMEOUT,
+                 keepalive_timeout: int = DEFAULT_KEEPALIVE_TIMEOUT,
+                 rate_limiter: Optional[RateLimiter] = None, cache: Optional[HTTPCache] = None,
+                 controller: Optional[AdaptiveConcurrency] = None, origin: Optional[str] = None,
+                 observer=None):
+        """
+        Инициализация асинхронного HTTP клиента
+
+        Args:
+            concurrency: Максимальное количество одновременных запросов
+            pool_size: Максимальное количество открытых соединений в пуле
+            delay: Задержка после каждого запроса в рамках одного слота (секунды)
+            timeout: Таймаут запроса (секунды)
+            keepalive_timeout: Время жизни простаивающего соединения (секунды)
+            rate_limiter: Общий лимитер частоты запросов (если задан, каждый запрос ждет токен)
+            cache: HTTP кэш на диске (свежие ответы отдаются без запроса, устаревшие проверяются)
+            controller: Адаптивный лимит одновременных запросов; concurrency тогда - верхняя граница
+            origin: Адрес, на который на самом деле уходят запросы к BASE_URL (симулятор, зеркало)
+            observer: Получатель времени каждого запроса (объект с методом record, см. HTTPClient)
+        """
+        if aiohttp is None:
+            raise ImportError("Для асинхронного бэкенда требуется библиотека aiohttp")
+
+        self.ua = UserAgent()
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self.delay = delay
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.controller = controller
+        self.origin = origin.rstrip('/') if origin else None
+        self.observer = observer
+
+    def target(self, url: str) -> str:
+        """Фактический адрес запроса (с подменой BASE_URL на origin)"""
+        if self.origin and url.startswith(BASE_URL):
+            return self.origin + url[len(BASE_URL):]
+        return url
+
+    def _record(self, latency: float, ok: bool, throttled: bool = False, revalidated: bool = False):
+        """Передача времени запроса контроллеру, наблюдателю и в метрики (revalidated - ответ 304)"""
+        for receiver in (self.controller, self.observer):
+            if receiver is not None:
+                receiver.record(latency, ok, throttled, revalidated)
+        metrics.observe('rb_fetch_seconds', latency)
+
+    def get_headers(self) -> dict:
+        """Генерация заголовков для запроса (соединение переиспользуется)"""
+        return {
+            'User-Agent': self.ua.random,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Cache-Control': 'no-cache',
+        }
+
+    def create_session(self) -> 'aiohttp.ClientSession':
+        """Создание сессии с ограниченным пулом keep-alive соединений"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self._trace_config()] if metrics.enabled() else None
+        )
+
+    @staticmethod
+    def _trace_config() -> 'aiohttp.TraceConfig':
+        """Трассировка aiohttp: время DNS и установки новых соединений в метрики"""
+        trace = aiohttp.TraceConfig()
+
+        def start(phase: str):
+            async def handler(session, context, params):
+                setattr(context, phase, time.monotonic())
+            return handler
+
+        def end(phase: str):
+            async def handler(session, context, params):
+                started = getattr(context, phase, None)
+                if started is not None:
+                    metrics.observe('rb_connect_seconds', time.monotonic() - started, phase=phase)
+            return handler
+
+        trace.on_dns_resolvehost_start.append(start('dns'))
+        trace.on_dns_resolvehost_end.append(end('dns'))
+        trace.on_connection_create_start.append(start('connect'))
+        trace.on_connection_create_end.append(end('connect'))
+        return trace
+
+    async def fetch_html(self, session: 'aiohttp.ClientSession', url: str,
+                         retries: int = DEFAULT_RETRIES) -> Optional[str]:
+        """
+        Загрузка HTML страницы с повторами при ошибке
+
+        Args:
+            session: Сессия aiohttp
+            url: URL страницы
+            retries: Количество попыток при ошибке
+
+        Returns:
+            HTML страницы или None при ошибке
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.hit(entry)
+            return entry['body']
+
+        for attempt in range(retries):
+            if attempt > 0:
+                metrics.inc('rb_retries_total', kind='immediate')
+            start = time.monotonic()
+            try:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire_async(url)
+                    start = time.monotonic()
+                headers = self.get_headers()
+                headers.update(HTTPCache.validators(entry))
+                async with session.get(self.target(url), headers=headers, allow_redirects=True) as response:
+                    metrics.inc('rb_responses_total', status=response.status)
+                    metrics.observe('rb_fetch_wait_seconds', time.monotonic() - start)
+                    if response.status == 304 and entry is not None:
+                        self.cache.hit(entry, revalidated=True)
+                        html = entry['body']
+                    elif response.status == 304:
+                        # 304 без записи в кэше - тела нет: промах, запрос повторяется, в кэш не пишется
+                        html = None
+                    else:
+                        response.raise_for_status()
+                        body = await response.read()
+                        metrics.observe('rb_fetch_bytes', len(body))
+                        html = body.decode('utf-8', errors='replace')
+                        if self.cache is not None:
+                            self.cache.put(url, html, response.headers.get('ETag'),
+                                           response.headers.get('Last-Modified'))
+                self._record(time.monotonic() - start, ok=True, revalidated=response.status == 304)
+                if html is None:
+                    logger.warning(f"Ответ 304 без записи в кэше для {url} (попытка {attempt + 1}/{retries})")
+                    continue
+
+                if self.delay > 0:
+                    await asyncio.sleep(self.delay)
+                return html
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._record(time.monotonic() - start, ok=False,
+                             throttled=getattr(e, 'status', None) in (429, 503))
+                if getattr(e, 'status', None) is None:
+                    metrics.inc('rb_responses_total', status='error')
+                wait_time = min(2 ** attempt, 30)
+                logger.warning(f"Ошибка при загрузке {url} (попытка {attempt + 1}/{retries}): {e}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error(f"Не удалось загрузить {url} после {retries} попыток")
+
+        return None
+
+    async def iter_pages(self, urls: Iterable[str],
+                         retry_queue: Optional[RetryQueue] = None) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        Загрузка набора страниц с выдачей результатов по мере готовности
+
+        Args:
+            urls: URL страниц
+            retry_queue: Очередь повторов; если задана, неудачный URL ждет повтора
+                         вне семафора и не занимает слот загрузки
+
+        Yields:
+            Пары (url, html), html равен None при ошибке
+        """
+        # При адаптивной параллельности число запросов ограничивает текущий лимит контроллера
+        semaphore = AsyncSlots(self.controller) if self.controller else asyncio.Semaphore(self.concurrency)
+
+        async with self.create_session() as session:
+            async def fetch_one(url: str) -> Tuple[str, Optional[str]]:
+                if retry_queue is None:
+                    async with semaphore:
+                        return url, await self.fetch_html(session, url)
+
+                while True:
+                    async with semaphore:
+                        html = await self.fetch_html(session, url, retries=1)
+                    if html is not None:
+                        return url, html
+                    delay = retry_queue.register_failure(url)
+                    if delay is None:
+                        return url, None
+                    await asyncio.sleep(delay)
+
+            # Задачи создаются скользящим окном: загруженный, но не отданный HTML
+            # не копится по всему разделу, медленный потребитель притормаживает загрузку
+            urls = iter(urls)
+            window = self.concurrency * THREAD_WINDOW_FACTOR
+            pending = set()
+
+            def fill():
+                while len(pending) < window:
+                    url = next(urls, None)
+                    if url is None:
+                        break
+                    pending.add(asyncio.ensure_future(fetch_one(url)))
+
+            fill()
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+                    for task in done:
+                        yield task.result()
+                    fill()
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def iter_pages_blocking(self, urls: Iterable[str],
+                            retry_queue: Optional[RetryQueue] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Синхронная обертка над iter_pages для вызова из обычного кода
+
+        Цикл событий продвигается только до следующего готового результата,
+        поэтому потребитель обрабатывает страницы в том же потоке.
+
+        Args:
+            urls: URL страниц
+            retry_queue: Очередь повторов (см. iter_pages)
+
+        Yields:
+            Пары (url, html), html равен None при ошибке
+        """
+        loop = asyncio.new_event_loop()
+        pages = self.iter_pages(urls, retry_queue)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(pages.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.close()
@@ -0,0 +1,184 @@
+"""
+Адаптивное ограничение числа одновременных запросов (AIMD)
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List
+
+from .config import (ADAPTIVE_MIN_CONCURRENCY, ADAPTIVE_MAX_CONCURRENCY, ADAPTIVE_WINDOW,
+                     ADAPTIVE_LATENCY_FACTOR, ADAPTIVE_ERROR_RATE, ADAPTIVE_DECREASE,
+                     ADAPTIVE_BASELINE_WINDOWS)
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0..1) по отсортированному списку"""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class AdaptiveConcurrency:
+    """
+    Контроллер параллельности: аддитивное увеличение, мультипликативное уменьшение
+
+    Клиенты сообщают о каждом запросе (время ответа, успех, ответ 429/503). После каждого
+    окна из window запросов (но не меньше текущего лимита) лимит:
+    - уменьшается в decrease раз, если доля ошибок выше error_rate, был ответ 429/503
+      или медиана времени ответа больше latency_factor * базового времени (запросы
+      начали ждать в очереди сервера);
+    - иначе увеличивается на 1, а до первой перегрузки - удваивается (медленный старт).
+    Базовое время - наименьшая медиана за последние baseline_windows окон, то есть время ответа
+    ненагруженного сайта, поэтому лимит начинается снизу. Окно короче всего обхода: одно быстрое
+    окно (например, из коротких страниц) не держит лимит внизу до конца, а базовое время следует
+    за сайтом, который стал отвечать медленнее. Ответы 304 (подтверждение кэша без тела) в окне
+    считаются, но их время в медиану не входит. Лимит всегда остается в пределах [min_limit, max_limit].
+    """
+
+    def __init__(self, min_limit: int = ADAPTIVE_MIN_CONCURRENCY,
+                 max_limit: int = ADAPTIVE_MAX_CONCURRENCY, window: int = ADAPTIVE_WINDOW,
+                 latency_factor: float = ADAPTIVE_LATENCY_FACTOR, error_rate: float = ADAPTIVE_ERROR_RATE,
+                 decrease: float = ADAPTIVE_DECREASE, baseline_windows: int = ADAPTIVE_BASELINE_WINDOWS):
+        """
+        Args:
+            min_limit: Нижняя граница и начальное значение лимита
+            max_limit: Верхняя граница лимита
+            window: Минимальное число запросов между решениями
+            latency_factor: Во сколько раз медиана может превышать базовое время ответа
+            error_rate: Допустимая доля ошибок в окне
+            decrease: Множитель лимита при перегрузке
+            baseline_windows: Сколько последних окон учитывается в базовом времени
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("Нужно 1 <= min_limit <= max_limit")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.latency_factor = latency_factor
+        self.error_rate = error_rate
+        self.decrease = decrease
+        self.limit = min_limit
+        self.slow_start = True
+        # После уменьшения одно окно пропускается: в нем запросы, начатые еще при старом лимите
+        self._cooldown = False
+        self.baseline = None
+        self._medians = deque(maxlen=max(1, baseline_windows))
+        self.decisions = 0
+        # Сумма лимитов по окнам - для среднего (установившегося) значения
+        self._limit_sum = 0
+        self._active = 0
+        self._latencies: List[float] = []
+        self._count = 0
+        self._errors = 0
+        self._throttled = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Место для одного запроса (блокирует поток, пока в полете limit запросов)"""
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def record(self, latency: float, ok: bool, throttled: bool = False, revalidated: bool = False):
+        """
+        Учет завершенного запроса
+
+        Args:
+            latency: Время запроса (секунды)
+            ok: Запрос завершился успешно
+            throttled: Сайт ответил 429 или 503 (просит снизить нагрузку)
+            revalidated: Ответ 304 без тела - его время не говорит о нагрузке сайта
+        """
+        with self._cond:
+            self._count += 1
+            if not revalidated:
+                self._latencies.append(latency)
+            if not ok:
+                self._errors += 1
+            if throttled:
+                self._throttled += 1
+            if self._count >= max(self.window, self.limit):
+                self._adjust()
+
+    def _adjust(self):
+        """Решение по окну (вызывается под блокировкой)"""
+        if self._cooldown:
+            self._cooldown = False
+            self._latencies = []
+            self._count = self._errors = self._throttled = 0
+            return
+
+        errors = self._errors / self._count
+        p50 = p95 = None
+        if self._latencies:
+            latencies = sorted(self._latencies)
+            p50, p95 = _percentile(latencies, 0.5), _percentile(latencies, 0.95)
+            self._medians.append(p50)
+            self.baseline = min(self._medians)
+
+        old = self.limit
+        if self._throttled:
+            reason = f"ответов 429/503: {self._throttled}"
+        elif errors > self.error_rate:
+            reason = f"ошибок {errors:.0%}"
+        elif p50 is not None and p50 > self.latency_factor * self.baseline:
+            reason = f"p50 {p50:.2f} с > {self.latency_factor:g} x {self.baseline:.2f} с"
+        else:
+            reason = None
+
+        if reason:
+            self.slow_start = False
+            self._cooldown = True
+            self.limit = max(self.min_limit, int(self.limit * self.decrease))
+        else:
+            self.limit = min(self.max_limit, self.limit * 2 if self.slow_start else self.limit + 1)
+            self._cond.notify_all()
+
+        self.decisions += 1
+        self._limit_sum += self.limit
+        self._latencies = []
+        self._count = self._errors = self._throttled = 0
+
+        if self.limit != old:
+            timing = f"p50 {p50:.2f} с, p95 {p95:.2f} с, " if p50 is not None else ''
+            logger.info(f"Параллельность {old} -> {self.limit} ({timing}"
+                        f"ошибок {errors:.0%}{', ' + reason if reason else ''})")
+
+    def stats(self) -> Dict[str, float]:
+        """Текущий и средний по окнам лимит, число решений, базовое время ответа"""
+        with self._cond:
+            average = self._limit_sum / self.decisions if self.decisions else self.limit
+            return {'limit': self.limit, 'average': round(average, 1), 'decisions': self.decisions,
+                    'baseline': self.baseline}
+
+
+class AsyncSlots:
+    """Ограничение корутин текущим лимитом контроллера (создается внутри цикла событий)"""
+
+    def __init__(self, controller: AdaptiveConcurrency):
+        self.controller = controller
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.controller.limit)
+            self._active += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self._active -= 1
+            # Будим столько ожидающих, сколько свободных мест (лимит мог вырасти)
+            self._cond.notify(max(1, self.controller.limit - self._active))
@@ -14,5 +14,117 @@ DEFAULT_DELAY = 0.3
 DEFAULT_TIMEOUT = 15
 DEFAULT_RETRIES = 5
 
+# Общий лимит частоты запросов к одному хосту (None - ограничение только через delay)
+DEFAULT_RATE = None
+DEFAULT_BURST = 5
+
+# Отложенные повторы неудачных загрузок статей
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Потоковая запись статей (JSON Lines)
+DEFAULT_SINK_PATH = 'rb_articles.jsonl'
+SINK_COMPRESSIONS = (None, 'gzip', 'zstd')
+SINK_FLUSH_INTERVAL = 5.0
+SINK_FLUSH_SIZE = 100
+
 ARTICLE_URL_PATTERN = r'/(news|stories|columns|opinions|neuroprofiles|reviews|checklists)/[^/?]+/?$'
 FULL_URL_PATTERN = r'https?://(?:www\.)?rb\.ru/(news|stories|columns|opinions|neuroprofiles|reviews|checklists)/[^/?]+/?$'
+
+# Бэкенды загрузки статей: потоки на requests или asyncio на aiohttp
+BACKENDS = ('threads', 'async')
+DEFAULT_BACKEND = 'threads'
+DEFAULT_ASYNC_CONCURRENCY = 200
+DEFAULT_POOL_SIZE = 100
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+# Окно задач на один поток или слот async (ограничивает число загруженных, но не обработанных страниц)
+THREAD_WINDOW_FACTOR = 2
+
+# Парсер статей: 'bs4' (BeautifulSoup) или 'lxml' (скомпилированные XPath)
+PARSER_BACKENDS = ('bs4', 'lxml')
+DEFAULT_PARSER_BACKEND = 'bs4'
+
+# Конвейер загрузка -> парсинг: процессы-парсеры (0 - выключен) и размер очереди между стадиями
+DEFAULT_PARSE_WORKERS = 0
+PARSE_QUEUE_SIZE = 256
+
+# Кэш селекторов по отпечатку шаблона страницы: глубина обхода DOM для отпечатка
+# и максимальное число запоминаемых шаблонов
+FINGERPRINT_DEPTH = 3
+SELECTOR_CACHE_SIZE = 64
+
+# Файл словаря компаний (одно название на строку), дополняет DataExtractor.KNOWN_COMPANIES
+COMPANIES_GAZETTEER_PATH = None
+
+# Архив исходного HTML статей (для повторного парсинга без загрузки)
+DEFAULT_ARCHIVE_PATH = 'rb_archive'
+ARCHIVE_SEGMENT_SIZE = 256 * 1024 * 1024
+
+# Сколько страниц пагинации листинга загружается одновременно
+DEFAULT_LISTING_CONCURRENCY = 8
+
+# Поиск URL статей: 'listing' (страницы пагинации разделов) или 'sitemap' (sitemap и RSS ленты)
+DISCOVERY_MODES = ('listing', 'sitemap')
+DEFAULT_DISCOVERY = 'listing'
+# Sitemap или индексы sitemap (None - адреса из robots.txt) и RSS/Atom ленты
+SITEMAP_URLS = None
+FEED_URLS = [f"{BASE_URL}/feeds/all/"]
+# Статей на одной странице листинга: в режиме 'sitemap' раздел ограничивается
+# max_pages * ARTICLES_PER_LISTING_PAGE самыми свежими статьями, как при обходе листинга
+ARTICLES_PER_LISTING_PAGE = 5
+
+# Инкрементальный режим: пагинация раздела останавливается после стольких страниц
+# листинга подряд, на которых все статьи уже есть в прошлом результате
+INCREMENTAL_STOP_PAGES = 2
+
+# HTTP кэш на диске: файл, сколько секунд ответ отдается без запроса (дальше - проверка
+# через ETag/Last-Modified) и максимальный суммарный размер сжатых тел
+DEFAULT_HTTP_CACHE_PATH = 'rb_http_cache.db'
+HTTP_CACHE_TTL = 24 * 3600
+HTTP_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+# Листинги и robots.txt меняются постоянно: из кэша они берутся только после ответа 304
+HTTP_CACHE_LISTING_TTL = 0
+
+# Адаптивная параллельность (AIMD): границы лимита одновременных запросов, число запросов
+# между решениями, допустимый рост медианы времени ответа относительно ненагруженного сайта,
+# допустимая доля ошибок и множитель лимита при перегрузке
+ADAPTIVE_MIN_CONCURRENCY = 2
+ADAPTIVE_MAX_CONCURRENCY = 64
+ADAPTIVE_WINDOW = 50
+ADAPTIVE_LATENCY_FACTOR = 2.0
+ADAPTIVE_ERROR_RATE = 0.05
+ADAPTIVE_DECREASE = 0.7
+# Базовое время ответа - наименьшая медиана за столько последних окон
+ADAPTIVE_BASELINE_WINDOWS = 10
+
+# Локальный симулятор rb.ru для бенчмарка (benchmark_scraper.py): страниц листинга на раздел,
+# статей на странице листинга, медиана задержки ответа (секунды) и ее разброс (sigma
+# логнормального распределения), доля ответов 500, медиана числа абзацев в статье и доля
+# статей вне /news/, перепечатывающих текст новости (почти дубликаты)
+SIM_PAGES = 5
+SIM_ARTICLES_PER_PAGE = 20
+SIM_LATENCY = 0.05
+SIM_JITTER = 0.5
+SIM_ERROR_RATE = 0.0
+SIM_PARAGRAPHS = 12
+SIM_DUPLICATE_RATE = 0.0
+
+# Метрики стадий: порт HTTP эндпоинта /metrics в формате Prometheus
+DEFAULT_METRICS_PORT = 9108
+
+# Колоночный корпус Parquet: статей в группе строк (буфер в памяти) и сжатие колонок
+PARQUET_ROW_GROUP_SIZE = 1000
+PARQUET_COMPRESSION = 'zstd'
+
+# Аналитика корпуса (analyze_corpus.py): каталог кэша отчетов (ключ - хэш файла корпуса)
+# и длина списков самых частых компаний, людей, тегов и рубрик
+ANALYTICS_CACHE_DIR = 'rb_analytics_cache'
+ANALYTICS_TOP_N = 20
+
+# Почти одинаковые статьи (MinHash + LSH): длина шингла в словах, число хэш-функций MinHash,
+# число полос LSH (в полосе NEAR_DUP_PERMUTATIONS / NEAR_DUP_BANDS значений) и порог оценки
+# сходства Жаккара, начиная с которого статья попадает в кластер найденной
+NEAR_DUP_SHINGLE = 5
+NEAR_DUP_PERMUTATIONS = 64
+NEAR_DUP_BANDS = 16
+NEAR_DUP_THRESHOLD = 0.8
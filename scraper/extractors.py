@@ -4,7 +4,76 @@
 """
 
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .config import COMPANIES_GAZETTEER_PATH
+from .gazetteer import Gazetteer, read_names
+from .records import Money
+from . import metrics
+
+# Все паттерны компилируются один раз при импорте модуля. Опережающая проверка первого
+# символа в начале паттерна ((?=[...])) позволяет движку re быстро пропускать позиции,
+# с которых совпадение начаться не может (без нее IGNORECASE и \b отключают эту оптимизацию)
+
+# Деньги: "220 млн ₽" / "15 млн долларов" (amount, mult, currency) или "$15 млн" (symbol, amount2, mult2)
+MONEY_PATTERN = re.compile(
+    r'(?=[\d₽$€])'
+    r'(?:(?P<amount>\d+(?:[.,]\d+)?)\s*(?P<mult>млн|млрд|тыс\.?)\s*(?P<currency>[₽$€]|рублей?|долларов?|евро)'
+    r'|(?P<symbol>[₽$€])\s*(?P<amount2>\d+(?:[.,]\d+)?)\s*(?P<mult2>млн|млрд|тыс\.?))',
+    re.IGNORECASE)
+CURRENCIES = {
+    '₽': '₽', 'рублей': '₽', 'рубля': '₽', 'рубль': '₽',
+    '$': '$', 'долларов': '$', 'доллара': '$', 'доллар': '$',
+    '€': '€', 'евро': '€',
+}
+MULTIPLIERS = {'тыс': 'тыс', 'тыс.': 'тыс', 'млн': 'млн', 'млрд': 'млрд'}
+
+# Компании в кавычках «...» или "..." (кавычки не могут входить в название, поэтому
+# совпадения двух видов не пересекаются и ищутся одним проходом)
+QUOTED_PATTERN = re.compile(r'«([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,40}?)»'
+                            r'|"([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,40}?)"')
+QUOTED_ADJECTIVE = re.compile(r'^[А-ЯЁа-яё]+(?:ых|их|ому|ему|ой|ей|ая|ое|ую)$')
+QUOTED_COMMON_PREFIXES = ('серых', 'черных', 'белых', 'новых', 'старых')
+
+# "компания/стартап/оператор/бренд + Название" (со склонениями)
+COMPANY_CONTEXT_PATTERN = re.compile(
+    r'(?=[кспбоэ])'
+    r'(?:компани(?:я|и|ей|ю|ей|ям|ями)|стартап(?:а|у|ом|ы|ов|ам|ами)?|проект(?:а|у|ом|ы|ов|ам|ами)?'
+    r'|сервис(?:а|у|ом|ы|ов|ам|ами)?|банк(?:а|у|ом|и|ов|ам|ами)?|оператор(?:а|у|ом|ы|ов|ам|ами)?'
+    r'|бренд(?:а|у|ом|ы|ов|ам|ами)?|платформ(?:а|ы|е|у|ой|ам|ами)?|экосистем(?:а|ы|е|у|ой|ам|ами)?)'
+    r'\s+([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,35}?)(?:\s|,|\.|$|—|–|:|;|\(|\))',
+    re.IGNORECASE)
+# "Буква+Цифра" или "Буква+Цифра + Слова" (T2, T2 AdTech)
+TECH_COMPANY_PATTERN = re.compile(r'(?=[A-Z])\b([A-Z]\d+(?:\s+[A-Z][a-z]+)*)\b')
+# Названия с точками (Яндекс.Еда, Яндекс.Музыка)
+DOTTED_PATTERN = re.compile(r'(?=[А-ЯЁA-Z])\b([А-ЯЁA-Z][А-Яа-яёA-Za-z]+\.(?:[А-ЯЁA-Z][а-яёa-z]+)+)\b')
+
+ADJECTIVE_ENDINGS = ('ых', 'их', 'ому', 'ему', 'ой', 'ей', 'ая', 'ое', 'ую', 'ем', 'им')
+PREPOSITION_PREFIX = re.compile(r'^(?:при|про|для|над|под|без|от|до|из|к|с|о|об|на|по|за)\s')
+GEO_PREFIXES = ('росси', 'москв', 'петербург', 'санкт')
+COMMON_WORD_PREFIXES = ('рынок', 'решение', 'требование', 'выбор', 'при')
+
+# Люди: Имя Фамилия с заглавных букв
+PERSON_PATTERN = re.compile(r'(?=[А-ЯЁ])\b([А-ЯЁ][а-яё]+)\s+([А-ЯЁ][а-яё]+)\b')
+# Слова, которые не являются именами людей
+NOT_PEOPLE = frozenset({
+    'республика', 'корея', 'яблоко', 'яндекс', 'россия', 'москва',
+    'российский', 'московский', 'российская', 'московская',
+    'северная', 'южная', 'восточная', 'западная',
+    'компания', 'компании', 'компаний', 'компанию',
+    'оператор', 'операторы', 'операторов',
+    'банк', 'банка', 'банку', 'банки', 'банков',
+    'рынок', 'рынка', 'рынке', 'рынком',
+    'решение', 'решения', 'решений',
+    'требование', 'требования', 'требований',
+    'выбор', 'выбора', 'выбору',
+    'при', 'про', 'для', 'над', 'под', 'без',
+    'новый', 'новая', 'новое', 'новые',
+    'старый', 'старая', 'старое', 'старые',
+})
+PERSON_ADJECTIVE_ENDINGS = ('ый', 'ая', 'ое', 'ие', 'ой', 'ей')
+PERSON_GEO_PREFIXES = ('северн', 'южн', 'восточн', 'западн', 'российск', 'московск')
+MAX_PEOPLE = 10
 
 
 class DataExtractor:
@@ -40,11 +109,42 @@ class DataExtractor:
         'Nestle', 'Unilever', 'Procter & Gamble', 'Johnson & Johnson',
     }
     
+    # Автомат по словарю компаний (строится при первом использовании)
+    _gazetteer: Optional[Gazetteer] = None
+    
     # Минимальный набор стоп-слов только для критичных случаев
     # Основная фильтрация через улучшенные паттерны
     
+    @classmethod
+    def gazetteer(cls) -> Gazetteer:
+        """
+        Словарь компаний: KNOWN_COMPANIES и названия из COMPANIES_GAZETTEER_PATH
+        """
+        if cls._gazetteer is None:
+            gazetteer = Gazetteer(sorted(cls.KNOWN_COMPANIES))
+            if COMPANIES_GAZETTEER_PATH:
+                gazetteer.add_all(read_names(COMPANIES_GAZETTEER_PATH))
+            cls._gazetteer = gazetteer
+        return cls._gazetteer
+    
+    @classmethod
+    def load_gazetteer(cls, path: str, replace: bool = False):
+        """
+        Загрузка словаря компаний из файла
+        
+        Args:
+            path: Файл словаря (одно название на строку)
+            replace: Заменить словарь целиком (иначе названия добавляются к текущим)
+        """
+        names = read_names(path)
+        if replace:
+            cls._gazetteer = Gazetteer(names)
+        else:
+            cls.gazetteer().add_all(names)
+    
     @staticmethod
-    def extract_money(text: str) -> List[Dict]:
+    @metrics.timed('rb_extract_seconds', method='money')
+    def extract_money(text: str) -> List[Money]:
         """
         Извлечение упоминаний денежных сумм из текста
         Примеры: "220 млн ₽", "$15 млн", "1,5 млн рублей"
@@ -53,80 +153,37 @@ class DataExtractor:
             text: Текст для анализа
             
         Returns:
-            Список словарей с информацией о деньгах:
-            [{'amount': '220', 'multiplier': 'млн', 'currency': '₽', 'original': '220 млн ₽'}, ...]
+            Список сумм (Money) в порядке упоминания:
+            [Money(amount='220', multiplier='млн', currency='₽', original='220 млн ₽'), ...]
         """
         money_list = []
-        
-        # Паттерны для извлечения денежных сумм с полной информацией
-        patterns = [
-            # "220 млн ₽" или "220 млн рублей"
-            r'(\d+(?:[.,]\d+)?)\s*(млн|млрд|тыс\.?)\s*([₽$€]|рублей?|долларов?|евро)',
-            # "$15 млн" или "₽15 млн"
-            r'([₽$€])\s*(\d+(?:[.,]\d+)?)\s*(млн|млрд|тыс\.?)',
-            # "15 млн долларов" или "15 млн рублей"
-            r'(\d+(?:[.,]\d+)?)\s*(млн|млрд|тыс\.?)\s*(рублей?|долларов?|евро)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                groups = match.groups()
-                original = match.group(0)
-                
-                money_info = {
-                    'amount': '',
-                    'multiplier': '',
-                    'currency': '',
-                    'original': original
-                }
-                
-                # Обрабатываем разные форматы паттернов
-                if len(groups) == 3:
-                    if groups[0].isdigit() or '.' in groups[0] or ',' in groups[0]:
-                        # Формат: "220 млн ₽"
-                        money_info['amount'] = groups[0].replace(',', '.')
-                        money_info['multiplier'] = groups[1].lower().rstrip('.')
-                        currency = groups[2].lower()
-                        if currency in ['₽', 'рублей', 'рубля', 'рубль']:
-                            money_info['currency'] = '₽'
-                        elif currency in ['$', 'долларов', 'доллара', 'доллар']:
-                            money_info['currency'] = '$'
-                        elif currency in ['€', 'евро']:
-                            money_info['currency'] = '€'
-                        else:
-                            money_info['currency'] = currency
-                    else:
-                        # Формат: "$15 млн"
-                        money_info['currency'] = groups[0]
-                        money_info['amount'] = groups[1].replace(',', '.')
-                        money_info['multiplier'] = groups[2].lower().rstrip('.')
-                
-                # Нормализуем multiplier
-                if money_info['multiplier']:
-                    if 'тыс' in money_info['multiplier']:
-                        money_info['multiplier'] = 'тыс'
-                    elif 'млн' in money_info['multiplier']:
-                        money_info['multiplier'] = 'млн'
-                    elif 'млрд' in money_info['multiplier']:
-                        money_info['multiplier'] = 'млрд'
-                
-                # Добавляем только если есть все необходимые поля
-                if money_info['amount'] and money_info['multiplier']:
-                    money_list.append(money_info)
-        
-        # Убираем дубликаты по оригинальной строке
         seen = set()
-        unique_money = []
-        for money in money_list:
-            key = money['original'].lower()
-            if key not in seen:
-                seen.add(key)
-                unique_money.append(money)
         
-        return unique_money
+        # Один проход: оба формата собраны в одно выражение, пересекающиеся
+        # записи ("$15 млн долларов") дают одно упоминание
+        for match in MONEY_PATTERN.finditer(text):
+            original = match.group(0)
+            key = original.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            if match.group('amount') is not None:
+                # Формат: "220 млн ₽"
+                amount, multiplier = match.group('amount'), match.group('mult')
+                currency = match.group('currency').lower()
+                currency = CURRENCIES.get(currency, currency)
+            else:
+                # Формат: "$15 млн"
+                amount, multiplier = match.group('amount2'), match.group('mult2')
+                currency = match.group('symbol')
+            
+            money_list.append(Money(amount.replace(',', '.'), MULTIPLIERS[multiplier.lower()], currency, original))
+        
+        return money_list
     
     @classmethod
+    @metrics.timed('rb_extract_seconds', method='companies')
     def extract_companies(cls, text: str) -> List[str]:
         """
         Извлечение упоминаний компаний через улучшенные паттерны
@@ -137,92 +194,58 @@ class DataExtractor:
         Returns:
             Список найденных компаний
         """
-        companies = set()
+        # 1. Известные компании из словаря (точное совпадение слова без учета регистра).
+        # Покрывает и аббревиатуры (МТС, ВТБ): их точное совпадение с учетом регистра
+        # всегда является и совпадением без учета регистра
+        companies = cls.gazetteer().find(text)
         
-        # 1. Известные компании из словаря (точное совпадение слова)
-        text_lower = text.lower()
-        for company in cls.KNOWN_COMPANIES:
-            pattern = r'\b' + re.escape(company.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                companies.add(company)
-        
-        # 2. Компании в кавычках «...» или "..."
-        # Ищем паттерн: «Название» или "Название" где название начинается с заглавной
-        quoted_patterns = [
-            r'«([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,40}?)»',  # Русские кавычки
-            r'"([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,40}?)"',   # Английские кавычки
-        ]
-        for pattern in quoted_patterns:
-            quoted = re.findall(pattern, text)
-            for q in quoted:
-                q_clean = q.strip()
-                # Проверяем что это не прилагательное и не общее слово
-                if (len(q_clean) >= 2 and 
-                    q_clean[0].isupper() and
-                    not re.match(r'^[А-ЯЁа-яё]+(?:ых|их|ому|ему|ой|ей|ая|ое|ую)$', q_clean.lower()) and
-                    # Исключаем общие слова
-                    not re.match(r'^(?:серых|черных|белых|новых|старых)', q_clean.lower())):
-                    companies.add(q_clean)
+        # 2. Компании в кавычках «...» или "..." (название начинается с заглавной)
+        for quoted in QUOTED_PATTERN.findall(text):
+            q_clean = (quoted[0] or quoted[1]).strip()
+            q_lower = q_clean.lower()
+            # Проверяем что это не прилагательное и не общее слово
+            if (len(q_clean) >= 2 and
+                q_clean[0].isupper() and
+                not QUOTED_ADJECTIVE.match(q_lower) and
+                not q_lower.startswith(QUOTED_COMMON_PREFIXES)):
+                companies.add(q_clean)
         
         # 3. Паттерн: "компания/стартап/оператор/бренд + Название" (со склонениями)
-        # Склонения слова "компания": компания, компании, компаний, компанию, компанией, компаниям
-        # Склонения слова "оператор": оператор, оператора, оператору, оператором, операторы, операторов
-        company_context_pattern = r'(?:компани(?:я|и|ей|ю|ей|ям|ями)|стартап(?:а|у|ом|ы|ов|ам|ами)?|проект(?:а|у|ом|ы|ов|ам|ами)?|сервис(?:а|у|ом|ы|ов|ам|ами)?|банк(?:а|у|ом|и|ов|ам|ами)?|оператор(?:а|у|ом|ы|ов|ам|ами)?|бренд(?:а|у|ом|ы|ов|ам|ами)?|платформ(?:а|ы|е|у|ой|ам|ами)?|экосистем(?:а|ы|е|у|ой|ам|ами)?)\s+([А-ЯЁA-Z][А-Яа-яёA-Za-z0-9\.\s]{2,35}?)(?:\s|,|\.|$|—|–|:|;|\(|\))'
-        matches = re.findall(company_context_pattern, text, re.IGNORECASE)
-        for match in matches:
-            match_clean = match.strip()
+        for match in COMPANY_CONTEXT_PATTERN.findall(text):
             # Убираем лишние пробелы и проверяем формат
-            match_clean = ' '.join(match_clean.split())
+            match_clean = ' '.join(match.split())
+            match_lower = match_clean.lower()
             # Исключаем если заканчивается на прилагательное или предлог
             if (2 <= len(match_clean) <= 40 and
                 match_clean[0].isupper() and
-                not re.search(r'(?:ых|их|ому|ему|ой|ей|ая|ое|ую|ем|им|ую)$', match_clean.lower()) and
-                not re.match(r'^(?:при|про|для|над|под|без|от|до|из|к|с|о|об|на|по|за)\s', match_clean.lower())):
+                not match_lower.endswith(ADJECTIVE_ENDINGS) and
+                not PREPOSITION_PREFIX.match(match_lower)):
                 companies.add(match_clean)
         
         # 4. Названия в формате "Буква+Цифра" или "Буква+Цифра + Слова" (T2, T2 AdTech)
-        tech_company_pattern = r'\b([A-Z]\d+(?:\s+[A-Z][a-z]+)*)\b'
-        tech_matches = re.findall(tech_company_pattern, text)
-        for match in tech_matches:
-            if len(match) >= 2:
-                companies.add(match)
-        
-        # 5. Аббревиатуры из словаря известных компаний (МТС, ВТБ, Сбер)
-        # Только если это точное совпадение из словаря
-        for company in cls.KNOWN_COMPANIES:
-            if len(company) <= 5 and company.isupper():  # Только короткие аббревиатуры
-                pattern = r'\b' + re.escape(company) + r'\b'
-                if re.search(pattern, text):
-                    companies.add(company)
+        companies.update(TECH_COMPANY_PATTERN.findall(text))
         
-        # 6. Названия с точками (Яндекс.Еда, Яндекс.Музыка) - только если есть точка
-        dotted_pattern = r'\b([А-ЯЁA-Z][А-Яа-яёA-Za-z]+\.(?:[А-ЯЁA-Z][а-яёa-z]+)+)\b'
-        dotted_matches = re.findall(dotted_pattern, text)
-        for match in dotted_matches:
-            if len(match) >= 5:  # Минимум 5 символов для названий с точками
-                companies.add(match)
+        # 5. Названия с точками (Яндекс.Еда, Яндекс.Музыка) - минимум 5 символов
+        companies.update(match for match in DOTTED_PATTERN.findall(text) if len(match) >= 5)
         
         # Финальная фильтрация через паттерны (без стоп-слов)
-        filtered = []
+        filtered = set()
         for c in companies:
             c_clean = c.strip()
-            
-            # Проверяем через паттерны, а не через стоп-слова
+            c_lower = c_clean.lower()
             if (3 <= len(c_clean) <= 50 and
                 c_clean[0].isupper() and
-                # Исключаем прилагательные через паттерн
-                not re.search(r'(?:ых|их|ому|ему|ой|ей|ая|ое|ую|ем|им)$', c_clean.lower()) and
-                # Исключаем предлоги в начале через паттерн
-                not re.match(r'^(?:при|про|для|над|под|без|от|до|из|к|с|о|об|на|по|за)\s', c_clean.lower()) and
-                # Исключаем географические названия через паттерн (названия городов/стран обычно в определенных контекстах)
-                not re.match(r'^(?:росси|москв|петербург|санкт)', c_clean.lower()) and
-                # Исключаем общие слова через паттерн (существительные в определенных формах)
-                not re.match(r'^(?:рынок|решение|требование|выбор|при)', c_clean.lower())):
-                filtered.append(c_clean)
+                # Исключаем прилагательные, предлоги в начале, географические названия и общие слова
+                not c_lower.endswith(ADJECTIVE_ENDINGS) and
+                not PREPOSITION_PREFIX.match(c_lower) and
+                not c_lower.startswith(GEO_PREFIXES) and
+                not c_lower.startswith(COMMON_WORD_PREFIXES)):
+                filtered.add(c_clean)
         
-        return list(set(filtered))
+        return list(filtered)
     
     @staticmethod
+    @metrics.timed('rb_extract_seconds', method='people')
     def extract_people(text: str) -> List[str]:
         """
         Извлечение имен людей (паттерн: Имя Фамилия с заглавных букв)
@@ -231,48 +254,40 @@ class DataExtractor:
             text: Текст для анализа
             
         Returns:
-            Список найденных имен (максимум 10)
+            Список найденных имен (максимум 10, в порядке первого упоминания)
         """
-        # Слова, которые не являются именами людей
-        not_people = {
-            'республика', 'корея', 'яблоко', 'яндекс', 'россия', 'москва',
-            'российский', 'московский', 'российская', 'московская',
-            'северная', 'южная', 'восточная', 'западная',
-            'компания', 'компании', 'компаний', 'компанию',
-            'оператор', 'операторы', 'операторов',
-            'банк', 'банка', 'банку', 'банки', 'банков',
-            'рынок', 'рынка', 'рынке', 'рынком',
-            'решение', 'решения', 'решений',
-            'требование', 'требования', 'требований',
-            'выбор', 'выбора', 'выбору',
-            'при', 'про', 'для', 'над', 'под', 'без',
-            'новый', 'новая', 'новое', 'новые',
-            'старый', 'старая', 'старое', 'старые',
-        }
-        
-        # Паттерн для русских имен: Имя Фамилия
-        pattern = r'\b([А-ЯЁ][а-яё]+)\s+([А-ЯЁ][а-яё]+)\b'
-        matches = re.findall(pattern, text)
-        people = [f"{first} {last}" for first, last in matches]
-        
-        # Фильтруем слишком короткие, общие слова и не-имена
-        filtered = []
-        for p in people:
-            first, last = p.split()
+        people = {}
+        for first, last in PERSON_PATTERN.findall(text):
             first_lower = first.lower()
             last_lower = last.lower()
             
-            # Проверяем что это не стоп-слова
+            # Фильтруем слишком короткие, общие слова, прилагательные и географические названия
             if (len(first) > 2 and len(last) > 2 and
-                first_lower not in not_people and
-                last_lower not in not_people and
-                # Исключаем прилагательные
-                not first_lower.endswith(('ый', 'ая', 'ое', 'ие', 'ой', 'ей')) and
-                not last_lower.endswith(('ый', 'ая', 'ое', 'ие', 'ой', 'ей')) and
-                # Исключаем географические названия
-                not re.match(r'^(северн|южн|восточн|западн|российск|московск)', first_lower) and
-                not re.match(r'^(северн|южн|восточн|западн|российск|московск)', last_lower)):
-                filtered.append(p)
+                first_lower not in NOT_PEOPLE and
+                last_lower not in NOT_PEOPLE and
+                not first_lower.endswith(PERSON_ADJECTIVE_ENDINGS) and
+                not last_lower.endswith(PERSON_ADJECTIVE_ENDINGS) and
+                not first_lower.startswith(PERSON_GEO_PREFIXES) and
+                not last_lower.startswith(PERSON_GEO_PREFIXES)):
+                people[f"{first} {last}"] = None
+                if len(people) == MAX_PEOPLE:
+                    break
         
-        return list(set(filtered))[:10]  # Ограничиваем количество
-
+        return list(people)
+    
+    @classmethod
+    def extract_all(cls, text: str) -> Dict[str, List]:
+        """
+        Извлечение всех сущностей из текста статьи
+        
+        Args:
+            text: Текст для анализа
+            
+        Returns:
+            Словарь {'money': [...], 'companies': [...], 'people': [...]}
+        """
+        return {
+            'money': cls.extract_money(text),
+            'companies': cls.extract_companies(text),
+            'people': cls.extract_people(text),
+        }
@@ -0,0 +1,185 @@
+"""
+Модуль постоянного фронтира обхода (SQLite) для возобновления скрапинга
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .records import Article, dumps_json, loads_json
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlFrontier:
+    """
+    Состояние обхода на диске: найденные URL, их статусы, готовые статьи
+    и курсор пагинации по каждому разделу
+
+    Статусы URL: discovered -> in_flight -> done | failed. У готовой статьи отдельно отмечается,
+    что она уже сброшена в поток статей на диске (written): при возобновлении в поток
+    дописываются только остальные.
+    """
+
+    DISCOVERED = 'discovered'
+    IN_FLIGHT = 'in_flight'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, path: str = 'rb_frontier.db'):
+        """
+        Args:
+            path: Путь к файлу базы SQLite
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                section TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                article TEXT,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS urls_section_status ON urls (section, status);
+            CREATE TABLE IF NOT EXISTS listing_cursor (
+                section TEXT PRIMARY KEY,
+                last_page INTEGER NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        # Фронтиры, созданные до отметки written: их статьи считаются не записанными
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(urls)')}
+        if 'written' not in columns:
+            self.conn.execute('ALTER TABLE urls ADD COLUMN written INTEGER NOT NULL DEFAULT 0')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get_cursor(self, section: str) -> Tuple[int, bool]:
+        """
+        Курсор пагинации раздела
+
+        Returns:
+            (номер последней обработанной страницы листинга, пагинация закончилась)
+        """
+        row = self.conn.execute(
+            'SELECT last_page, finished FROM listing_cursor WHERE section = ?', (section,)
+        ).fetchone()
+        if row is None:
+            return 0, False
+        return row[0], bool(row[1])
+
+    def save_page(self, section: str, page: int, urls: Iterable[str]):
+        """Сохранение найденных на странице листинга URL и сдвиг курсора (одной транзакцией)"""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO urls (url, section, status, updated_at) VALUES (?, ?, ?, ?)',
+                [(url, section, self.DISCOVERED, now) for url in urls]
+            )
+            self.conn.execute(
+                'INSERT INTO listing_cursor (section, last_page) VALUES (?, ?) '
+                'ON CONFLICT(section) DO UPDATE SET last_page = excluded.last_page',
+                (section, page)
+            )
+
+    def add_urls(self, section: str, urls: Iterable[str]):
+        """Сохранение URL, найденных не через листинг (sitemap, ленты); курсор не меняется"""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO urls (url, section, status, updated_at) VALUES (?, ?, ?, ?)',
+                [(url, section, self.DISCOVERED, now) for url in urls]
+            )
+
+    def finish_listing(self, section: str):
+        """Отметка, что в разделе закончились страницы листинга"""
+        with self.conn:
+            self.conn.execute(
+                'INSERT INTO listing_cursor (section, last_page, finished) VALUES (?, 0, 1) '
+                'ON CONFLICT(section) DO UPDATE SET finished = 1',
+                (section,)
+            )
+
+    def get_section_urls(self, section: str) -> List[str]:
+        """Все URL, найденные в листингах раздела"""
+        rows = self.conn.execute('SELECT url FROM urls WHERE section = ? ORDER BY rowid', (section,))
+        return [row[0] for row in rows]
+
+    def done_urls(self) -> Set[str]:
+        """URL, статьи по которым уже загружены"""
+        rows = self.conn.execute('SELECT url FROM urls WHERE status = ?', (self.DONE,))
+        return {row[0] for row in rows}
+
+    def mark_in_flight(self, urls: Iterable[str]):
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE urls SET status = ?, updated_at = ? WHERE url = ? AND status != ?',
+                [(self.IN_FLIGHT, now, url, self.DONE) for url in urls]
+            )
+
+    def record_result(self, url: str, article: Optional[Union[Article, Dict]]):
+        """
+        Фиксация результата загрузки URL
+
+        Args:
+            url: URL статьи
+            article: Статья или None, если загрузить/распарсить не удалось
+        """
+        now = datetime.now().isoformat()
+        if article:
+            status, data = self.DONE, dumps_json(article)
+        else:
+            status, data = self.FAILED, None
+        with self.conn:
+            self.conn.execute(
+                'UPDATE urls SET status = ?, article = ?, attempts = attempts + 1, written = 0, updated_at = ? '
+                'WHERE url = ?',
+                (status, data, now, url)
+            )
+
+    def mark_written(self, urls: Iterable[str]):
+        """Отметка, что статьи сброшены в поток на диске (вызывается после сброса буфера потока)"""
+        with self.conn:
+            self.conn.executemany('UPDATE urls SET written = 1 WHERE url = ? AND status = ?',
+                                  [(url, self.DONE) for url in urls])
+
+    def load_articles(self, section: Optional[str] = None) -> List[Article]:
+        """
+        Загрузка готовых статей
+
+        Args:
+            section: Раздел (None - все разделы)
+        """
+        return list(self.iter_articles(section))
+
+    def iter_articles(self, section: Optional[str] = None) -> Iterator[Article]:
+        """Готовые статьи по одной, без загрузки всего раздела в память (section=None - все разделы)"""
+        if section is None:
+            rows = self.conn.execute('SELECT article FROM urls WHERE status = ? ORDER BY rowid', (self.DONE,))
+        else:
+            rows = self.conn.execute(
+                'SELECT article FROM urls WHERE status = ? AND section = ? ORDER BY rowid', (self.DONE, section)
+            )
+        for row in rows:
+            yield loads_json(row[0])
+
+    def iter_restored(self, section: str) -> Iterator[Tuple[Article, bool]]:
+        """Готовые статьи раздела вместе с отметкой, что они уже есть в потоке на диске"""
+        rows = self.conn.execute(
+            'SELECT article, written FROM urls WHERE status = ? AND section = ? ORDER BY rowid', (self.DONE, section)
+        )
+        for article, written in rows:
+            yield loads_json(article), bool(written)
+
+    def counts(self) -> Dict[str, int]:
+        """Количество URL по статусам"""
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM urls GROUP BY status')
+        return dict(rows.fetchall())
@@ -0,0 +1,156 @@
+"""
+Словарь (газеттир) названий с поиском всех вхождений за один проход по тексту
+(автомат Ахо-Корасик)
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _is_word(char: str) -> bool:
+    """Символ слова в смысле \\w регулярных выражений"""
+    return char.isalnum() or char == '_'
+
+
+class Gazetteer:
+    """
+    Автомат Ахо-Корасик по словарю названий
+
+    Строится один раз; поиск идет без учета регистра и проверяет границы слова так же,
+    как re.search(r'\\b' + re.escape(name.lower()) + r'\\b', text.lower()). Время поиска
+    зависит от длины текста и числа совпадений, но не от размера словаря.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        """
+        Args:
+            names: Названия (в результатах возвращаются в исходном написании)
+        """
+        # Узел автомата - индекс в списках переходов, ссылок на суффикс и выходов
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        # Выходы узла вместе с выходами по цепочке суффиксов (заполняются в _build)
+        self._matches: List[List[int]] = [[]]
+        # Ключ словаря (название в нижнем регистре) -> исходные написания
+        self._keys: List[str] = []
+        self._names: List[List[str]] = []
+        self._key_index: Dict[str, int] = {}
+        self._built = True
+        self.add_all(names)
+
+    def __len__(self) -> int:
+        return sum(len(names) for names in self._names)
+
+    def add(self, name: str):
+        """Добавление названия в словарь"""
+        name = name.strip()
+        key = name.lower()
+        if not key:
+            return
+        index = self._key_index.get(key)
+        if index is not None:
+            if name not in self._names[index]:
+                self._names[index].append(name)
+            return
+
+        index = self._key_index[key] = len(self._keys)
+        self._keys.append(key)
+        self._names.append([name])
+
+        node = 0
+        for char in key:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._matches.append([])
+            node = nxt
+        self._out[node].append(index)
+        self._built = False
+
+    def add_all(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def _build(self):
+        """Ссылки на суффиксы и объединение выходов (обход в ширину)"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._matches[child] = self._out[child]
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._matches[child] = self._out[child] + self._matches[self._fail[child]]
+        self._built = True
+
+    def find(self, text: str) -> Set[str]:
+        """
+        Поиск всех названий словаря, встречающихся в тексте отдельным словом
+
+        Args:
+            text: Текст для анализа
+
+        Returns:
+            Множество найденных названий в исходном написании
+        """
+        if not self._built:
+            self._build()
+
+        text = text.lower()
+        goto, fail, matches, keys = self._goto, self._fail, self._matches, self._keys
+        found_keys = set()
+        node = 0
+        for pos, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not matches[node]:
+                continue
+            for index in matches[node]:
+                if index in found_keys:
+                    continue
+                key = keys[index]
+                start = pos - len(key) + 1
+                # Граница слова с обеих сторон, как \b в регулярном выражении
+                before = start > 0 and _is_word(text[start - 1])
+                after = pos + 1 < len(text) and _is_word(text[pos + 1])
+                if before != _is_word(key[0]) and after != _is_word(key[-1]):
+                    found_keys.add(index)
+
+        return {name for index in found_keys for name in self._names[index]}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Gazetteer':
+        """
+        Загрузка словаря из текстового файла
+
+        Формат: одно название на строку (UTF-8), пустые строки и строки,
+        начинающиеся с '#', пропускаются.
+        """
+        return cls(read_names(path))
+
+
+def read_names(path: str) -> List[str]:
+    """Чтение названий из файла словаря"""
+    names = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                names.append(line)
+    logger.info(f"Загружено {len(names)} названий из {path}")
+    return names
@@ -0,0 +1,151 @@
+"""
+Постоянный HTTP кэш на диске (SQLite) с проверкой актуальности через ETag/Last-Modified
+"""
+
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+
+from .config import DEFAULT_HTTP_CACHE_PATH, HTTP_CACHE_TTL, HTTP_CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache:
+    """
+    Кэш тел ответов вместе с валидаторами
+
+    Пока запись моложе ttl, она отдается без запроса. Устаревшая запись проверяется
+    условным запросом (If-None-Match / If-Modified-Since): ответ 304 тоже считается
+    попаданием, тело берется из кэша. Когда суммарный размер тел превышает max_size,
+    вытесняются давно не использованные записи (LRU).
+    """
+
+    def __init__(self, path: str = DEFAULT_HTTP_CACHE_PATH, ttl: float = HTTP_CACHE_TTL,
+                 max_size: int = HTTP_CACHE_MAX_SIZE):
+        """
+        Args:
+            path: Файл базы SQLite
+            ttl: Сколько секунд запись отдается без запроса (0 - всегда проверять на сервере)
+            max_size: Максимальный суммарный размер сжатых тел (байты)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        """)
+        self.conn.commit()
+        self._size = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Запись для URL (в том числе устаревшая)
+
+        Returns:
+            Словарь с ключами url, body, etag, last_modified, stored_at или None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, stored_at = row
+        return {'url': url, 'body': zlib.decompress(body).decode('utf-8'), 'etag': etag,
+                'last_modified': last_modified, 'stored_at': stored_at}
+
+    def is_fresh(self, entry: Dict, ttl: Optional[float] = None) -> bool:
+        """Запись моложе ttl (None - ttl кэша) и отдается без запроса"""
+        return time.time() - entry['stored_at'] < (self.ttl if ttl is None else ttl)
+
+    @staticmethod
+    def validators(entry: Optional[Dict]) -> Dict[str, str]:
+        """Заголовки условного запроса для записи"""
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, entry: Dict, revalidated: bool = False):
+        """
+        Отметка использования записи
+
+        Args:
+            entry: Запись
+            revalidated: Запись подтверждена ответом 304 (срок жизни начинается заново)
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            if revalidated:
+                self.revalidated += 1
+                self.conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?',
+                                  (now, now, entry['url']))
+            else:
+                self.hits += 1
+                self.conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (now, entry['url']))
+            self.bytes_saved += len(entry['body'].encode('utf-8'))
+
+    def put(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Сохранение ответа (промах кэша) с вытеснением старых записей сверх max_size"""
+        data = zlib.compress(body.encode('utf-8'))
+        now = time.time()
+        with self._lock, self.conn:
+            self.misses += 1
+            old = self.conn.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (url, body, etag, last_modified, stored_at, accessed_at, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, data, etag, last_modified, now, now, len(data))
+            )
+            self._size += len(data) - (old[0] if old else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Удаление давно не использованных записей, пока размер не станет меньше max_size"""
+        evicted = 0
+        rows = self.conn.execute('SELECT url, size FROM responses ORDER BY accessed_at').fetchall()
+        for url, size in rows:
+            if self._size <= self.max_size:
+                break
+            self.conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self._size -= size
+            evicted += 1
+        logger.debug(f"Из HTTP кэша вытеснено {evicted} записей")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики: попадания без запроса, подтвержденные ответом 304, промахи, сэкономленные байты"""
+        return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses,
+                'bytes_saved': self.bytes_saved, 'entries': len(self), 'size': self._size}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
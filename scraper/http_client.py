@@ -4,12 +4,19 @@
 
 import time
 import logging
-from typing import Optional
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterator, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 
-from .config import DEFAULT_TIMEOUT, DEFAULT_RETRIES
+from .config import BASE_URL, DEFAULT_TIMEOUT, DEFAULT_RETRIES
+from .rate_limiter import RateLimiter
+from .http_cache import HTTPCache
+from .concurrency import AdaptiveConcurrency
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +24,39 @@ logger = logging.getLogger(__name__)
 class HTTPClient:
     """Клиент для выполнения HTTP запросов"""
     
-    def __init__(self, delay: float = 1.0, timeout: int = DEFAULT_TIMEOUT):
+    def __init__(self, delay: float = 1.0, timeout: int = DEFAULT_TIMEOUT,
+                 rate_limiter: Optional[RateLimiter] = None, cache: Optional[HTTPCache] = None,
+                 controller: Optional[AdaptiveConcurrency] = None, origin: Optional[str] = None,
+                 observer=None):
         """
         Инициализация HTTP клиента
         
         Args:
             delay: Задержка между запросами (секунды)
             timeout: Таймаут запроса (секунды)
+            rate_limiter: Общий лимитер частоты запросов (если задан, каждый запрос ждет токен)
+            cache: HTTP кэш на диске (если задан, fetch_html и fetch_page берут ответы из него)
+            controller: Адаптивный лимит одновременных запросов (общий для всех потоков)
+            origin: Адрес, на который на самом деле уходят запросы к BASE_URL (локальный
+                    симулятор или зеркало, например http://127.0.0.1:8080); URL в данных не меняются
+            observer: Получатель времени каждого запроса - объект с методом
+                      record(latency, ok, throttled, revalidated) (бенчмарк)
         """
         self.session = requests.Session()
         self.ua = UserAgent()
         self.delay = delay
         self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.controller = controller
+        self.origin = origin.rstrip('/') if origin else None
+        self.observer = observer
+    
+    def target(self, url: str) -> str:
+        """Фактический адрес запроса (с подменой BASE_URL на origin)"""
+        if self.origin and url.startswith(BASE_URL):
+            return self.origin + url[len(BASE_URL):]
+        return url
     
     def get_headers(self) -> dict:
         """Генерация заголовков для запроса"""
@@ -42,37 +70,117 @@ class HTTPClient:
             'Cache-Control': 'no-cache',
         }
     
-    def fetch_page(self, url: str, retries: int = DEFAULT_RETRIES) -> Optional[BeautifulSoup]:
+    def fetch_page(self, url: str, retries: int = DEFAULT_RETRIES,
+                   max_age: Optional[float] = None) -> Optional[BeautifulSoup]:
         """
         Загрузка страницы с обработкой ошибок
         
         Args:
             url: URL страницы
             retries: Количество попыток при ошибке
+            max_age: Срок свежести ответа из кэша вместо ttl кэша (см. fetch_html)
             
         Returns:
             BeautifulSoup объект или None при ошибке
         """
+        html = self.fetch_html(url, retries, max_age)
+        if html is None:
+            return None
+        with metrics.timer('rb_parse_seconds', stage='listing_tree'):
+            return BeautifulSoup(html, 'lxml')
+    
+    def fetch_html(self, url: str, retries: int = DEFAULT_RETRIES,
+                   max_age: Optional[float] = None) -> Optional[str]:
+        """
+        Загрузка HTML страницы без парсинга
+        
+        Args:
+            url: URL страницы
+            retries: Количество попыток при ошибке
+            max_age: Сколько секунд ответ из кэша отдается без запроса (None - ttl кэша,
+                     0 - всегда условный запрос, как для листингов)
+            
+        Returns:
+            HTML страницы или None при ошибке
+        """
+        if self.cache is not None:
+            return self._fetch_cached(url, retries, max_age)
+        response = self._get(url, retries)
+        return response.text if response is not None else None
+    
+    def _fetch_cached(self, url: str, retries: int, max_age: Optional[float] = None) -> Optional[str]:
+        """Загрузка через кэш: свежая запись без запроса, устаревшая - условным запросом"""
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry, max_age):
+            self.cache.hit(entry)
+            return entry['body']
+        
+        response = self._get(url, retries, self.cache.validators(entry))
+        if response is None:
+            return None
+        if response.status_code == 304:
+            if entry is not None:
+                self.cache.hit(entry, revalidated=True)
+                return entry['body']
+            # 304 без записи в кэше - тела нет: повторяем обычным запросом, пустой ответ не кэшируем
+            logger.warning(f"Ответ 304 без записи в кэше для {url}, загружаю заново")
+            response = self._get(url, retries)
+            if response is None or response.status_code == 304:
+                return None
+        
+        html = response.text
+        self.cache.put(url, html, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return html
+    
+    def fetch_if_modified(self, url: str, since: Optional[datetime],
+                          retries: int = DEFAULT_RETRIES) -> Tuple[bool, Optional[str]]:
+        """
+        Условная загрузка (If-Modified-Since): тело передается, только если страница изменилась
+        
+        Args:
+            url: URL страницы
+            since: Время прошлой загрузки (None - обычная загрузка)
+            retries: Количество попыток при ошибке
+            
+        Returns:
+            (удалось ли выполнить запрос, HTML или None, если страница не изменилась - ответ 304)
+        """
+        headers = {}
+        if since is not None:
+            headers['If-Modified-Since'] = format_datetime(since.astimezone(timezone.utc), usegmt=True)
+            headers['Cache-Control'] = 'max-age=0'
+        response = self._get(url, retries, headers)
+        if response is None:
+            return False, None
+        if response.status_code == 304:
+            return True, None
+        return True, response.text
+    
+    def _get(self, url: str, retries: int = DEFAULT_RETRIES,
+             extra_headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """GET с повторами при ошибках; None - не удалось после всех попыток"""
         for attempt in range(retries):
             try:
                 # Добавляем небольшую задержку перед запросом для избежания перегрузки
                 if attempt > 0:
+                    metrics.inc('rb_retries_total', kind='immediate')
                     time.sleep(2 ** attempt)  # Экспоненциальная задержка при повторах
                 
-                response = self.session.get(
-                    url,
-                    headers=self.get_headers(),
-                    timeout=self.timeout,
-                    allow_redirects=True,
-                    stream=False  # Не используем stream для избежания проблем с соединением
-                )
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(url)
+                
+                headers = self.get_headers()
+                if extra_headers:
+                    headers.update(extra_headers)
+                
+                response = self._send(url, headers)
                 response.raise_for_status()
                 response.encoding = 'utf-8'
                 
                 # Задержка после успешного запроса (минимальная для скорости)
                 if self.delay > 0:
                     time.sleep(self.delay)
-                return BeautifulSoup(response.text, 'lxml')
+                return response
                 
             except (requests.exceptions.ConnectionError, 
                     requests.exceptions.ChunkedEncodingError,
@@ -94,4 +202,81 @@ class HTTPClient:
                     logger.error(f"Не удалось загрузить {url} после {retries} попыток")
         
         return None
-
+    
+    def _send(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """Один запрос; при адаптивной параллельности - в слоте контроллера, время ответа - контроллеру и наблюдателю"""
+        if self.controller is None and self.observer is None and not metrics.enabled():
+            return self.session.get(
+                self.target(url),
+                headers=headers,
+                timeout=self.timeout,
+                allow_redirects=True,
+                stream=False  # Не используем stream для избежания проблем с соединением
+            )
+        
+        with self.controller.slot() if self.controller is not None else nullcontext():
+            start = time.monotonic()
+            try:
+                response = self.session.get(self.target(url), headers=headers, timeout=self.timeout,
+                                            allow_redirects=True, stream=False)
+            except requests.exceptions.RequestException:
+                self._record(time.monotonic() - start, ok=False)
+                metrics.inc('rb_responses_total', status='error')
+                raise
+        self._record(time.monotonic() - start, ok=response.status_code < 400,
+                     throttled=response.status_code in (429, 503), revalidated=response.status_code == 304)
+        if metrics.enabled():
+            metrics.inc('rb_responses_total', status=response.status_code)
+            metrics.observe('rb_fetch_wait_seconds', response.elapsed.total_seconds())
+            metrics.observe('rb_fetch_bytes', len(response.content))
+        return response
+    
+    def _record(self, latency: float, ok: bool, throttled: bool = False, revalidated: bool = False):
+        """Передача времени запроса контроллеру, наблюдателю и в метрики (revalidated - ответ 304)"""
+        for receiver in (self.controller, self.observer):
+            if receiver is not None:
+                receiver.record(latency, ok, throttled, revalidated)
+        metrics.observe('rb_fetch_seconds', latency)
+    
+    def fetch_stream(self, url: str, chunk_size: int = 64 * 1024,
+                     retries: int = DEFAULT_RETRIES) -> Iterator[bytes]:
+        """
+        Потоковая загрузка тела ответа частями (для больших sitemap и лент)
+        
+        Повторяется только установка соединения: если ответ оборвался на середине,
+        уже выданные части не отзываются, а поток просто заканчивается.
+        
+        Args:
+            url: URL документа
+            chunk_size: Размер части (байты)
+            retries: Количество попыток при ошибке соединения
+            
+        Yields:
+            Части тела ответа (Content-Encoding уже снят); при ошибке ничего не выдается
+        """
+        for attempt in range(retries):
+            if attempt > 0:
+                time.sleep(min(2 ** attempt, 30))
+            if self.rate_limiter:
+                self.rate_limiter.acquire(url)
+            
+            headers = self.get_headers()
+            headers['Accept-Encoding'] = 'gzip, deflate'
+            try:
+                response = self.session.get(self.target(url), headers=headers, timeout=self.timeout,
+                                            allow_redirects=True, stream=True)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Ошибка при загрузке {url} (попытка {attempt + 1}/{retries}): {e}")
+                continue
+            
+            with response:
+                try:
+                    yield from response.iter_content(chunk_size)
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"Поток {url} оборвался: {e}")
+            if self.delay > 0:
+                time.sleep(self.delay)
+            return
+        
+        logger.error(f"Не удалось загрузить {url} после {retries} попыток")
@@ -0,0 +1,300 @@
+"""
+Быстрый парсер статей на lxml с заранее скомпилированными XPath
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Iterator, List, Optional
+from lxml import etree
+
+from .config import SECTIONS
+from .parsers import HTMLParser, COMMON_TAGS
+from .records import Article
+from .selector_cache import tree_fingerprint
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_NS = {'re': 'http://exslt.org/regular-expressions'}
+
+# Строки внутри этих тегов BeautifulSoup не включает в get_text()
+_NON_TEXT_TAGS = {'script', 'style', 'template'}
+_EXCLUDED_PARENTS = ('header', 'nav', 'footer', 'aside')
+_CONTENT_JUNK = ('script', 'style', 'nav', 'footer', 'header', 'aside', 'form')
+
+
+def _xpath(expr: str) -> etree.XPath:
+    return etree.XPath(expr, namespaces=_NS)
+
+
+def _first(expr: str) -> etree.XPath:
+    """XPath первого совпадения в порядке документа (аналог soup.find)"""
+    return _xpath(f'({expr})[1]')
+
+
+def _cls(pattern: str) -> str:
+    """Условие на class без учета регистра (аналог class_=re.compile(pattern, re.I))"""
+    return f're:test(@class, "{pattern}", "i")'
+
+
+def _iter_strings(el, skip: bool = False) -> Iterator[str]:
+    """Текстовые узлы элемента в порядке документа, как их видит BeautifulSoup"""
+    skip = skip or el.tag in _NON_TEXT_TAGS
+    if el.text and not skip and isinstance(el.tag, str):
+        yield el.text
+    for child in el:
+        yield from _iter_strings(child, skip)
+        if child.tail and not skip:
+            yield child.tail
+
+
+def get_text(el, separator: str = '') -> str:
+    """Аналог Tag.get_text(separator, strip=True)"""
+    return separator.join(s.strip() for s in _iter_strings(el) if s.strip())
+
+
+def _has_excluded_parent(el) -> bool:
+    return next(el.iterancestors(*_EXCLUDED_PARENTS), None) is not None
+
+
+class LxmlHTMLParser(HTMLParser):
+    """
+    Парсер статей, работающий напрямую с деревом lxml
+
+    Повторяет логику HTMLParser.parse_article (те же каскады селекторов в том же
+    порядке), но все селекторы скомпилированы один раз, а текст собирается без
+    построения дерева BeautifulSoup. Листинги по-прежнему разбираются HTMLParser.
+    """
+
+    CONTENT_TYPE_FALLBACKS = [
+        ('news', _first(f'//div[{_cls("news")}]')),
+        ('stories', _first(f'//div[{_cls("story")}]')),
+        ('opinions', _first(f'//div[{_cls("opinion|column")}]')),
+    ]
+
+    OG_TITLE = _first('//meta[@property="og:title"]')
+    H1 = [_first(f'//h1[{_cls("title|heading|article")}]'), _first('//h1')]
+    TITLE = _first('//title')
+
+    AUTHOR = [
+        _first(f'//a[{_cls("author|writer|journalist")}]'),
+        _first(f'//span[{_cls("author")}]'),
+        _first(f'//div[{_cls("author")}]'),
+        _first('//meta[@property="article:author"]'),
+        _first('//span[@itemprop="author"]'),
+        _first('//div[@itemprop="author"]'),
+    ]
+
+    DATE = [
+        _first('//time'),
+        _first('//time[@datetime]'),
+        _first(f'//span[{_cls("date|time")}]'),
+        _first(f'//div[{_cls("date|time")}]'),
+        _first('//meta[@property="article:published_time"]'),
+        _first('//span[@itemprop="datePublished"]'),
+    ]
+
+    CONTENT = [
+        _first('//article'),
+        _first(f'//div[{_cls("content|article|text|body|post")}]'),
+        _first('//main'),
+        _first('//div[@itemprop="articleBody"]'),
+        _first(f'//section[{_cls("content|article")}]'),
+    ]
+    CONTENT_JUNK = _xpath('.//*[' + ' or '.join(f'self::{tag}' for tag in _CONTENT_JUNK) + ']')
+
+    DESCRIPTION = [
+        _first('//meta[@property="og:description"]'),
+        _first('//meta[@name="description"]'),
+        _first(f'//div[{_cls("description|excerpt|lead")}]'),
+    ]
+
+    META_TAGS = _xpath('//meta[re:test(@property, "article:tag|og:tag", "i")]')
+    ARTICLE_CONTENT = CONTENT[:3]
+    CONTENT_TAGS = _xpath(f'.//*[self::a or self::span or self::div or self::li][{_cls("tag")}]')
+    TAGS_SECTION = [
+        _first(f'//section[{_cls("tag")}]'),
+        _first(f'//div[{_cls("tags|tag-list|tag-cloud")}]'),
+        _first(f'//ul[{_cls("tag")}]'),
+    ]
+    SECTION_TAGS = _xpath(f'.//*[self::a or self::span or self::li][{_cls("tag")}]')
+    DATA_TAGS = _xpath('//*[@data-tag]')
+    REL_TAGS = _xpath('//*[re:test(@rel, "tag", "i")]')
+
+    BREADCRUMBS = [
+        _first(f'//nav[{_cls("breadcrumb")}]'),
+        _first(f'//div[{_cls("breadcrumb")}]'),
+        _first(f'//ol[{_cls("breadcrumb")}]'),
+    ]
+    LINKS = _xpath('.//a')
+    SECTION_META = _first('//meta[@property="article:section"]')
+
+    @staticmethod
+    def _find(root, selectors: List[etree.XPath]):
+        for selector in selectors:
+            found = selector(root)
+            if found:
+                return found[0]
+        return None
+
+    def _select(self, root, fingerprint: Optional[str], field: str, selectors: List[etree.XPath]):
+        """Поиск по каскаду XPath через кэш шаблонов"""
+        return self.select(fingerprint, field, selectors,
+                           lambda selector: next(iter(selector(root)), None))
+
+    @staticmethod
+    @metrics.timed('rb_parse_seconds', stage='tree')
+    def build_tree(html: str):
+        """Построение дерева lxml из HTML"""
+        try:
+            root = etree.fromstring(html, etree.HTMLParser())
+        except (etree.ParserError, ValueError):
+            root = None
+        return root if root is not None else etree.Element('html')
+
+    def parse_html(self, url: str, html: str) -> Optional[Article]:
+        return self.parse_tree(url, self.build_tree(html))
+
+    def detect_content_type(self, url: str, root) -> str:
+        url_lower = url.lower()
+        if '/columns/' in url_lower:
+            return 'opinions'
+
+        for content_type, path in SECTIONS.items():
+            if path.replace('/', '') in url_lower:
+                return content_type
+
+        for content_type, selector in self.CONTENT_TYPE_FALLBACKS:
+            if selector(root):
+                return content_type
+
+        return 'unknown'
+
+    def parse_tree(self, url: str, root) -> Optional[Article]:
+        """
+        Парсинг страницы статьи по дереву lxml
+
+        Args:
+            url: URL статьи
+            root: Корень дерева lxml (дерево изменяется: из контента удаляются служебные блоки)
+
+        Returns:
+            Запись статьи (тот же формат, что у HTMLParser.parse_article) или None
+        """
+        started = time.perf_counter()
+        try:
+            fingerprint = tree_fingerprint(url, root) if self.selector_cache is not None else None
+
+            article = Article(
+                url=url,
+                content_type=self.detect_content_type(url, root),
+                scraped_at=datetime.now().isoformat()
+            )
+
+            # Заголовок: og:title, затем непустой h1, затем <title>
+            title_text = ''
+            og_title = self._find(root, [self.OG_TITLE])
+            if og_title is not None and og_title.get('content'):
+                title_text = og_title.get('content', '').strip()
+            if not title_text:
+                h1_elem = self._select(root, fingerprint, 'h1', self.H1)
+                if h1_elem is not None:
+                    title_text = get_text(h1_elem)
+            if not title_text:
+                title_tag = self._find(root, [self.TITLE])
+                if title_tag is not None:
+                    title_text = get_text(title_tag)
+                    if ' | RB.RU' in title_text:
+                        title_text = title_text.replace(' | RB.RU', '').strip()
+            if title_text:
+                article['title'] = title_text
+
+            author_elem = self._select(root, fingerprint, 'author', self.AUTHOR)
+            if author_elem is not None:
+                if author_elem.tag == 'meta':
+                    article['author'] = author_elem.get('content', '')
+                else:
+                    article['author'] = get_text(author_elem)
+
+            date_elem = self._select(root, fingerprint, 'date', self.DATE)
+            if date_elem is not None:
+                if date_elem.tag == 'meta':
+                    article['date'] = date_elem.get('content', '')
+                elif date_elem.get('datetime'):
+                    article['date'] = date_elem.get('datetime')
+                else:
+                    article['date'] = get_text(date_elem)
+
+            content_elem = self._select(root, fingerprint, 'content', self.CONTENT)
+            if content_elem is not None:
+                # Служебные блоки заменяем пустым комментарием: так хвостовой текст
+                # остается отдельной строкой, как после decompose() в BeautifulSoup
+                for junk in self.CONTENT_JUNK(content_elem):
+                    parent = junk.getparent()
+                    if parent is None:
+                        continue
+                    placeholder = etree.Comment('')
+                    placeholder.tail = junk.tail
+                    parent.replace(junk, placeholder)
+                article['text'] = get_text(content_elem, ' ')
+
+            desc_elem = self._select(root, fingerprint, 'description', self.DESCRIPTION)
+            if desc_elem is not None:
+                if desc_elem.tag == 'meta':
+                    article['description'] = desc_elem.get('content', '')
+                else:
+                    article['description'] = get_text(desc_elem)
+
+            article['tags'] = self._extract_tags(root, fingerprint)
+
+            breadcrumbs = self._select(root, fingerprint, 'breadcrumbs', self.BREADCRUMBS)
+            if breadcrumbs is not None:
+                links = [get_text(link) for link in self.LINKS(breadcrumbs)]
+                article['categories'] = [text for text in links if text]
+
+            category_meta = self._find(root, [self.SECTION_META])
+            if category_meta is not None:
+                article['categories'].append(category_meta.get('content', ''))
+
+            metrics.observe('rb_parse_seconds', time.perf_counter() - started, stage='fields')
+
+            full_text = article['text'] + ' ' + article['description'] + ' ' + article['title']
+            article.update(self.extractor.extract_all(full_text))
+
+            return article
+
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге {url}: {e}")
+            return None
+
+    def _extract_tags(self, root, fingerprint: Optional[str] = None) -> List[str]:
+        tags_elems = []
+
+        for meta in self.META_TAGS(root):
+            tag_content = meta.get('content', '').strip()
+            if tag_content:
+                tags_elems.append(tag_content)
+
+        article_content = self._select(root, fingerprint, 'article_content', self.ARTICLE_CONTENT)
+        if article_content is not None and not _has_excluded_parent(article_content):
+            for tag in self.CONTENT_TAGS(article_content):
+                if not _has_excluded_parent(tag):
+                    tag_text = get_text(tag)
+                    if tag_text and tag_text not in COMMON_TAGS and tag_text not in tags_elems:
+                        tags_elems.append(tag_text)
+
+        tags_section = self._select(root, fingerprint, 'tags_section', self.TAGS_SECTION)
+        if tags_section is not None and not _has_excluded_parent(tags_section):
+            for tag in self.SECTION_TAGS(tags_section):
+                tag_text = get_text(tag)
+                if tag_text and tag_text not in tags_elems:
+                    tags_elems.append(tag_text)
+
+        for tag in self.DATA_TAGS(root) + self.REL_TAGS(root):
+            if not _has_excluded_parent(tag):
+                tag_text = tag.get('data-tag') or get_text(tag)
+                if tag_text and tag_text not in tags_elems:
+                    tags_elems.append(tag_text)
+
+        return list(set([tag.strip() for tag in tags_elems if tag.strip()]))
@@ -0,0 +1,294 @@
+"""
+Метрики стадий скрапинга (загрузка, разбор, извлечение, очереди): гистограммы и счетчики
+в текстовом формате Prometheus и итоговая сводка в лог
+"""
+
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CPU_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Имя -> (тип, описание, границы корзин гистограммы)
+DEFINITIONS = {
+    'rb_fetch_seconds': ('histogram', 'Полное время HTTP запроса', LATENCY_BUCKETS),
+    'rb_fetch_wait_seconds': ('histogram', 'Время до заголовков ответа (соединение, запрос, ожидание сервера)',
+                              LATENCY_BUCKETS),
+    'rb_connect_seconds': ('histogram', 'DNS и установка соединения (бэкенд async)', LATENCY_BUCKETS),
+    'rb_fetch_bytes': ('histogram', 'Размер тела ответа', SIZE_BUCKETS),
+    'rb_parse_seconds': ('histogram', 'Разбор HTML: дерево, поиск полей, ссылки листинга', CPU_BUCKETS),
+    'rb_extract_seconds': ('histogram', 'Извлечение сущностей из текста статьи', CPU_BUCKETS),
+    'rb_queue_depth': ('histogram', 'Длина очередей в момент выборки', DEPTH_BUCKETS),
+    'rb_responses_total': ('counter', 'HTTP ответы по коду (error - ответа нет)', None),
+    'rb_retries_total': ('counter', 'Повторы запросов: сразу (immediate) и отложенные (deferred)', None),
+}
+
+# Какие гистограммы относятся к стадиям для строки "время по стадиям"
+STAGES = (('загрузка', 'rb_fetch_seconds'), ('разбор', 'rb_parse_seconds'), ('извлечение', 'rb_extract_seconds'))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class MetricsRegistry:
+    """
+    Хранилище метрик процесса
+
+    Пока enabled=False, запись - одна проверка флага. Состояние можно снять
+    (snapshot) и добавить к другому реестру (merge): так метрики процессов-парсеров
+    конвейера попадают в основной процесс.
+    """
+
+    def __init__(self, definitions: Dict[str, tuple] = DEFINITIONS):
+        self.definitions = definitions
+        self.enabled = False
+        self._lock = threading.Lock()
+        # Имя -> метки -> [счетчики корзин..., сумма, количество] или значение счетчика
+        self._data: Dict[str, Dict[LabelKey, object]] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        """Наблюдение для гистограммы"""
+        if not self.enabled:
+            return
+        buckets = self.definitions[name][2]
+        key = _label_key(labels)
+        with self._lock:
+            state = self._data.setdefault(name, {}).get(key)
+            if state is None:
+                state = self._data[name][key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            # Корзина - первая граница, не меньшая value (последняя ячейка - +Inf)
+            state[bisect.bisect_left(buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Увеличение счетчика"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            values = self._data.setdefault(name, {})
+            values[key] = values.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Время блока в гистограмму name"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict[LabelKey, object]]:
+        """Копия состояния (reset=True - с обнулением, для передачи приращений)"""
+        with self._lock:
+            data = {name: {key: list(state) if isinstance(state, list) else state
+                           for key, state in values.items()}
+                    for name, values in self._data.items()}
+            if reset:
+                self._data = {}
+        return data
+
+    def reset(self):
+        with self._lock:
+            self._data = {}
+
+    def merge(self, snapshot: Dict[str, Dict[LabelKey, object]]):
+        """Добавление состояния другого реестра"""
+        if not snapshot:
+            return
+        with self._lock:
+            for name, values in snapshot.items():
+                target = self._data.setdefault(name, {})
+                for key, state in values.items():
+                    if isinstance(state, list):
+                        current = target.get(key)
+                        target[key] = state if current is None else [a + b for a, b in zip(current, state)]
+                    else:
+                        target[key] = target.get(key, 0) + state
+
+    def quantile(self, name: str, q: float, state: list) -> float:
+        """Оценка квантиля по корзинам (линейно внутри корзины, как histogram_quantile)"""
+        buckets = self.definitions[name][2]
+        count = state[-1]
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for i, bound in enumerate(buckets):
+            if cumulative + state[i] >= rank:
+                lower = buckets[i - 1] if i else 0.0
+                return lower + (bound - lower) * ((rank - cumulative) / state[i] if state[i] else 0.0)
+            cumulative += state[i]
+        return float(buckets[-1])
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (version 0.0.4)"""
+        data = self.snapshot()
+        lines = []
+        for name, (kind, help_text, buckets) in self.definitions.items():
+            values = data.get(name)
+            if not values:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, state in sorted(values.items()):
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(key)} {state}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, state):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(key, ("le", _format_bound(bound)))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key, ("le", "+Inf"))} {state[-1]}')
+                lines.append(f'{name}_sum{_format_labels(key)} {state[-2]}')
+                lines.append(f'{name}_count{_format_labels(key)} {state[-1]}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> List[str]:
+        """Строки итоговой сводки: время по стадиям, гистограммы (среднее, p50, p95), счетчики"""
+        data = self.snapshot()
+        lines = []
+        totals = [(stage, sum(state[-2] for state in data.get(name, {}).values())) for stage, name in STAGES]
+        if any(total for _, total in totals):
+            lines.append('Время по стадиям (сумма по потокам и процессам): '
+                         + ', '.join(f'{stage} {total:.1f} с' for stage, total in totals))
+
+        for name, (kind, _, _) in self.definitions.items():
+            for key, state in sorted(data.get(name, {}).items()):
+                label = f'{name}{_format_labels(key)}'
+                if kind == 'counter':
+                    lines.append(f'{label}: {state:g}')
+                    continue
+                count = state[-1]
+                if not count:
+                    continue
+                mean, p50, p95 = state[-2] / count, self.quantile(name, 0.5, state), self.quantile(name, 0.95, state)
+                lines.append(f'{label}: {count} шт., среднее {self._format(name, mean)}, '
+                             f'p50 ~{self._format(name, p50)}, p95 ~{self._format(name, p95)}')
+        return lines
+
+    @staticmethod
+    def _format(name: str, value: float) -> str:
+        if name.endswith('_seconds'):
+            return f'{value * 1000:.1f} мс'
+        if name.endswith('_bytes'):
+            return f'{value / 1024:.1f} КБ'
+        return f'{value:.1f}'
+
+
+# Реестр процесса: DataExtractor и парсеры пишут сюда без передачи объектов
+REGISTRY = MetricsRegistry()
+
+
+def enable(enabled: bool = True):
+    REGISTRY.enabled = enabled
+
+
+def enabled() -> bool:
+    return REGISTRY.enabled
+
+
+def observe(name: str, value: float, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+def timer(name: str, **labels):
+    return REGISTRY.timer(name, **labels)
+
+
+def timed(name: str, **labels):
+    """Декоратор: время каждого вызова функции в гистограмму name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+class MetricsServer:
+    """HTTP эндпоинт /metrics для Prometheus (фоновый поток)"""
+
+    def __init__(self, port: int, host: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY):
+        """
+        Args:
+            port: Порт (0 - любой свободный)
+            host: Адрес (по умолчанию только локальный)
+            registry: Реестр метрик
+        """
+        self.registry = registry
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                data = registry_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Метрики: {format % args}")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self) -> str:
+        self._thread.start()
+        logger.info(f"Метрики доступны на {self.url}")
+        return self.url
+
+    def stop(self):
+        """Остановка сервера и освобождение порта (и для сервера, который не запускался)"""
+        if self._thread.is_alive():
+            self.server.shutdown()
+            self._thread.join()
+        self.server.server_close()
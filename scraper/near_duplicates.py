@@ -0,0 +1,170 @@
+"""
+Поиск почти одинаковых статей (перепечатки, кросс-постинг между /news/, /stories/ и /columns/)
+через MinHash и LSH
+
+Каждой статье назначается cluster_id - URL первой статьи ее кластера; у статьи без похожих
+cluster_id совпадает с ее собственным URL. Поиск сервиса сворачивает выдачу по этому полю.
+"""
+
+import re
+import logging
+from zlib import crc32
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from .config import NEAR_DUP_SHINGLE, NEAR_DUP_PERMUTATIONS, NEAR_DUP_BANDS, NEAR_DUP_THRESHOLD
+from .records import Article
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Хэш-функции MinHash: (a * x + b) mod p над 32-битными хэшами шинглов, p - простое больше 2^32.
+# a, b < 2^32, поэтому a * x + b помещается в uint64
+_PRIME = np.uint64((1 << 32) + 15)
+_MASK = np.uint64(0xFFFFFFFF)
+# Множитель полиномиального хэша шингла по хэшам его слов
+_SHINGLE_BASE = np.uint64(1000003)
+_SEED = 20240501
+
+
+class NearDuplicateIndex:
+    """
+    Индекс сигнатур MinHash с поиском кандидатов через LSH
+
+    Сигнатура статьи - минимумы permutations хэш-функций по множеству шинглов (shingle
+    слов подряд) ее текста; доля совпадающих минимумов двух сигнатур - оценка сходства
+    Жаккара их текстов. Сигнатура режется на bands полос: статьи, совпавшие хотя бы
+    в одной полосе, - кандидаты, поэтому поиск не перебирает весь корпус. Кандидат
+    с оценкой не ниже threshold дает статье свой кластер.
+
+    Память: сигнатура (permutations x 4 байта) и bands ключей полос на статью.
+
+    Пример:
+        index = NearDuplicateIndex()
+        for article in articles:
+            index.assign(article)  # article['cluster_id']
+    """
+
+    def __init__(self, shingle: int = NEAR_DUP_SHINGLE, permutations: int = NEAR_DUP_PERMUTATIONS,
+                 bands: int = NEAR_DUP_BANDS, threshold: float = NEAR_DUP_THRESHOLD):
+        """
+        Args:
+            shingle: Длина шингла в словах
+            permutations: Число хэш-функций MinHash (длина сигнатуры)
+            bands: Число полос LSH (делитель permutations)
+            threshold: Порог оценки сходства Жаккара для попадания в кластер
+        """
+        if permutations % bands:
+            raise ValueError(f"Число хэш-функций {permutations} не делится на число полос {bands}")
+        self.shingle = shingle
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self.threshold = threshold
+        # Постоянное зерно: сигнатуры одного текста совпадают между запусками и процессами
+        rng = np.random.default_rng(_SEED)
+        self._a = rng.integers(1, 1 << 32, size=(permutations, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(permutations, 1), dtype=np.uint64)
+
+        self._signatures = np.empty((1024, permutations), dtype=np.uint32)
+        self._clusters: List[str] = []
+        # Полоса -> ключ полосы -> номер статьи (или список номеров при нескольких)
+        self._buckets: List[Dict[int, Union[int, List[int]]]] = [{} for _ in range(bands)]
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Сигнатура MinHash текста (None - в тексте нет слов)"""
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            return None
+        hashes = np.fromiter((crc32(word.encode('utf-8')) for word in words), dtype=np.uint64, count=len(words))
+        # Хэши шинглов: полиномиальный хэш shingle хэшей слов подряд (короткий текст - один шингл)
+        size = min(self.shingle, len(hashes))
+        shingles = hashes[:len(hashes) - size + 1].copy()
+        for offset in range(1, size):
+            shingles = (shingles * _SHINGLE_BASE + hashes[offset:len(hashes) - size + 1 + offset]) & _MASK
+        shingles = np.unique(shingles)
+        values = (self._a * shingles + self._b) % _PRIME
+        return (values.min(axis=1) & _MASK).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        return [hash(band.tobytes()) for band in signature.reshape(self.bands, self.rows)]
+
+    def query(self, signature: np.ndarray, keys: Optional[List[int]] = None) -> Optional[int]:
+        """Номер самой похожей статьи индекса с оценкой сходства не ниже порога"""
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys or self.band_keys(signature)):
+            found = bucket.get(key)
+            if found is None:
+                continue
+            if isinstance(found, int):
+                candidates.add(found)
+            else:
+                candidates.update(found)
+        if not candidates:
+            return None
+        candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[candidates] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return int(candidates[best]) if similarity[best] >= self.threshold else None
+
+    def add(self, signature: np.ndarray, cluster_id: str, keys: Optional[List[int]] = None) -> int:
+        position = len(self._clusters)
+        if position == len(self._signatures):
+            self._signatures = np.resize(self._signatures, (2 * position, self.permutations))
+        self._signatures[position] = signature
+        self._clusters.append(cluster_id)
+        for bucket, key in zip(self._buckets, keys or self.band_keys(signature)):
+            found = bucket.get(key)
+            if found is None:
+                bucket[key] = position
+            elif isinstance(found, int):
+                bucket[key] = [found, position]
+            else:
+                found.append(position)
+        return position
+
+    def assign(self, article: Union[Article, Dict], keep: bool = True) -> str:
+        """
+        Назначение кластера статье (записывается в article['cluster_id']) и добавление ее в индекс
+
+        Args:
+            article: Статья; кластер ищется по тексту, без текста - по заголовку и описанию
+            keep: Сохранить уже назначенный cluster_id (статьи из прошлого результата и фронтира)
+
+        Returns:
+            cluster_id статьи
+        """
+        url = article.get('url', '')
+        current = article.get('cluster_id') if keep else ''
+        text = article.get('text') or ' '.join(filter(None, (article.get('title'), article.get('description'))))
+        signature = self.signature(text)
+        if signature is None:
+            cluster_id = current or url
+        else:
+            keys = self.band_keys(signature)
+            match = self.query(signature, keys)
+            if match is not None:
+                self.duplicates += 1
+            cluster_id = current or (self._clusters[match] if match is not None else url)
+            self.add(signature, cluster_id, keys)
+        article['cluster_id'] = cluster_id
+        return cluster_id
+
+    def add_all(self, articles: Iterable[Union[Article, Dict]], keep: bool = True) -> int:
+        """Добавление корпуса в индекс (например, прошлого результата); возвращает количество статей"""
+        count = 0
+        for article in articles:
+            self.assign(article, keep)
+            count += 1
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Статей в индексе, из них почти дубликатов найденных ранее, и кластеров"""
+        return {'articles': len(self._clusters), 'duplicates': self.duplicates,
+                'clusters': len(set(self._clusters))}
@@ -3,22 +3,89 @@
 """
 
 import re
+import time
 import logging
-from typing import Dict, Optional
+from typing import Optional
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
-from .config import BASE_URL, SECTIONS, ARTICLE_URL_PATTERN, FULL_URL_PATTERN
+from .config import (BASE_URL, SECTIONS, ARTICLE_URL_PATTERN, FULL_URL_PATTERN,
+                     PARSER_BACKENDS, DEFAULT_PARSER_BACKEND)
 from .extractors import DataExtractor
+from .records import Article
+from .selector_cache import SelectorCache, run_cascade, soup_fingerprint
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+ARTICLE_URL_REGEX = re.compile(ARTICLE_URL_PATTERN)
+FULL_URL_REGEX = re.compile(FULL_URL_PATTERN)
+CARD_CLASS_REGEX = re.compile(r'article|card|post|item|news|story|column|opinion', re.I)
+
+# Общие теги сайта (есть почти на каждой странице), не относятся к конкретной статье
+COMMON_TAGS = {'Тренды', 'Деньги', 'Бизнес', 'Россия', 'Технологии', 
+               'Маркетплейсы', 'Стартапы', 'Искусственный интеллект', 
+               'IT', 'Личное'}
+
 
 class HTMLParser:
     """Класс для парсинга HTML страниц"""
     
-    def __init__(self):
+    # Каскады селекторов (аргументы soup.find) в порядке приоритета
+    H1 = [('h1', {'class_': re.compile(r'title|heading|article', re.I)}),
+          ('h1', {})]
+    AUTHOR = [('a', {'class_': re.compile(r'author|writer|journalist', re.I)}),
+              ('span', {'class_': re.compile(r'author', re.I)}),
+              ('div', {'class_': re.compile(r'author', re.I)}),
+              ('meta', {'property': 'article:author'}),
+              ('span', {'itemprop': 'author'}),
+              ('div', {'itemprop': 'author'})]
+    DATE = [('time', {}),
+            ('time', {'datetime': True}),
+            ('span', {'class_': re.compile(r'date|time', re.I)}),
+            ('div', {'class_': re.compile(r'date|time', re.I)}),
+            ('meta', {'property': 'article:published_time'}),
+            ('span', {'itemprop': 'datePublished'})]
+    CONTENT = [('article', {}),
+               ('div', {'class_': re.compile(r'content|article|text|body|post', re.I)}),
+               ('main', {}),
+               ('div', {'itemprop': 'articleBody'}),
+               ('section', {'class_': re.compile(r'content|article', re.I)})]
+    DESCRIPTION = [('meta', {'property': 'og:description'}),
+                   ('meta', {'attrs': {'name': 'description'}}),
+                   ('div', {'class_': re.compile(r'description|excerpt|lead', re.I)})]
+    ARTICLE_CONTENT = CONTENT[:3]
+    TAGS_SECTION = [('section', {'class_': re.compile(r'tag', re.I)}),
+                    ('div', {'class_': re.compile(r'tags|tag-list|tag-cloud', re.I)}),
+                    ('ul', {'class_': re.compile(r'tag', re.I)})]
+    BREADCRUMBS = [('nav', {'class_': re.compile(r'breadcrumb', re.I)}),
+                   ('div', {'class_': re.compile(r'breadcrumb', re.I)}),
+                   ('ol', {'class_': re.compile(r'breadcrumb', re.I)})]
+    
+    def __init__(self, use_selector_cache: bool = True):
+        """
+        Args:
+            use_selector_cache: Запоминать сработавшие селекторы для шаблона страницы
+        """
         self.extractor = DataExtractor()
+        self.selector_cache = SelectorCache() if use_selector_cache else None
+    
+    def select(self, fingerprint: Optional[str], field: str, selectors: list, run):
+        """
+        Поиск элемента по каскаду селекторов (через кэш шаблонов, если он включен)
+        
+        Args:
+            fingerprint: Отпечаток шаблона страницы (None - кэш не используется)
+            field: Имя поля
+            selectors: Каскад селекторов
+            run: Применение одного селектора к странице
+            
+        Returns:
+            Найденный элемент или None
+        """
+        if self.selector_cache is None or fingerprint is None:
+            return run_cascade(selectors, run)[1]
+        return self.selector_cache.select(fingerprint, field, selectors, run)
     
     def detect_content_type(self, url: str, soup: BeautifulSoup) -> str:
         """
@@ -50,7 +117,22 @@ class HTMLParser:
         
         return 'unknown'
     
-    def parse_article(self, url: str, soup: BeautifulSoup) -> Optional[Dict]:
+    def parse_html(self, url: str, html: str) -> Optional[Article]:
+        """
+        Парсинг статьи из HTML
+        
+        Args:
+            url: URL статьи
+            html: HTML страницы
+            
+        Returns:
+            Запись статьи (Article) или None
+        """
+        with metrics.timer('rb_parse_seconds', stage='tree'):
+            soup = BeautifulSoup(html, 'lxml')
+        return self.parse_article(url, soup)
+    
+    def parse_article(self, url: str, soup: BeautifulSoup) -> Optional[Article]:
         """
         Парсинг страницы статьи
         
@@ -59,26 +141,23 @@ class HTMLParser:
             soup: BeautifulSoup объект
             
         Returns:
-            Словарь с данными статьи или None
+            Запись статьи (Article) или None
         """
+        started = time.perf_counter()
         try:
             from datetime import datetime
             
-            article = {
-                'url': url,
-                'title': '',
-                'content_type': self.detect_content_type(url, soup),
-                'author': '',
-                'date': '',
-                'tags': [],
-                'categories': [],
-                'text': '',
-                'companies': [],
-                'people': [],
-                'money': [],
-                'description': '',
-                'scraped_at': datetime.now().isoformat()
-            }
+            fingerprint = soup_fingerprint(url, soup) if self.selector_cache is not None else None
+            
+            def find(field: str, selectors: list):
+                return self.select(fingerprint, field, selectors,
+                                   lambda selector: soup.find(selector[0], **selector[1]))
+            
+            article = Article(
+                url=url,
+                content_type=self.detect_content_type(url, soup),
+                scraped_at=datetime.now().isoformat()
+            )
             
             # Заголовок (множественные варианты поиска)
             # Сначала проверяем мета-теги (они более надежны), потом h1, потом title
@@ -92,8 +171,7 @@ class HTMLParser:
             
             # 2. Если не нашли, ищем h1 с текстом
             if not title_text:
-                h1_elem = (soup.find('h1', class_=re.compile(r'title|heading|article', re.I)) or
-                          soup.find('h1'))
+                h1_elem = find('h1', self.H1)
                 if h1_elem:
                     h1_text = h1_elem.get_text(strip=True)
                     if h1_text:  # Проверяем что h1 не пустой
@@ -112,12 +190,7 @@ class HTMLParser:
                 article['title'] = title_text
             
             # Автор (множественные варианты поиска)
-            author_elem = (soup.find('a', class_=re.compile(r'author|writer|journalist', re.I)) or
-                          soup.find('span', class_=re.compile(r'author', re.I)) or
-                          soup.find('div', class_=re.compile(r'author', re.I)) or
-                          soup.find('meta', property='article:author') or
-                          soup.find('span', itemprop='author') or
-                          soup.find('div', itemprop='author'))
+            author_elem = find('author', self.AUTHOR)
             if author_elem:
                 if author_elem.name == 'meta':
                     article['author'] = author_elem.get('content', '')
@@ -125,12 +198,7 @@ class HTMLParser:
                     article['author'] = author_elem.get_text(strip=True)
             
             # Дата (множественные варианты поиска)
-            date_elem = (soup.find('time') or
-                        soup.find('time', datetime=True) or
-                        soup.find('span', class_=re.compile(r'date|time', re.I)) or
-                        soup.find('div', class_=re.compile(r'date|time', re.I)) or
-                        soup.find('meta', property='article:published_time') or
-                        soup.find('span', itemprop='datePublished'))
+            date_elem = find('date', self.DATE)
             if date_elem:
                 if date_elem.name == 'meta':
                     article['date'] = date_elem.get('content', '')
@@ -140,11 +208,7 @@ class HTMLParser:
                     article['date'] = date_elem.get_text(strip=True)
             
             # Основной текст статьи (множественные варианты поиска)
-            content_elem = (soup.find('article') or
-                           soup.find('div', class_=re.compile(r'content|article|text|body|post', re.I)) or
-                           soup.find('main') or
-                           soup.find('div', itemprop='articleBody') or
-                           soup.find('section', class_=re.compile(r'content|article', re.I)))
+            content_elem = find('content', self.CONTENT)
             if content_elem:
                 # Удаляем скрипты, стили и ненужные элементы
                 for script in content_elem(["script", "style", "nav", "footer", "header", "aside", "form"]):
@@ -152,9 +216,7 @@ class HTMLParser:
                 article['text'] = content_elem.get_text(separator=' ', strip=True)
             
             # Описание/краткое содержание
-            desc_elem = (soup.find('meta', property='og:description') or
-                        soup.find('meta', attrs={'name': 'description'}) or
-                        soup.find('div', class_=re.compile(r'description|excerpt|lead', re.I)))
+            desc_elem = find('description', self.DESCRIPTION)
             if desc_elem:
                 if desc_elem.name == 'meta':
                     article['description'] = desc_elem.get('content', '')
@@ -173,9 +235,7 @@ class HTMLParser:
                     tags_elems.append(tag_content)
             
             # 2. Ищем теги внутри контента статьи (исключаем header, footer, nav, aside)
-            article_content = (soup.find('article') or 
-                             soup.find('div', class_=re.compile(r'content|article|text|body|post', re.I)) or
-                             soup.find('main'))
+            article_content = find('article_content', self.ARTICLE_CONTENT)
             
             if article_content:
                 # Исключаем глобальные элементы
@@ -189,16 +249,11 @@ class HTMLParser:
                         if not tag.find_parents(['header', 'nav', 'footer', 'aside']):
                             tag_text = tag.get_text(strip=True)
                             # Исключаем общие теги сайта (которые есть везде)
-                            common_tags = {'Тренды', 'Деньги', 'Бизнес', 'Россия', 'Технологии', 
-                                         'Маркетплейсы', 'Стартапы', 'Искусственный интеллект', 
-                                         'IT', 'Личное'}
-                            if tag_text and tag_text not in common_tags and tag_text not in tags_elems:
+                            if tag_text and tag_text not in COMMON_TAGS and tag_text not in tags_elems:
                                 tags_elems.append(tag_text)
             
             # 3. Ищем в специальных блоках тегов статьи (обычно внизу статьи, но не в футере)
-            tags_section = (soup.find('section', class_=re.compile(r'tag', re.I)) or
-                          soup.find('div', class_=re.compile(r'tags|tag-list|tag-cloud', re.I)) or
-                          soup.find('ul', class_=re.compile(r'tag', re.I)))
+            tags_section = find('tags_section', self.TAGS_SECTION)
             
             if tags_section:
                 # Исключаем навигацию и глобальные элементы
@@ -224,9 +279,7 @@ class HTMLParser:
             article['tags'] = list(set([tag.strip() for tag in tags_elems if tag.strip()]))
             
             # Категории (из хлебных крошек, навигации или мета-тегов)
-            breadcrumbs = (soup.find('nav', class_=re.compile(r'breadcrumb', re.I)) or
-                          soup.find('div', class_=re.compile(r'breadcrumb', re.I)) or
-                          soup.find('ol', class_=re.compile(r'breadcrumb', re.I)))
+            breadcrumbs = find('breadcrumbs', self.BREADCRUMBS)
             if breadcrumbs:
                 links = breadcrumbs.find_all('a')
                 article['categories'] = [link.get_text(strip=True) for link in links if link.get_text(strip=True)]
@@ -236,11 +289,11 @@ class HTMLParser:
             if category_meta:
                 article['categories'].append(category_meta.get('content', ''))
             
+            metrics.observe('rb_parse_seconds', time.perf_counter() - started, stage='fields')
+            
             # Извлечение уникальных полей из текста
             full_text = article['text'] + ' ' + article['description'] + ' ' + article['title']
-            article['money'] = self.extractor.extract_money(full_text)
-            article['companies'] = self.extractor.extract_companies(full_text)
-            article['people'] = self.extractor.extract_people(full_text)
+            article.update(self.extractor.extract_all(full_text))
             
             return article
             
@@ -248,6 +301,7 @@ class HTMLParser:
             logger.error(f"Ошибка при парсинге {url}: {e}")
             return None
     
+    @metrics.timed('rb_parse_seconds', stage='links')
     def extract_article_links(self, soup: BeautifulSoup) -> list:
         """
         Извлечение ссылок на статьи из HTML
@@ -256,18 +310,17 @@ class HTMLParser:
             soup: BeautifulSoup объект
             
         Returns:
-            Список URL статей
+            Список URL статей (без повторов, в порядке обнаружения)
         """
-        urls = []
-        article_links = []
-        
-        # Паттерн для поиска ссылок на статьи
-        article_pattern = re.compile(ARTICLE_URL_PATTERN)
+        # Ссылки, найденные несколькими способами, учитываем один раз (по объекту тега)
+        article_links = {}
         
         # Различные способы поиска ссылок на статьи
-        # 1. Поиск по паттерну в href (самый надежный способ)
-        links_by_pattern = soup.find_all('a', href=article_pattern)
-        article_links.extend(links_by_pattern)
+        # 1. Поиск по паттерну в href (самый надежный способ). Покрывает и ссылки
+        # с подходящим href внутри <li> и в остальной части страницы
+        links_by_pattern = soup.find_all('a', href=ARTICLE_URL_REGEX)
+        for link in links_by_pattern:
+            article_links.setdefault(id(link), link)
         logger.debug(f"Найдено ссылок по паттерну: {len(links_by_pattern)}")
         
         # 2. Поиск в статьях
@@ -275,54 +328,46 @@ class HTMLParser:
         logger.debug(f"Найдено тегов <article>: {len(articles)}")
         for article in articles:
             link = article.find('a', href=True)
-            if link and link not in article_links:
-                article_links.append(link)
+            if link:
+                article_links.setdefault(id(link), link)
         
-        # 3. Поиск в карточках/блоках статей (расширенный поиск)
-        cards = soup.find_all(['div', 'section', 'li'], class_=re.compile(r'article|card|post|item|news|story|column|opinion', re.I))
+        # 3. Поиск в карточках/блоках статей (все ссылки внутри карточки, не только первая)
+        cards = soup.find_all(['div', 'section', 'li'], class_=CARD_CLASS_REGEX)
         logger.debug(f"Найдено карточек: {len(cards)}")
         for card in cards:
-            # Ищем все ссылки внутри карточки, не только первую
-            links_in_card = card.find_all('a', href=True)
-            for link in links_in_card:
-                if link not in article_links:
-                    article_links.append(link)
-        
-        # 4. Поиск всех ссылок и фильтрация по паттерну (более широкий поиск)
-        all_links = soup.find_all('a', href=True)
-        logger.debug(f"Всего ссылок на странице: {len(all_links)}")
-        for link in all_links:
-            href = link.get('href', '')
-            if href:
-                # Проверяем относительные и абсолютные ссылки
-                if article_pattern.search(href):
-                    if link not in article_links:
-                        article_links.append(link)
-        
-        # 5. Дополнительный поиск в списках статей (часто статьи в <ul><li>)
-        list_items = soup.find_all('li')
-        for li in list_items:
-            link = li.find('a', href=True)
-            if link and article_pattern.search(link.get('href', '')):
-                if link not in article_links:
-                    article_links.append(link)
+            for link in card.find_all('a', href=True):
+                article_links.setdefault(id(link), link)
         
         logger.debug(f"Всего найдено потенциальных ссылок на статьи: {len(article_links)}")
         
         # Обработка найденных ссылок
-        url_pattern = re.compile(FULL_URL_PATTERN)
-        for link in article_links:
+        urls = {}
+        for link in article_links.values():
             href = link.get('href', '')
             if href:
                 full_url = urljoin(BASE_URL, href)
                 # Фильтруем только прямые ссылки на статьи
-                if url_pattern.match(full_url):
+                if FULL_URL_REGEX.match(full_url):
                     # Убираем параметры и слеш в конце для нормализации
                     normalized_url = full_url.rstrip('/').split('?')[0] + '/'
                     # Исключаем страницы пагинации и другие служебные страницы
-                    if '/page/' not in normalized_url and normalized_url not in urls:
-                        urls.append(normalized_url)
+                    if '/page/' not in normalized_url:
+                        urls.setdefault(normalized_url)
         
         logger.debug(f"После фильтрации осталось уникальных URL: {len(urls)}")
-        return urls
+        return list(urls)
 
+def create_parser(backend: str = DEFAULT_PARSER_BACKEND, use_selector_cache: bool = True) -> HTMLParser:
+    """
+    Создание парсера статей
+    
+    Args:
+        backend: 'bs4' (BeautifulSoup) или 'lxml' (XPath по дереву lxml, быстрее)
+        use_selector_cache: Запоминать сработавшие селекторы для шаблона страницы
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Неизвестный парсер {backend!r}, доступны: {', '.join(PARSER_BACKENDS)}")
+    if backend == 'lxml':
+        from .lxml_parser import LxmlHTMLParser
+        return LxmlHTMLParser(use_selector_cache)
+    return HTMLParser(use_selector_cache)
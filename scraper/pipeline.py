@@ -0,0 +1,155 @@
+"""
+Конвейер загрузка -> парсинг: I/O поток кладет HTML в ограниченную очередь,
+пул процессов парсит страницы и извлекает данные
+"""
+
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .config import PARSE_QUEUE_SIZE, DEFAULT_PARSER_BACKEND
+from .parsers import HTMLParser, create_parser
+from .records import Article
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_worker_parser: Optional[HTMLParser] = None
+
+# Маркер конца потока страниц
+_DONE = object()
+
+
+def _init_worker(parser_backend: str = DEFAULT_PARSER_BACKEND, collect_metrics: bool = False):
+    """Инициализация процесса-парсера (один парсер на процесс)"""
+    global _worker_parser
+    _worker_parser = create_parser(parser_backend)
+    # При fork процесс получает копию метрик основного процесса: приращения считаем с нуля
+    metrics.REGISTRY.reset()
+    metrics.enable(collect_metrics)
+
+
+def parse_page(url: str, html: str) -> Optional[Article]:
+    """Парсинг статьи в процессе пула"""
+    parser = _worker_parser or create_parser()
+    return parser.parse_html(url, html)
+
+
+def parse_page_with_metrics(url: str, html: str) -> Tuple[Optional[Article], Dict]:
+    """Парсинг статьи и приращение метрик процесса с прошлого вызова (для основного процесса)"""
+    return parse_page(url, html), metrics.REGISTRY.snapshot(reset=True)
+
+
+class ParsePipeline:
+    """
+    Двухстадийный конвейер с обратным давлением
+
+    Загрузка идет в отдельном потоке и не ждет парсинга, пока очередь не заполнена;
+    парсинг идет в пуле процессов и не упирается в GIL. Если парсеры не успевают,
+    очередь заполняется и загрузка приостанавливается, и наоборот.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: int = PARSE_QUEUE_SIZE,
+                 parser_backend: str = DEFAULT_PARSER_BACKEND):
+        """
+        Args:
+            workers: Количество процессов-парсеров (по умолчанию - число ядер)
+            queue_size: Максимальное количество загруженных, но еще не отданных в парсинг страниц
+            parser_backend: Парсер статей в процессах ('bs4' или 'lxml')
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.parser_backend = parser_backend
+
+    def _produce(self, pages: Iterable[Tuple[str, Optional[str]]], pages_queue: queue.Queue,
+                 stop: threading.Event):
+        """I/O стадия: перекладывает загруженные страницы в очередь"""
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for page in pages:
+                if not put(page):
+                    break
+        except Exception as e:
+            logger.error(f"Ошибка в стадии загрузки: {e}", exc_info=True)
+        finally:
+            # Генератор загрузки закрываем в том же потоке, где он работал
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+            put(_DONE)
+
+    def run(self, pages: Iterable[Tuple[str, Optional[str]]]) -> Iterator[Tuple[str, Optional[Article]]]:
+        """
+        Прогон страниц через конвейер
+
+        Args:
+            pages: Пары (url, html) от стадии загрузки; html равен None при ошибке загрузки
+
+        Yields:
+            Пары (url, статья) по мере готовности, статья равна None при ошибке
+        """
+        pages_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(pages, pages_queue, stop),
+                                    name='fetch-stage', daemon=True)
+        max_in_flight = self.workers * 2
+        # Метрики разбора и извлечения собираются в процессах и приходят вместе со статьей
+        collect_metrics = metrics.enabled()
+        task = parse_page_with_metrics if collect_metrics else parse_page
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.parser_backend, collect_metrics)) as pool:
+            producer.start()
+            future_to_url = {}
+            finished = False
+            try:
+                while not finished or future_to_url:
+                    # Берем новые страницы, пока в пуле есть место
+                    while not finished and len(future_to_url) < max_in_flight:
+                        try:
+                            item = pages_queue.get(timeout=0.1 if future_to_url else None)
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            finished = True
+                            break
+                        metrics.observe('rb_queue_depth', pages_queue.qsize(), queue='parse')
+                        url, html = item
+                        if html is None:
+                            yield url, None
+                            continue
+                        future_to_url[pool.submit(task, url, html)] = url
+
+                    if not future_to_url:
+                        continue
+
+                    timeout = None if finished or len(future_to_url) >= max_in_flight else 0
+                    done, _ = wait(future_to_url, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = future_to_url.pop(future)
+                        try:
+                            article = future.result()
+                        except Exception as e:
+                            logger.error(f"Ошибка при парсинге {url}: {e}")
+                            yield url, None
+                            continue
+                        if collect_metrics:
+                            article, delta = article
+                            metrics.REGISTRY.merge(delta)
+                        yield url, article
+            finally:
+                stop.set()
+                for future in future_to_url:
+                    future.cancel()
+                producer.join()
@@ -0,0 +1,77 @@
+"""
+Модуль ограничения частоты запросов (token bucket на каждый хост)
+"""
+
+import time
+import asyncio
+import threading
+from typing import Dict
+from urllib.parse import urlparse
+
+from .config import DEFAULT_BURST
+
+
+class RateLimiter:
+    """
+    Общий лимитер запросов: отдельное ведро токенов на каждый хост
+
+    Один экземпляр разделяется всеми потоками и корутинами скрапера,
+    поэтому итоговая частота запросов не зависит от количества воркеров.
+    """
+
+    def __init__(self, rate: float, burst: int = DEFAULT_BURST):
+        """
+        Инициализация лимитера
+
+        Args:
+            rate: Целевое количество запросов в секунду на хост
+            burst: Максимальное количество запросов, которые можно выполнить подряд без ожидания
+        """
+        if rate <= 0:
+            raise ValueError("rate должен быть больше нуля")
+        if burst < 1:
+            raise ValueError("burst должен быть не меньше 1")
+
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str) -> float:
+        """
+        Резервирование токена для запроса к хосту
+
+        Токен списывается сразу, даже если ведро пусто, поэтому очередь
+        ожидающих запросов выстраивается без повторных проверок.
+
+        Args:
+            url: URL запроса
+
+        Returns:
+            Сколько секунд нужно подождать перед запросом
+        """
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self._buckets[host] = bucket
+
+            tokens, updated = bucket
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate) - 1
+            bucket[0], bucket[1] = tokens, now
+
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    def acquire(self, url: str):
+        """Блокирующее ожидание разрешения на запрос"""
+        wait_time = self.reserve(url)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self, url: str):
+        """Ожидание разрешения на запрос внутри цикла событий"""
+        wait_time = self.reserve(url)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
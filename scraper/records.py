@@ -0,0 +1,345 @@
+"""
+Записи статей (Article) и сумм (Money) со слотами и их кодирование: компактный JSON
+(те же ключи, что у словарей статей) и двоичный формат
+
+Записи читаются как словари (article['title'], article.get('money', [])), поэтому код,
+написанный для словарей, работает с ними без изменений. Модуль без внешних зависимостей:
+его импортирует и индексатор search_app.
+"""
+
+import json
+import struct
+from collections.abc import Mapping
+from itertools import accumulate
+from operator import attrgetter, itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+# Порядок полей - как в словаре статьи из парсеров; он же порядок в двоичном формате
+ARTICLE_FIELDS = ('url', 'title', 'content_type', 'author', 'date', 'tags', 'categories', 'text',
+                  'companies', 'people', 'money', 'description', 'scraped_at', 'cluster_id')
+MONEY_FIELDS = ('amount', 'multiplier', 'currency', 'original')
+SCALAR_FIELDS = ('url', 'title', 'content_type', 'author', 'date', 'text', 'description', 'scraped_at',
+                 'cluster_id')
+LIST_FIELDS = ('tags', 'categories', 'companies', 'people')
+_MONEY_POSITION = ARTICLE_FIELDS.index('money')
+
+# Двоичный формат записи: 5 x uint32 (длины списков LIST_FIELDS и money), затем uint32 длины
+# (в символах) всех строк - SCALAR_FIELDS, элементы списков, поля сумм по порядку, затем
+# все строки подряд одним куском UTF-8: он декодируется за один вызов и режется по длинам.
+# В файле перед каждой записью - ее длина в байтах (uint32)
+BINARY_VERSION = 2
+_HEADER = struct.Struct('<5I')
+_LENGTH = struct.Struct('<I')
+_FILE_MAGIC = b'RBREC' + bytes([BINARY_VERSION])
+# Число строк SCALAR_FIELDS в записи по версиям: в версии 1 еще не было cluster_id
+_SCALAR_COUNTS = {1: len(SCALAR_FIELDS) - 1, 2: len(SCALAR_FIELDS)}
+_FILE_VERSIONS = {b'RBREC' + bytes([version]): version for version in _SCALAR_COUNTS}
+
+
+class _Record(Mapping):
+    """Общая часть записей: доступ к полям как к ключам словаря"""
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def update(self, values: Mapping):
+        for key, value in values.items():
+            self[key] = value
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={self[name]!r:.60}' for name in self)
+        return f'{type(self).__name__}({fields})'
+
+
+class Money(_Record):
+    """Сумма из текста статьи: amount - число строкой ('1.5'), multiplier, currency, original"""
+
+    __slots__ = MONEY_FIELDS
+    FIELDS = MONEY_FIELDS
+    _FIELD_SET = frozenset(MONEY_FIELDS)
+
+    def __init__(self, amount: str = '', multiplier: str = '', currency: str = '', original: str = ''):
+        self.amount = amount
+        self.multiplier = multiplier
+        self.currency = currency
+        self.original = original
+        self._extra = None
+
+    def __reduce__(self):
+        # Компактный pickle для передачи из процессов-парсеров: только значения полей
+        return Money, _money_values(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'Money':
+        if isinstance(data, Money):
+            return data
+        if len(data) == len(MONEY_FIELDS):
+            try:
+                return cls(*_money_items(data))
+            except KeyError:
+                pass
+        money = cls(data.get('amount', ''), data.get('multiplier', ''), data.get('currency', ''),
+                    data.get('original', ''))
+        for key in data.keys() - cls._FIELD_SET:
+            money[key] = data[key]
+        return money
+
+    def to_dict(self) -> Dict:
+        data = {'amount': self.amount, 'multiplier': self.multiplier, 'currency': self.currency,
+                'original': self.original}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+
+class Article(_Record):
+    """
+    Статья со слотами вместо словаря
+
+    Поля - ARTICLE_FIELDS, money - список Money, cluster_id - URL первой статьи кластера
+    почти одинаковых текстов (scraper/near_duplicates.py). Ключи, которых нет в ARTICLE_FIELDS
+    (например, добавленные при обработке корпуса), хранятся отдельно и не теряются
+    при кодировании.
+    """
+
+    __slots__ = ARTICLE_FIELDS
+    FIELDS = ARTICLE_FIELDS
+    _FIELD_SET = frozenset(ARTICLE_FIELDS)
+
+    def __init__(self, url: str = '', title: str = '', content_type: str = '', author: str = '',
+                 date: str = '', tags: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+                 text: str = '', companies: Optional[List[str]] = None, people: Optional[List[str]] = None,
+                 money: Optional[List[Money]] = None, description: str = '', scraped_at: str = '',
+                 cluster_id: str = ''):
+        self.url = url
+        self.title = title
+        self.content_type = content_type
+        self.author = author
+        self.date = date
+        self.tags = tags if tags is not None else []
+        self.categories = categories if categories is not None else []
+        self.text = text
+        self.companies = companies if companies is not None else []
+        self.people = people if people is not None else []
+        self.money = money if money is not None else []
+        self.description = description
+        self.scraped_at = scraped_at
+        self.cluster_id = cluster_id
+        self._extra = None
+
+    def __setitem__(self, key, value):
+        if key == 'money':
+            value = [Money.from_dict(item) for item in value]
+        super().__setitem__(key, value)
+
+    def __reduce__(self):
+        # Суммы передаются кортежами значений: pickle не вызывает __reduce__ для каждой
+        values = list(_article_values(self))
+        values[_MONEY_POSITION] = [money.to_dict() if money._extra else _money_values(money) for money in self.money]
+        return _article_from_state, (tuple(values), self._extra)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'Article':
+        """Запись из словаря статьи (отсутствующие поля - пустые, None - пустая строка)"""
+        if isinstance(data, Article):
+            return data
+        if len(data) == len(ARTICLE_FIELDS):
+            # Словарь из парсера или потока: все поля на месте, нужны только суммы
+            try:
+                article = cls(*_article_items(data))
+            except KeyError:
+                pass
+            else:
+                if all(type(value) is str for value in _scalar_values(article)):
+                    article.money = _money_list(article.money)
+                    return article
+        article = cls.__new__(cls)
+        article._extra = None
+        for name in SCALAR_FIELDS:
+            value = data.get(name)
+            setattr(article, name, value if value is not None else '')
+        for name in LIST_FIELDS:
+            value = data.get(name)
+            setattr(article, name, list(value) if value else [])
+        article.money = _money_list(data.get('money'))
+        for key in data.keys() - cls._FIELD_SET:
+            article[key] = data[key]
+        return article
+
+    def to_dict(self) -> Dict:
+        """Обычный словарь (money - список словарей)"""
+        data = {
+            'url': self.url, 'title': self.title, 'content_type': self.content_type, 'author': self.author,
+            'date': self.date, 'tags': self.tags, 'categories': self.categories, 'text': self.text,
+            'companies': self.companies, 'people': self.people,
+            'money': [{'amount': money.amount, 'multiplier': money.multiplier, 'currency': money.currency,
+                       'original': money.original} if money._extra is None else money.to_dict()
+                      for money in self.money],
+            'description': self.description, 'scraped_at': self.scraped_at, 'cluster_id': self.cluster_id,
+        }
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+
+_article_values = attrgetter(*ARTICLE_FIELDS)
+_money_values = attrgetter(*MONEY_FIELDS)
+_scalar_values = attrgetter(*SCALAR_FIELDS)
+_list_values = attrgetter(*LIST_FIELDS)
+_article_items = itemgetter(*ARTICLE_FIELDS)
+_money_items = itemgetter(*MONEY_FIELDS)
+
+
+def _money_list(items) -> List[Money]:
+    """Суммы из списка словарей, записей или кортежей значений (некорректные элементы пропускаются)"""
+    result = []
+    for item in items or ():
+        kind = type(item)
+        if kind is dict and item.keys() == Money._FIELD_SET:
+            result.append(Money(item['amount'], item['multiplier'], item['currency'], item['original']))
+        elif kind is tuple:
+            result.append(Money(*item))
+        elif isinstance(item, (dict, Money)):
+            result.append(Money.from_dict(item))
+    return result
+
+
+def _article_from_state(values: tuple, extra: Optional[Dict]) -> Article:
+    article = Article(*values)
+    article.money = _money_list(article.money)
+    article._extra = extra
+    return article
+
+
+def plain(value):
+    """default для json: записи кодируются как словари"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+# Кодировщик создается один раз: json.dumps с параметрами строит новый на каждый вызов
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=plain)
+_JSON_DECODER = json.JSONDecoder()
+
+
+def dumps_json(article: Union[Article, Dict]) -> str:
+    """Компактный JSON статьи (запись или словарь) - одна строка без отступов"""
+    if type(article) is Article:
+        article = article.to_dict()
+    return _JSON_ENCODER.encode(article)
+
+
+def loads_json(data: Union[str, bytes]) -> Article:
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return Article.from_dict(_JSON_DECODER.decode(data))
+
+
+def dumps_binary(article: Union[Article, Dict]) -> bytes:
+    """
+    Двоичная запись статьи (без длины впереди)
+
+    Дополнительные ключи (не из ARTICLE_FIELDS) в двоичный формат не попадают.
+    """
+    article = Article.from_dict(article)
+    lists = _list_values(article)
+    strings = list(_scalar_values(article))
+    for values in lists:
+        strings.extend(values)
+    for money in article.money:
+        strings.extend(_money_values(money))
+    header = _HEADER.pack(*map(len, lists), len(article.money))
+    lengths = struct.pack(f'<{len(strings)}I', *map(len, strings))
+    return b''.join((header, lengths, ''.join(strings).encode('utf-8')))
+
+
+def loads_binary(data: bytes, version: int = BINARY_VERSION) -> Article:
+    """
+    Статья из двоичной записи
+
+    Args:
+        version: Версия формата файла (записи версии 1 - без cluster_id, он остается пустым)
+    """
+    scalars = _SCALAR_COUNTS[version]
+    counts = _HEADER.unpack_from(data)
+    total = scalars + sum(counts[:4]) + len(MONEY_FIELDS) * counts[4]
+    ends = list(accumulate(struct.unpack_from(f'<{total}I', data, _HEADER.size)))
+    body = data[_HEADER.size + 4 * total:].decode('utf-8')
+    strings = [body[start:end] for start, end in zip([0] + ends, ends)]
+    if scalars < len(SCALAR_FIELDS):
+        strings[scalars:scalars] = [''] * (len(SCALAR_FIELDS) - scalars)
+
+    position = len(SCALAR_FIELDS)
+    lists = []
+    for count in counts[:4]:
+        lists.append(strings[position:position + count])
+        position += count
+    money = [Money(*strings[i:i + 4]) for i in range(position, position + 4 * counts[4], 4)]
+    url, title, content_type, author, date, text, description, scraped_at, cluster_id = strings[:len(SCALAR_FIELDS)]
+    return Article(url, title, content_type, author, date, lists[0], lists[1], text, lists[2], lists[3],
+                   money, description, scraped_at, cluster_id)
+
+
+def write_binary(f: BinaryIO, articles: Iterable[Union[Article, Dict]], header: bool = True) -> int:
+    """
+    Запись статей в двоичный файл (f открыт в режиме 'wb' или 'ab')
+
+    Args:
+        header: Записать сигнатуру файла (для нового файла); без нее дописывать можно только
+                в файл текущей версии BINARY_VERSION, старый файл нужно переписать
+
+    Returns:
+        Количество записанных статей
+    """
+    if header:
+        f.write(_FILE_MAGIC)
+    count = 0
+    for article in articles:
+        data = dumps_binary(article)
+        f.write(_LENGTH.pack(len(data)))
+        f.write(data)
+        count += 1
+    return count
+
+
+def iter_binary(f: BinaryIO) -> Iterator[Article]:
+    """Чтение статей из двоичного файла, записанного write_binary (текущей или прошлой версии)"""
+    magic = f.read(len(_FILE_MAGIC))
+    version = _FILE_VERSIONS.get(magic)
+    if version is None:
+        raise ValueError(f"Неизвестный формат записей: {magic!r}")
+    while True:
+        prefix = f.read(_LENGTH.size)
+        if len(prefix) < _LENGTH.size:
+            return
+        (length,) = _LENGTH.unpack(prefix)
+        data = f.read(length)
+        if len(data) < length:
+            # Недописанная последняя запись после аварийного завершения
+            return
+        yield loads_binary(data, version)
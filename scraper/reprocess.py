@@ -0,0 +1,63 @@
+"""
+Повторный парсинг статей из архива исходного HTML без обращения к сети
+"""
+
+import logging
+from typing import Optional
+from tqdm import tqdm
+
+from .config import DEFAULT_ARCHIVE_PATH, DEFAULT_PARSER_BACKEND
+from .archive import PageArchive
+from .pipeline import ParsePipeline
+from .storage import ArticleSink
+from .near_duplicates import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+
+def reprocess(archive_path: str = DEFAULT_ARCHIVE_PATH, output_path: str = 'rb_articles_reprocessed.jsonl',
+              workers: Optional[int] = None, parser_backend: str = DEFAULT_PARSER_BACKEND,
+              compression: Optional[str] = None, near_duplicates: bool = False) -> int:
+    """
+    Парсинг и извлечение данных заново по всем страницам архива
+
+    Страницы читаются из сегментов последовательно и разбираются в пуле процессов
+    (по умолчанию на всех ядрах). Время scraped_at берется из архива - это время
+    загрузки страницы, а не повторного парсинга.
+
+    Args:
+        archive_path: Каталог архива
+        output_path: Файл JSON Lines для статей (перезаписывается)
+        workers: Количество процессов-парсеров (по умолчанию - число ядер)
+        parser_backend: Парсер статей ('bs4' или 'lxml')
+        compression: Сжатие выходного файла: None, 'gzip' или 'zstd'
+        near_duplicates: Назначить статьям cluster_id почти одинаковых текстов
+
+    Returns:
+        Количество записанных статей
+    """
+    archive = PageArchive(archive_path)
+    fetched_at = archive.fetched_at()
+    pipeline = ParsePipeline(workers, parser_backend=parser_backend)
+    sink = ArticleSink(output_path, compression)
+    index = NearDuplicateIndex() if near_duplicates else None
+    logger.info(f"Повторный парсинг {len(fetched_at)} страниц из {archive_path} ({pipeline.workers} процессов)")
+
+    failed = 0
+    try:
+        with tqdm(total=len(fetched_at), desc="Повторный парсинг") as pbar:
+            for url, article in pipeline.run(archive.iter_pages()):
+                pbar.update(1)
+                if not article:
+                    failed += 1
+                    continue
+                article['scraped_at'] = fetched_at.get(url, article['scraped_at'])
+                if index is not None:
+                    index.assign(article)
+                sink.write(article)
+    finally:
+        sink.close()
+        archive.close()
+
+    logger.info(f"В {output_path} записано {sink.written} статей, не удалось разобрать: {failed}")
+    return sink.written
@@ -0,0 +1,106 @@
+"""
+Модуль отложенных повторов для неудачных загрузок
+"""
+
+import time
+import heapq
+import random
+import logging
+from typing import Dict, List, Optional
+
+from .config import DEFAULT_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RetryQueue:
+    """
+    Очередь повторов с индивидуальным дедлайном для каждого URL
+
+    Неудачный URL не занимает воркер на время ожидания: он откладывается
+    до своего дедлайна, а воркеры тем временем берут новые URL.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_RETRIES, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        """
+        Args:
+            max_attempts: Максимальное количество попыток загрузки одного URL
+            base_delay: Задержка перед первым повтором (секунды)
+            max_delay: Максимальная задержка между повторами (секунды)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        self._heap: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def register_failure(self, url: str) -> Optional[float]:
+        """
+        Учет неудачной попытки загрузки
+
+        Args:
+            url: URL, который не удалось загрузить
+
+        Returns:
+            Задержка до следующей попытки или None, если попытки исчерпаны
+        """
+        attempt = self.attempts.get(url, 0) + 1
+        self.attempts[url] = attempt
+        if attempt >= self.max_attempts:
+            self.failed[url] = attempt
+            logger.error(f"Не удалось загрузить {url} после {attempt} попыток")
+            return None
+
+        metrics.inc('rb_retries_total', kind='deferred')
+        # Экспоненциальная задержка с небольшим разбросом, чтобы повторы не шли пачкой
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return delay * random.uniform(1.0, 1.2)
+
+    def schedule(self, url: str) -> bool:
+        """
+        Откладывание URL до следующей попытки
+
+        Returns:
+            True если URL поставлен в очередь, False если попытки исчерпаны
+        """
+        delay = self.register_failure(url)
+        if delay is None:
+            return False
+        heapq.heappush(self._heap, (time.monotonic() + delay, url))
+        logger.info(f"Повтор {url} через {delay:.1f} с (попытка {self.attempts[url] + 1}/{self.max_attempts})")
+        return True
+
+    def pop_ready(self) -> List[str]:
+        """Извлечение всех URL, у которых наступил дедлайн"""
+        now = time.monotonic()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            ready.append(heapq.heappop(self._heap)[1])
+        return ready
+
+    def next_delay(self) -> Optional[float]:
+        """Время до ближайшего дедлайна (None если очередь пуста)"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def report(self) -> Dict[str, int]:
+        """
+        Итоговый отчет по URL, которые так и не удалось загрузить
+
+        Returns:
+            Словарь {url: количество попыток}
+        """
+        if self.failed:
+            logger.warning(f"Не удалось загрузить {len(self.failed)} URL:")
+            for url, attempts in self.failed.items():
+                logger.warning(f"  {url} ({attempts} попыток)")
+        else:
+            logger.info("Все URL загружены успешно")
+        return dict(self.failed)
@@ -2,235 +2,796 @@
 Основной класс скрапера
 """
 
+import os
+import time
 import logging
-from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 
-from .config import BASE_URL, SECTIONS, DEFAULT_MAX_WORKERS, DEFAULT_DELAY
+from .config import (BASE_URL, SECTIONS, DEFAULT_MAX_WORKERS, DEFAULT_DELAY,
+                     BACKENDS, DEFAULT_BACKEND, DEFAULT_ASYNC_CONCURRENCY, DEFAULT_RATE, DEFAULT_BURST,
+                     DEFAULT_RETRIES, DEFAULT_SINK_PATH, DEFAULT_PARSE_WORKERS, THREAD_WINDOW_FACTOR,
+                     DEFAULT_PARSER_BACKEND, DEFAULT_LISTING_CONCURRENCY, DISCOVERY_MODES,
+                     DEFAULT_DISCOVERY, ARTICLES_PER_LISTING_PAGE, INCREMENTAL_STOP_PAGES, HTTP_CACHE_TTL,
+                     HTTP_CACHE_LISTING_TTL, ADAPTIVE_MIN_CONCURRENCY, ADAPTIVE_MAX_CONCURRENCY)
 from .http_client import HTTPClient
-from .parsers import HTMLParser
-from .storage import DataStorage
+from .http_cache import HTTPCache
+from .async_http_client import AsyncHTTPClient
+from .rate_limiter import RateLimiter
+from .concurrency import AdaptiveConcurrency
+from .metrics import MetricsServer
+from . import metrics
+from .retry_queue import RetryQueue
+from .frontier import CrawlFrontier
+from .archive import PageArchive
+from .sitemap import SitemapDiscovery
+from .sharding import shard_of, owns_page
+from .pipeline import ParsePipeline
+from .parsers import create_parser
+from .storage import DataStorage, ArticleSink, ParquetSink
+from .near_duplicates import NearDuplicateIndex
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO дата (scraped_at, lastmod из sitemap) с часовым поясом; без пояса - местное время"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
 class RBScraper:
-    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, delay: float = DEFAULT_DELAY):
-        self.http_client = HTTPClient(delay=delay)
-        self.parser = HTMLParser()
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, delay: float = DEFAULT_DELAY,
+                 backend: str = DEFAULT_BACKEND, concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                 rate: Optional[float] = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 frontier_path: Optional[str] = None, sink_path: str = DEFAULT_SINK_PATH,
+                 sink_compression: Optional[str] = None, parse_workers: int = DEFAULT_PARSE_WORKERS,
+                 parser_backend: str = DEFAULT_PARSER_BACKEND, archive_path: Optional[str] = None,
+                 listing_concurrency: int = DEFAULT_LISTING_CONCURRENCY, discovery: str = DEFAULT_DISCOVERY,
+                 sitemap_urls: Optional[List[str]] = None, incremental_from: Optional[str] = None,
+                 known_stop_pages: int = INCREMENTAL_STOP_PAGES, revalidate: bool = False,
+                 http_cache_path: Optional[str] = None, http_cache_ttl: float = HTTP_CACHE_TTL,
+                 adaptive: bool = False, min_concurrency: int = ADAPTIVE_MIN_CONCURRENCY,
+                 max_concurrency: int = ADAPTIVE_MAX_CONCURRENCY, shard: Optional[Tuple[int, int]] = None,
+                 origin: Optional[str] = None, observer=None, collect_metrics: bool = False,
+                 metrics_port: Optional[int] = None, streaming: bool = False,
+                 parquet_path: Optional[str] = None, near_duplicates: bool = False):
+        """
+        Args:
+            max_workers: Количество потоков для бэкенда 'threads'
+            delay: Задержка между запросами (секунды), не используется если задан rate
+            backend: Бэкенд загрузки статей: 'threads' (requests) или 'async' (aiohttp)
+            concurrency: Количество одновременных запросов для бэкенда 'async'
+            rate: Общий лимит запросов в секунду на хост для листингов и статей
+            burst: Сколько запросов можно выполнить подряд сверх rate
+            frontier_path: Файл SQLite с состоянием обхода; если задан, прерванный
+                           скрапинг продолжается с места остановки
+            sink_path: Файл JSON Lines, куда статьи дописываются по мере сбора (milestone)
+            sink_compression: Сжатие потока: None, 'gzip' или 'zstd'
+            parse_workers: Количество процессов для парсинга HTML (0 - парсить в потоках загрузки)
+            parser_backend: Парсер статей: 'bs4' (BeautifulSoup) или 'lxml' (XPath, быстрее)
+            archive_path: Каталог архива исходного HTML статей; если задан, каждая загруженная
+                          страница сохраняется для повторного парсинга без сети (reprocess.py)
+            listing_concurrency: Сколько страниц пагинации листинга загружается одновременно
+            discovery: Поиск URL статей: 'listing' (страницы пагинации) или 'sitemap' (sitemap и RSS)
+            sitemap_urls: Источники для discovery='sitemap' (sitemap, индексы sitemap, RSS/Atom
+                          ленты; URL или локальные файлы) вместо SITEMAP_URLS и FEED_URLS из config
+            incremental_from: Прошлый результат (rb_articles.json или поток .jsonl); если задан,
+                              загружаются только новые статьи, а прошлые переносятся в поток
+            known_stop_pages: Инкрементальный режим: пагинация раздела останавливается после
+                              стольких страниц листинга подряд, где все статьи уже известны
+            revalidate: Инкрементальный режим: проверять известные статьи из листинга условным
+                        GET (If-Modified-Since) и обновлять изменившиеся
+            http_cache_path: Файл HTTP кэша на диске; если задан, листинги и статьи берутся из кэша,
+                             а устаревшие ответы проверяются через ETag/Last-Modified
+            http_cache_ttl: Сколько секунд статья из кэша отдается без запроса к сайту (листинги
+                            проверяются всегда, HTTP_CACHE_LISTING_TTL)
+            adaptive: Подбирать число одновременных запросов по времени ответа и доле ошибок
+                      (AIMD) вместо max_workers / concurrency; delay при этом не используется
+            min_concurrency: Нижняя граница лимита при adaptive=True
+            max_concurrency: Верхняя граница лимита при adaptive=True
+            shard: (номер шарда, количество шардов) - обходить только свою часть: страницы
+                   листинга раздаются шардам по кругу, URL из sitemap - по хэшу (crawl_sharded.py)
+            origin: Адрес, на который уходят запросы к BASE_URL (локальный симулятор rb.ru,
+                    benchmark_scraper.py); URL статей в результате остаются адресами rb.ru
+            observer: Получатель времени каждого запроса: объект с методом record(latency, ok, throttled, revalidated)
+            collect_metrics: Собирать метрики стадий (загрузка, разбор, извлечение, очереди);
+                             сводка выводится в лог в конце scrape_all
+            metrics_port: Порт эндпоинта /metrics в формате Prometheus (включает collect_metrics)
+            streaming: Потоковый режим: статьи сразу пишутся в sink_path и в памяти не остаются,
+                       scrape_all возвращает сводку вместо списка статей (память не растет с корпусом)
+            parquet_path: Колоночный корпус Parquet: статьи, попадающие в поток, пишутся в него
+                          группами строк во время обхода; файл готов после scrape_all (нужен pyarrow)
+            near_duplicates: Искать почти одинаковые тексты (MinHash + LSH) и записывать в статьи
+                             cluster_id - URL первой статьи кластера; в инкрементальном режиме
+                             в индекс сначала попадает прошлый результат
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд {backend!r}, доступны: {', '.join(BACKENDS)}")
+        if discovery not in DISCOVERY_MODES:
+            raise ValueError(f"Неизвестный режим поиска URL {discovery!r}, доступны: {', '.join(DISCOVERY_MODES)}")
+        self.shard_index, self.shard_count = shard or (0, 1)
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"Неверный шард {shard!r}: нужно 0 <= номер < количество")
+        
+        if collect_metrics or metrics_port is not None:
+            metrics.enable()
+        # Эндпоинт /metrics поднимается на время scrape_all: порт не занят между обходами
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        
+        # Один лимитер на все клиенты: листинги и статьи расходуют общий бюджет
+        self.rate_limiter = RateLimiter(rate, burst) if rate else None
+        self.retry_queue = RetryQueue()
+        self.frontier = CrawlFrontier(frontier_path) if frontier_path else None
+        self.archive = PageArchive(archive_path) if archive_path else None
+        self.sink_path = sink_path
+        self.sink_compression = sink_compression
+        self.sink = None
+        self.parquet_path = parquet_path
+        self.near_duplicates = NearDuplicateIndex() if near_duplicates else None
+        self.pipeline = ParsePipeline(parse_workers, parser_backend=parser_backend) if parse_workers else None
+        if self.rate_limiter:
+            delay = 0
+        
+        # Нагрузку регулирует контроллер: потоков и слотов столько, сколько допускает верхняя граница
+        self.controller = None
+        if adaptive:
+            self.controller = AdaptiveConcurrency(min_concurrency, max_concurrency)
+            delay = 0
+            max_workers = concurrency = max_concurrency
+        
+        self.http_cache = HTTPCache(http_cache_path, ttl=http_cache_ttl) if http_cache_path else None
+        self.http_client = HTTPClient(delay=delay, rate_limiter=self.rate_limiter, cache=self.http_cache,
+                                      controller=self.controller, origin=origin, observer=observer)
+        self.backend = backend
+        self.async_client = AsyncHTTPClient(concurrency=concurrency, delay=delay, rate_limiter=self.rate_limiter,
+                                            cache=self.http_cache, controller=self.controller, origin=origin,
+                                            observer=observer) if backend == 'async' else None
+        self.parser = create_parser(parser_backend)
         self.storage = DataStorage()
         self.max_workers = max_workers
+        self.listing_concurrency = max(1, listing_concurrency)
+        self.discovery = discovery
+        self.sitemap_discovery = None
+        if discovery == 'sitemap':
+            if sitemap_urls is not None:
+                self.sitemap_discovery = SitemapDiscovery(self.http_client, sitemap_urls, feed_urls=[])
+            else:
+                self.sitemap_discovery = SitemapDiscovery(self.http_client)
+        self.sitemap_entries = None
+        self.url_lastmod = {}
+        self.incremental_from = incremental_from
+        self.known_stop_pages = max(1, known_stop_pages)
+        self.revalidate = revalidate
+        # Инкрементальный режим: URL из прошлого результата -> время его загрузки (scraped_at)
+        self.known = self.load_known(incremental_from) if incremental_from else {}
+        self.incremental_stats = dict.fromkeys(('new', 'changed', 'unchanged', 'carried'), 0)
+        self.streaming = streaming
         self.scraped_urls = set()
         self.articles = []
     
+    @staticmethod
+    def load_known(filename: str) -> Dict[str, str]:
+        """URL статей прошлого результата и время их загрузки"""
+        if not os.path.exists(filename):
+            logger.warning(f"Прошлый результат {filename} не найден, загружаю все статьи")
+            return {}
+        known = {article['url']: article.get('scraped_at', '')
+                 for article in DataStorage.load_articles(filename) if article.get('url')}
+        logger.info(f"Инкрементальный режим: в {filename} уже есть {len(known)} статей")
+        return known
+    
+    def discover_article_urls(self, section: str, max_pages: int = 50) -> List[str]:
+        """URL статей раздела выбранным способом (discovery)"""
+        if self.discovery == 'sitemap':
+            return self.get_article_urls_from_sitemaps(section, max_pages)
+        return self.get_article_urls_from_listing(section, max_pages)
+    
+    def get_article_urls_from_sitemaps(self, section: str, max_pages: int = 50) -> List[str]:
+        """
+        URL статей раздела из sitemap и RSS лент
+        
+        Sitemap читаются один раз за запуск для всех разделов. Раздел ограничивается
+        max_pages * ARTICLES_PER_LISTING_PAGE самыми свежими статьями (по lastmod),
+        чтобы объем совпадал с обходом того же числа страниц листинга.
+        """
+        if self.sitemap_entries is None:
+            self.sitemap_entries = self.sitemap_discovery.discover()
+        
+        entries = sorted(self.sitemap_entries.get(section, []), key=lambda entry: entry[1] or '', reverse=True)
+        entries = entries[:max_pages * ARTICLES_PER_LISTING_PAGE]
+        if self.shard_count > 1:
+            entries = [entry for entry in entries if shard_of(entry[0], self.shard_count) == self.shard_index]
+        self.url_lastmod.update((url, lastmod) for url, lastmod in entries if lastmod)
+        urls = [url for url, _ in entries]
+        if self.frontier:
+            self.frontier.add_urls(section, urls)
+        logger.info(f"Из sitemap взято {len(urls)} URL раздела {section}")
+        return urls
+    
     def get_article_urls_from_listing(self, section: str, max_pages: int = 50) -> List[str]:
         urls = []
         section_path = SECTIONS.get(section, '/')
+        start_page = 1
+        
+        # Продолжаем с курсора фронтира, если раздел уже частично пройден. В инкрементальном
+        # режиме листинг всегда идет с начала: новые статьи появляются на первых страницах
+        if self.frontier and not self.known:
+            last_page, finished = self.frontier.get_cursor(section)
+            if last_page or finished:
+                urls = self.frontier.get_section_urls(section)
+                if finished or last_page >= max_pages:
+                    logger.info(f"Листинг раздела {section} уже пройден, {len(urls)} URL из фронтира")
+                    return urls
+                start_page = last_page + 1
+                logger.info(f"Продолжаю листинг раздела {section} со страницы {start_page} ({len(urls)} URL из фронтира)")
         
-        # Сначала пробуем главную страницу раздела
-        section_url = f"{BASE_URL}{section_path}" if section_path != '/' else BASE_URL
-        soup = self.http_client.fetch_page(section_url)
-        if soup:
-            article_links = self.parser.extract_article_links(soup)
-            urls.extend(article_links)
-            logger.info(f"Найдено {len(article_links)} статей на главной странице раздела {section}")
+        # Инкрементальный режим: сколько страниц подряд содержат только известные статьи
+        known_run = 0
+        
+        def only_known(page_urls: List[str]) -> bool:
+            nonlocal known_run
+            if not self.known:
+                return False
+            known_run = known_run + 1 if all(u in self.known for u in page_urls) else 0
+            return known_run >= self.known_stop_pages
+        
+        # Сначала пробуем главную страницу раздела (при шардировании - только шард 0)
+        if start_page == 1 and owns_page(1, self.shard_index, self.shard_count):
+            section_url = f"{BASE_URL}{section_path}" if section_path != '/' else BASE_URL
+            article_links = self._fetch_listing_page(section_url)
+            if article_links is not None:
+                urls.extend(article_links)
+                if self.frontier:
+                    self.frontier.save_page(section, 1, article_links)
+                logger.info(f"Найдено {len(article_links)} статей на главной странице раздела {section}")
+                if article_links and only_known(article_links):
+                    logger.info(f"На главной странице раздела {section} нет новых статей, прекращаю пагинацию")
+                    return urls
+        start_page = max(start_page, 2)
         
         # Затем скрапим страницы пагинации
         # Правильный формат: https://rb.ru/news/?page=2
-        for page in range(2, max_pages + 1):
+        # Страницы загружаются скользящим окном по listing_concurrency штук, а обрабатываются
+        # строго по порядку: условия остановки те же, что при последовательном обходе
+        # При шардировании загружаются только свои страницы: каждая shard_count-я
+        seen = set(urls)
+        next_page = start_page
+        while not owns_page(next_page, self.shard_index, self.shard_count):
+            next_page += 1
+        in_flight = deque()
+        
+        def submit_next():
+            nonlocal next_page
+            if next_page > max_pages:
+                return
             if section_path == '/':
-                url = f"{BASE_URL}/?page={page}"
+                url = f"{BASE_URL}/?page={next_page}"
             else:
-                url = f"{BASE_URL}{section_path}?page={page}"
-            
-            logger.info(f"Загружаю страницу {page}: {url}")
-            soup = self.http_client.fetch_page(url)
-            if not soup:
-                logger.warning(f"Не удалось загрузить страницу {page}, прекращаю пагинацию")
-                break
-            
-            page_urls = self.parser.extract_article_links(soup)
-            
-            if not page_urls:
-                logger.info(f"Не найдено статей на странице {page} раздела {section}, прекращаю пагинацию")
-                break
+                url = f"{BASE_URL}{section_path}?page={next_page}"
+            logger.info(f"Загружаю страницу {next_page}: {url}")
+            in_flight.append((next_page, executor.submit(self._fetch_listing_page, url)))
+            next_page += self.shard_count
+        
+        with ThreadPoolExecutor(max_workers=self.listing_concurrency) as executor:
+            for _ in range(self.listing_concurrency):
+                submit_next()
             
-            # Проверяем, что это новые статьи (не дубликаты)
-            new_urls = [u for u in page_urls if u not in urls]
-            if not new_urls:
-                logger.warning(f"Все статьи на странице {page} уже были найдены ранее, прекращаю пагинацию")
-                break
+            while in_flight:
+                page, future = in_flight.popleft()
+                page_urls = future.result()
+                
+                if page_urls is None:
+                    logger.warning(f"Не удалось загрузить страницу {page}, прекращаю пагинацию")
+                    break
+                
+                if not page_urls:
+                    logger.info(f"Не найдено статей на странице {page} раздела {section}, прекращаю пагинацию")
+                    if self.frontier:
+                        self.frontier.finish_listing(section)
+                    break
+                
+                # Проверяем, что это новые статьи (не дубликаты)
+                new_urls = [u for u in page_urls if u not in seen]
+                if not new_urls:
+                    logger.warning(f"Все статьи на странице {page} уже были найдены ранее, прекращаю пагинацию")
+                    if self.frontier:
+                        self.frontier.finish_listing(section)
+                    break
+                
+                seen.update(new_urls)
+                urls.extend(new_urls)
+                if self.frontier:
+                    self.frontier.save_page(section, page, new_urls)
+                logger.info(f"Найдено {len(new_urls)} новых статей на странице {page} (всего уникальных: {len(seen)})")
+                if only_known(page_urls):
+                    logger.info(f"Страниц подряд без новых статей: {known_run}, прекращаю пагинацию раздела {section}")
+                    break
+                submit_next()
             
-            urls.extend(new_urls)
-            logger.info(f"Найдено {len(new_urls)} новых статей на странице {page} (всего уникальных: {len(set(urls))})")
+            # Пагинация закончилась: страницы за последней нужной не ждем
+            for _, future in in_flight:
+                future.cancel()
         
-        return list(set(urls))
+        return urls
+    
+    def _fetch_listing_page(self, url: str) -> Optional[List[str]]:
+        """Загрузка страницы листинга и извлечение ссылок на статьи (None - страница не загрузилась)"""
+        # Листинг всегда проверяется на сайте: из кэша берется только подтвержденный ответом 304
+        soup = self.http_client.fetch_page(url, max_age=HTTP_CACHE_LISTING_TTL)
+        if not soup:
+            return None
+        return self.parser.extract_article_links(soup)
     
     def parse_article_page(self, url: str) -> Dict:
+        _, article = self._fetch_article(url)
+        return article
+    
+    def _fetch_article(self, url: str, retries: int = DEFAULT_RETRIES) -> Tuple[bool, Optional[Dict]]:
+        """Загрузка и парсинг статьи; первый элемент - удалось ли загрузить страницу"""
         if url in self.scraped_urls:
-            return None
+            return True, None
         
-        soup = self.http_client.fetch_page(url)
-        if not soup:
-            return None
+        html = self.http_client.fetch_html(url, retries)
+        if html is None:
+            return False, None
         
+        if self.archive is not None:
+            self.archive.put(url, html)
         self.scraped_urls.add(url)
-        return self.parser.parse_article(url, soup)
+        return True, self.parser.parse_html(url, html)
     
-    def scrape_section(self, section: str, max_pages: int = 50, save_milestone: bool = False,
-                       milestone_interval: int = None, total_before_section: int = 0) -> List[Dict]:
-        logger.info(f"Начинаю скрапинг раздела: {section}")
-        logger.info(f"[MILESTONE DEBUG] Параметры функции: milestone_interval={milestone_interval} (type: {type(milestone_interval)}), total_before_section={total_before_section}")
-        urls = self.get_article_urls_from_listing(section, max_pages)
-        logger.info(f"Найдено {len(urls)} URL для скрапинга в разделе {section}")
-        if milestone_interval:
-            logger.info(f"[MILESTONE] Milestone сохранение включено: каждые {milestone_interval} статей (уже собрано: {total_before_section})")
-        else:
-            logger.warning(f"[MILESTONE] Milestone сохранение ОТКЛЮЧЕНО! milestone_interval={milestone_interval}")
+    def _fetch_html(self, url: str) -> Tuple[bool, Optional[str]]:
+        """Одна попытка загрузки HTML статьи (для стадии загрузки конвейера)"""
+        html = self.http_client.fetch_html(url, 1)
+        return html is not None, html
+    
+    def _revalidate_article(self, url: str) -> Tuple[bool, Optional[Dict]]:
+        """Условный GET известной статьи: статья, если страница изменилась, иначе None"""
+        fetched, html = self.http_client.fetch_if_modified(url, _parse_time(self.known.get(url)), 1)
+        if html is None:
+            return fetched, None
+        if self.archive is not None:
+            self.archive.put(url, html)
+        self.scraped_urls.add(url)
+        return True, self.parser.parse_html(url, html)
+    
+    def split_known(self, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Разделение URL раздела для инкрементального режима
         
-        articles = []
-        last_saved_count = 0
+        Returns:
+            (URL для загрузки: новые и известные, у которых lastmod из sitemap позже прошлой
+            загрузки; остальные известные URL)
+        """
+        fetch, known = [], []
+        for url in urls:
+            if url not in self.known:
+                self.incremental_stats['new'] += 1
+                fetch.append(url)
+                continue
+            lastmod, scraped_at = _parse_time(self.url_lastmod.get(url)), _parse_time(self.known[url])
+            if lastmod and scraped_at and lastmod > scraped_at:
+                self.incremental_stats['changed'] += 1
+                fetch.append(url)
+            else:
+                known.append(url)
+        return fetch, known
+    
+    def _iter_threaded(self, urls: Iterable[str], work: Callable) -> Iterator[Tuple[str, Any]]:
+        """
+        Выполнение work(url) в пуле потоков с отложенными повторами
         
-        logger.info(f"[MILESTONE] Начало скрапинга раздела {section}: milestone_interval={milestone_interval}, total_before_section={total_before_section}")
+        В пуле одновременно не больше max_workers * THREAD_WINDOW_FACTOR задач, поэтому
+        медленный потребитель результатов притормаживает загрузку. Неудачные загрузки
+        не повторяются на месте, а уходят в self.retry_queue с отложенным дедлайном.
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_url = {executor.submit(self.parse_article_page, url): url for url in urls}
+        Args:
+            urls: URL статей
+            work: Функция url -> (удалось ли загрузить страницу, результат)
             
-            with tqdm(total=len(urls), desc=f"Скрапинг {section}") as pbar:
-                for future in as_completed(future_to_url):
-                    url = future_to_url[future]
+        Yields:
+            Пары (url, результат), результат равен None при ошибке
+        """
+        urls = iter(urls)
+        window = self.max_workers * THREAD_WINDOW_FACTOR
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_url = {}
+            while True:
+                for url in self.retry_queue.pop_ready():
+                    future_to_url[executor.submit(work, url)] = url
+                while len(future_to_url) < window:
+                    url = next(urls, None)
+                    if url is None:
+                        break
+                    future_to_url[executor.submit(work, url)] = url
+                metrics.observe('rb_queue_depth', len(future_to_url), queue='fetch')
+                metrics.observe('rb_queue_depth', len(self.retry_queue), queue='retry')
+                
+                if not future_to_url:
+                    if not len(self.retry_queue):
+                        break
+                    time.sleep(self.retry_queue.next_delay() or 0)
+                    continue
+                
+                done, _ = wait(future_to_url, timeout=self.retry_queue.next_delay(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = future_to_url.pop(future)
                     try:
-                        article = future.result()
-                        if article:
-                            articles.append(article)
-                            pbar.update(1)
-                            
-                            # каждые N статей
-                            if milestone_interval and milestone_interval > 0:
-                                total_articles = total_before_section + len(articles)
-                                
-                                # логируем каждые 10 статей для отладки
-                                if len(articles) % 10 == 0:
-                                    logger.info(f"[PROGRESS] Статей в разделе: {len(articles)}, всего: {total_articles}, last_saved: {last_saved_count}")
-                                
-                                # просто проверяем разницу
-                                if total_articles >= milestone_interval:
-                                    # Вычисляем сколько статей прошло с последнего сохранения
-                                    articles_since_last_save = total_articles - last_saved_count
-                                    
-                                    # Логируем при приближении к milestone
-                                    if total_articles % 25 == 0 or articles_since_last_save >= milestone_interval - 5:
-                                        logger.info(f"[CHECK] total={total_articles}, last_saved={last_saved_count}, разница={articles_since_last_save}, нужно_сохранить={articles_since_last_save >= milestone_interval}")
-                                    
-                                    # Сохраняем если прошло >= milestone_interval статей с последнего сохранения
-                                    if articles_since_last_save >= milestone_interval:
-                                        logger.info(f"[MILESTONE] СОХРАНЯЮ: {total_articles} статей (было сохранено: {last_saved_count}, разница: {articles_since_last_save})")
-                                        
-                                        # Сохраняем все накопленные статьи
-                                        temp_articles = list(self.articles) + articles
-                                        logger.info(f"[MILESTONE] Всего статей для сохранения: {len(temp_articles)} (предыдущие: {len(self.articles)}, текущие: {len(articles)})")
-                                        
-                                        original_articles = self.articles
-                                        self.articles = temp_articles
-                                        
-                                        try:
-                                            logger.info(f"[MILESTONE] Записываю в файлы...")
-                                            self.save_to_json('rb_articles_milestone.json')
-                                            logger.info(f"[MILESTONE] JSON сохранен!")
-                                            self.save_to_csv('rb_articles_milestone.csv')
-                                            logger.info(f"[MILESTONE] CSV сохранен!")
-                                            logger.info(f"[MILESTONE] УСПЕШНО СОХРАНЕНО {len(temp_articles)} СТАТЕЙ!")
-                                        except Exception as e:
-                                            logger.error(f"[MILESTONE] ОШИБКА: {e}", exc_info=True)
-                                        finally:
-                                            self.articles = original_articles
-                                        
-                                        # Обновляем last_saved_count на текущее количество
-                                        last_saved_count = total_articles
-                                        logger.info(f"[MILESTONE] Обновлен last_saved_count = {last_saved_count}")
+                        fetched, result = future.result()
                     except Exception as e:
                         logger.error(f"Ошибка при обработке {url}: {e}")
-                        pbar.update(1)
+                        yield url, None
+                        continue
+                    
+                    if not fetched and self.retry_queue.schedule(url):
+                        continue
+                    yield url, result
+    
+    def iter_pages(self, urls: List[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Загрузка HTML статей выбранным бэкендом без парсинга
+        
+        Args:
+            urls: URL статей
+            
+        Yields:
+            Пары (url, html) по мере готовности, html равен None при ошибке
+        """
+        pending = [url for url in urls if url not in self.scraped_urls]
+        if self.backend == 'async':
+            pages = self.async_client.iter_pages_blocking(pending, self.retry_queue)
+        else:
+            pages = self._iter_threaded(pending, self._fetch_html)
+        
+        try:
+            for url, html in pages:
+                if html is not None and self.archive is not None:
+                    self.archive.put(url, html)
+                yield url, html
+        finally:
+            # Генератор загрузки закрываем здесь же, а не при сборке мусора в другом потоке
+            pages.close()
+    
+    def iter_articles(self, urls: List[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        Загрузка и парсинг статей выбранным бэкендом
+        
+        При parse_workers > 0 загрузка и парсинг разделены на конвейер:
+        HTML из стадии загрузки парсится в пуле процессов.
+        
+        Args:
+            urls: URL статей
             
-            # ФИНАЛЬНАЯ ПРОВЕРКА: сохраняем если пропустили milestone
-            if milestone_interval and milestone_interval > 0:
-                total_articles = total_before_section + len(articles)
-                if total_articles >= milestone_interval:
-                    articles_since_last_save = total_articles - last_saved_count
-                    if articles_since_last_save >= milestone_interval:
-                        logger.info(f"[MILESTONE FINAL] ФИНАЛЬНОЕ СОХРАНЕНИЕ: {total_articles} статей (разница: {articles_since_last_save})")
-                        temp_articles = list(self.articles) + articles
-                        original_articles = self.articles
-                        self.articles = temp_articles
-                        try:
-                            self.save_to_json('rb_articles_milestone.json')
-                            self.save_to_csv('rb_articles_milestone.csv')
-                            logger.info(f"[MILESTONE FINAL] Сохранено {len(temp_articles)} статей")
-                        except Exception as e:
-                            logger.error(f"[MILESTONE FINAL] ОШИБКА: {e}", exc_info=True)
-                        finally:
-                            self.articles = original_articles
-        
-        logger.info(f"Скраплено {len(articles)} статей из раздела {section}")
+        Yields:
+            Пары (url, статья) по мере готовности, статья равна None при ошибке
+        """
+        if self.pipeline:
+            for url, article in self.pipeline.run(self.iter_pages(urls)):
+                if article:
+                    self.scraped_urls.add(url)
+                yield url, article
+            return
+        
+        if self.backend == 'async':
+            for url, html in self.iter_pages(urls):
+                if html is None:
+                    yield url, None
+                    continue
+                self.scraped_urls.add(url)
+                yield url, self.parser.parse_html(url, html)
+            return
+        
+        yield from self._iter_threaded(urls, lambda url: self._fetch_article(url, 1))
+    
+    def scrape_section(self, section: str, max_pages: int = 50, save_milestone: bool = False,
+                       milestone_interval: int = None, total_before_section: int = 0) -> List[Dict]:
+        return list(self.iter_section(section, max_pages, save_milestone, milestone_interval, total_before_section))
+    
+    def iter_section(self, section: str, max_pages: int = 50, save_milestone: bool = False,
+                     milestone_interval: int = None, total_before_section: int = 0) -> Iterator[Dict]:
+        """
+        Статьи раздела по мере загрузки
+        
+        Каждая статья записывается в поток (если он открыт) до того, как отдается
+        наружу, поэтому потребитель может сразу ее отбросить.
+        
+        Yields:
+            Статьи раздела: восстановленные из фронтира, изменившиеся известные и новые
+        """
+        logger.info(f"Начинаю скрапинг раздела: {section}")
+        urls = self.discover_article_urls(section, max_pages)
+        logger.info(f"Найдено {len(urls)} URL для скрапинга в разделе {section}")
+        if milestone_interval:
+            logger.info(f"[MILESTONE] Статьи сбрасываются на диск каждые {milestone_interval} статей (уже собрано: {total_before_section})")
+        
+        count = 0
+        last_milestone = 0
+        if save_milestone or milestone_interval or self.streaming:
+            self.open_sink(milestone_interval)
+        
+        known_urls = []
+        if self.known:
+            urls, known_urls = self.split_known(urls)
+            logger.info(f"Инкрементальный режим: загружаю {len(urls)} новых/изменившихся URL раздела {section}, "
+                        f"{len(known_urls)} уже есть в {self.incremental_from}")
+        
+        # Статьи, загруженные в прошлых запусках, берем из фронтира без повторной загрузки
+        if self.frontier:
+            done_urls = self.frontier.done_urls()
+            urls = [url for url in urls if url not in done_urls]
+            # В поток дописываются только статьи, не успевшие попасть на диск до остановки;
+            # Parquet пишется заново каждый запуск, поэтому в него идут все
+            for article, written in self.frontier.iter_restored(section):
+                # Кластер назначен в прошлом запуске: статья только добавляется в индекс
+                if self.near_duplicates is not None:
+                    self.near_duplicates.assign(article)
+                if self.sink:
+                    if not written:
+                        self.sink.write(article)
+                    elif self.sink.mirror is not None:
+                        self.sink.mirror.write(article)
+                count += 1
+                yield article
+            self.frontier.mark_in_flight(urls)
+            logger.info(f"Из фронтира восстановлено {count} статей раздела {section}, осталось загрузить {len(urls)} URL")
+        
+        if known_urls and self.revalidate:
+            for article in self.revalidate_articles(known_urls, section):
+                if self.sink:
+                    self.sink.write(article)
+                count += 1
+                yield article
+        else:
+            self.incremental_stats['unchanged'] += len(known_urls)
+        
+        with tqdm(total=len(urls), desc=f"Скрапинг {section}") as pbar:
+            for url, article in self.iter_articles(urls):
+                if article and self.near_duplicates is not None:
+                    self.near_duplicates.assign(article)
+                if self.frontier:
+                    self.frontier.record_result(url, article)
+                pbar.update(1)
+                if not article:
+                    continue
+                
+                # Статья пишется в поток один раз; буфер сбрасывается каждые milestone_interval статей
+                if self.sink:
+                    self.sink.write(article)
+                    if milestone_interval and self.sink.written // milestone_interval > last_milestone:
+                        last_milestone = self.sink.written // milestone_interval
+                        logger.info(f"[MILESTONE] В {self.sink.path} записано {self.sink.written} статей (всего собрано: {total_before_section + count})")
+                count += 1
+                yield article
+        
+        logger.info(f"Скраплено {count} статей из раздела {section}")
         
         # Сохранение milestone после раздела
-        if save_milestone:
-            # Временно сохраняем все накопленные статьи для milestone
-            temp_articles = list(self.articles) + articles
-            json_file = f'rb_articles_milestone_{section}.json'
-            csv_file = f'rb_articles_milestone_{section}.csv'
-            # Используем временный список для сохранения
-            original_articles = self.articles
-            self.articles = temp_articles
-            self.save_to_json(json_file)
-            self.save_to_csv(csv_file)
-            self.articles = original_articles  # Восстанавливаем
-            logger.info(f"Milestone сохранен: {len(temp_articles)} статей в {json_file} и {csv_file}")
-        
-        return articles
+        if (save_milestone or self.streaming) and self.sink:
+            written = self.sink.flush()
+            logger.info(f"Milestone раздела {section} сохранен: в {self.sink.path} записано {written} статей")
+    
+    def revalidate_articles(self, urls: List[str], section: str) -> Iterator[Dict]:
+        """Проверка известных статей условным GET; отдает изменившиеся статьи"""
+        changed = 0
+        with tqdm(total=len(urls), desc=f"Проверка {section}") as pbar:
+            for url, article in self._iter_threaded(urls, self._revalidate_article):
+                pbar.update(1)
+                if article:
+                    changed += 1
+                    if self.near_duplicates is not None:
+                        self.near_duplicates.assign(article)
+                    if self.frontier:
+                        self.frontier.record_result(url, article)
+                    yield article
+        self.incremental_stats['changed'] += changed
+        self.incremental_stats['unchanged'] += len(urls) - changed
+        logger.info(f"Проверено {len(urls)} известных статей раздела {section}, изменилось {changed}")
+    
+    def carry_over_known(self, target=None) -> int:
+        """
+        Перенос статей прошлого результата, которые не загружались заново, в поток
+        
+        Args:
+            target: Куда переносить (по умолчанию - поток статей)
+        
+        Returns:
+            Количество перенесенных статей
+        """
+        target = target or self.sink
+        carried = 0
+        for article in DataStorage.load_articles(self.incremental_from):
+            if article.get('url') not in self.scraped_urls:
+                target.write(article)
+                carried += 1
+        self.incremental_stats['carried'] = carried
+        return carried
+    
+    def _sink_is_previous(self) -> bool:
+        """Поток статей - это и есть прошлый результат (тогда новый поток пишется рядом и заменяет его)"""
+        return bool(self.incremental_from) and os.path.abspath(self.incremental_from) == os.path.abspath(self.sink_path)
+    
+    def _replace_previous(self):
+        """Новый поток (загруженные и перенесенные статьи) встает на место прошлого результата"""
+        if self.sink is not None and self.sink.path != self.sink_path:
+            self.sink.replace(self.sink_path)
+            logger.info(f"Прошлый результат {self.sink_path} заменен новым потоком")
     
     def scrape_all(self, max_pages_per_section: int = 20, pages_config: dict = None, 
-                   save_milestones: bool = True, milestone_interval: int = None) -> List[Dict]:
+                   save_milestones: bool = True, milestone_interval: int = None) -> Union[List[Dict], Dict]:
+        """
+        Скрапинг всех разделов
+        
+        При metrics_port на время обхода поднимается эндпоинт /metrics; по завершении
+        (в том числе с ошибкой) сервер останавливается и порт освобождается.
+        
+        Returns:
+            Список статей; в потоковом режиме (streaming=True) - сводка: articles (всего),
+            sections (статей по разделам), sink (файл потока), written (строк в потоке)
+        """
+        if self.metrics_port is not None:
+            self.metrics_server = MetricsServer(self.metrics_port)
+            self.metrics_server.start()
+        try:
+            return self._scrape_all(max_pages_per_section, pages_config, save_milestones, milestone_interval)
+        finally:
+            self.stop_metrics_server()
+    
+    def stop_metrics_server(self):
+        """Остановка эндпоинта /metrics (если он запущен)"""
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+    
+    def _scrape_all(self, max_pages_per_section: int, pages_config: Optional[dict],
+                    save_milestones: bool, milestone_interval: Optional[int]) -> Union[List[Dict], Dict]:
         all_articles = []
+        section_counts = {}
+        total = 0
         self.articles = []  # Сбрасываем для накопления
         
         logger.info(f"Настройки сохранения: save_milestones={save_milestones}, milestone_interval={milestone_interval}")
+        if self.streaming:
+            logger.info(f"Потоковый режим: статьи пишутся в {self.sink_path} и в памяти не хранятся")
+        if self.frontier:
+            logger.info(f"Фронтир {self.frontier.path}: {self.frontier.counts()}")
+        if self.known or self.streaming or self.parquet_path:
+            # Итоговый результат строится из потока: прошлые статьи попадают в него в конце
+            self.open_sink()
+        if self.known and self.near_duplicates is not None:
+            # Новые статьи сравниваются и с прошлыми: их кластеры сохраняются
+            count = self.near_duplicates.add_all(DataStorage.load_articles(self.incremental_from))
+            logger.info(f"В индекс почти дубликатов добавлено {count} статей из {self.incremental_from}")
         
         for section in SECTIONS.keys():
+            count = 0
             try:
                 # Используем настройки из pages_config или значение по умолчанию
                 max_pages = pages_config.get(section, max_pages_per_section) if pages_config else max_pages_per_section
                 logger.info(f"Скрапинг раздела {section} с максимумом {max_pages} страниц")
                 
-                # Передаем milestone_interval и текущее количество статей в scrape_section
-                # передаем все накопленные статьи через self.articles для правильного сохранения
-                self.articles = all_articles  # Обновляем перед началом раздела
-                logger.info(f"Передаю в scrape_section: milestone_interval={milestone_interval}, total_before_section={len(all_articles)}")
-                articles = self.scrape_section(
+                for article in self.iter_section(
                     section, 
                     max_pages, 
                     save_milestone=save_milestones,
                     milestone_interval=milestone_interval,
-                    total_before_section=len(all_articles)
-                )
-                all_articles.extend(articles)
-                self.articles = all_articles  # Обновляем для milestone сохранения
+                    total_before_section=total
+                ):
+                    count += 1
+                    # В потоковом режиме статья уже в потоке: ссылку на нее не держим
+                    if not self.streaming:
+                        all_articles.append(article)
                 
-                logger.info(f"Всего скраплено статей: {len(all_articles)}")
-                    
             except Exception as e:
                 logger.error(f"Ошибка при скрапинге раздела {section}: {e}")
+            
+            section_counts[section] = count
+            total += count
+            logger.info(f"Всего скраплено статей: {total}")
         
         self.articles = all_articles
         
-        if milestone_interval and len(all_articles) >= milestone_interval:
-            self.save_to_json('rb_articles_milestone.json')
-            self.save_to_csv('rb_articles_milestone.csv')
-            logger.info(f"Финальный milestone сохранен: {len(all_articles)} статей")
+        if self.known:
+            self.carry_over_known()
+            stats = self.incremental_stats
+            logger.info(f"Инкрементальный режим: новых {stats['new']}, изменившихся {stats['changed']}, "
+                        f"без изменений {stats['unchanged']}, перенесено из прошлого результата {stats['carried']}")
+        
+        if self.sink:
+            written = self.sink.flush()
+            logger.info(f"Финальный milestone сохранен: в {self.sink.path} записано {written} статей")
+            if self.sink.mirror is not None:
+                self.sink.mirror.close()
+                self.sink.mirror = None
+            self._replace_previous()
+        
+        # Отчет по URL, которые не удалось загрузить после всех повторов
+        self.retry_queue.report()
+        
+        if self.archive is not None:
+            logger.info(f"Архив HTML {self.archive.path}: {len(self.archive)} страниц")
+        
+        if self.near_duplicates is not None:
+            stats = self.near_duplicates.stats()
+            logger.info(f"Почти дубликаты: статей {stats['articles']}, кластеров {stats['clusters']}, "
+                        f"попало в кластер найденной ранее статьи {stats['duplicates']}")
+        
+        if self.controller is not None:
+            stats = self.controller.stats()
+            baseline = f"{stats['baseline']:.2f} с" if stats['baseline'] is not None else 'нет данных'
+            logger.info(f"Адаптивная параллельность: лимит {stats['limit']}, в среднем {stats['average']} "
+                        f"за {stats['decisions']} решений, время ответа без нагрузки {baseline}")
         
+        if self.http_cache is not None:
+            stats = self.http_cache.stats()
+            logger.info(f"HTTP кэш {self.http_cache.path}: попаданий {stats['hits']}, подтверждено 304 "
+                        f"{stats['revalidated']}, промахов {stats['misses']}, сэкономлено "
+                        f"{stats['bytes_saved'] / 1024 / 1024:.1f} МБ")
+        
+        if self.parser.selector_cache is not None:
+            stats = self.parser.selector_cache.stats()
+            logger.info(f"Кэш селекторов: шаблонов {stats['templates']}, попаданий {stats['hits']}, "
+                        f"промахов {stats['misses']}")
+        
+        if metrics.enabled():
+            logger.info("Метрики стадий:")
+            for line in metrics.REGISTRY.summary():
+                logger.info(f"  {line}")
+        
+        if self.streaming:
+            return {'articles': total, 'sections': section_counts, 'sink': self.sink.path, 'written': self.sink.written}
         return all_articles
     
+    def open_sink(self, flush_size: Optional[int] = None) -> ArticleSink:
+        """
+        Открытие потока статей (один на весь запуск)
+        
+        Args:
+            flush_size: Сбрасывать буфер на диск каждые flush_size статей
+        """
+        if self.sink is None:
+            # При возобновлении по фронтиру дописываем в поток прошлого запуска. Если поток -
+            # это прошлый результат, новый поток пишется во временный файл: прошлый читается
+            # для переноса статей до конца обхода, а обновленные статьи не остаются за старыми
+            path = f'{self.sink_path}.tmp' if self._sink_is_previous() else self.sink_path
+            # Фронтир отмечает статьи, сброшенные на диск: при возобновлении они не дописываются снова
+            self.sink = ArticleSink(path, self.sink_compression, append=bool(self.frontier),
+                                    on_flush=self.frontier.mark_written if self.frontier else None)
+        if self.parquet_path and self.sink.mirror is None:
+            # Parquet не дописывается: каждый scrape_all пишет файл заново
+            self.sink.mirror = ParquetSink(self.parquet_path)
+        if flush_size:
+            self.sink.flush_size = flush_size
+        return self.sink
+    
+    def export(self, json_filename: Optional[str] = 'rb_articles.json',
+               csv_filename: Optional[str] = 'rb_articles.csv', parquet_filename: Optional[str] = None):
+        """Построение итоговых JSON/CSV/Parquet из потока (или из памяти, если поток не открывался)"""
+        if self.sink is None:
+            if json_filename:
+                self.save_to_json(json_filename)
+            if csv_filename:
+                self.save_to_csv(csv_filename)
+            if parquet_filename:
+                self.storage.save_to_parquet(self.articles, parquet_filename)
+            return
+        if self.sink.mirror is not None:
+            # Обход шел через scrape_section: колоночный корпус закрывается здесь
+            self.sink.mirror.close()
+            self.sink.mirror = None
+        self._replace_previous()
+        self.sink.export(json_filename, csv_filename, parquet_filename)
+    
     def save_to_json(self, filename: str = 'rb_articles.json'):
         """Сохранение данных в JSON"""
         self.storage.save_to_json(self.articles, filename)
@@ -0,0 +1,149 @@
+"""
+Кэш выигравших селекторов по отпечатку шаблона страницы
+
+Страницы одного раздела сверстаны по одному шаблону, поэтому в каскаде запасных
+селекторов для каждого поля раз за разом срабатывает один и тот же. Кэш запоминает
+его для отпечатка шаблона и на следующих страницах пробует первым; полный каскад
+запускается только если запомненный селектор ничего не нашел.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .config import FINGERPRINT_DEPTH, SELECTOR_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def run_cascade(selectors: Sequence, run: Callable[[Any], Any],
+                skip: Optional[int] = None) -> Tuple[Optional[int], Any]:
+    """
+    Полный каскад: первый селектор, который что-то нашел
+
+    Args:
+        selectors: Каскад селекторов в порядке приоритета
+        run: Применение одного селектора к странице (None - не найдено)
+        skip: Индекс селектора, который уже ничего не нашел на этой странице
+
+    Returns:
+        Пара (индекс селектора, найденный элемент) или (None, None)
+    """
+    for index, selector in enumerate(selectors):
+        if index == skip:
+            continue
+        found = run(selector)
+        if found is not None:
+            return index, found
+    return None, None
+
+
+def make_fingerprint(url: str, containers: Iterable[str]) -> str:
+    """
+    Отпечаток шаблона: раздел сайта из URL и набор контейнеров верхних уровней
+
+    Args:
+        url: URL страницы
+        containers: Строки вида 'глубина:тег.класс1.класс2' (повторы не важны)
+    """
+    path = urlparse(url).path.strip('/')
+    section = path.split('/', 1)[0] if path else ''
+    key = section + '|' + '|'.join(sorted(set(containers)))
+    return hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+
+def soup_fingerprint(url: str, soup, depth: int = FINGERPRINT_DEPTH) -> str:
+    """Отпечаток шаблона по дереву BeautifulSoup"""
+    containers = []
+
+    def walk(el, level: int):
+        for child in el.find_all(True, recursive=False):
+            containers.append(f"{level}:{child.name}." + '.'.join(sorted(child.get('class') or [])))
+            if level < depth:
+                walk(child, level + 1)
+
+    walk(soup.body or soup, 1)
+    return make_fingerprint(url, containers)
+
+
+def tree_fingerprint(url: str, root, depth: int = FINGERPRINT_DEPTH) -> str:
+    """Отпечаток шаблона по дереву lxml (совпадает с soup_fingerprint для той же страницы)"""
+    containers = []
+
+    def walk(el, level: int):
+        for child in el:
+            if not isinstance(child.tag, str):
+                continue
+            containers.append(f"{level}:{child.tag}." + '.'.join(sorted((child.get('class') or '').split())))
+            if level < depth:
+                walk(child, level + 1)
+
+    body = root.find('body')
+    walk(body if body is not None else root, 1)
+    return make_fingerprint(url, containers)
+
+
+class SelectorCache:
+    """
+    Запомненные селекторы: отпечаток шаблона -> поле -> индекс селектора в каскаде
+
+    Шаблоны вытесняются в порядке LRU: каждое обращение к шаблону делает его самым свежим.
+    """
+
+    def __init__(self, max_templates: int = SELECTOR_CACHE_SIZE):
+        """
+        Args:
+            max_templates: Сколько шаблонов помнить (вытесняется дольше всех не использовавшийся)
+        """
+        self.max_templates = max_templates
+        self.hits = 0
+        self.misses = 0
+        self._winners: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def select(self, fingerprint: str, field: str, selectors: Sequence, run: Callable[[Any], Any]) -> Any:
+        """
+        Поиск элемента для поля
+
+        Args:
+            fingerprint: Отпечаток шаблона страницы
+            field: Имя поля (ключ каскада)
+            selectors: Каскад селекторов в порядке приоритета
+            run: Применение одного селектора к странице (None - не найдено)
+
+        Returns:
+            Найденный элемент или None
+        """
+        with self._lock:
+            winners = self._winners.get(fingerprint)
+            if winners is not None:
+                self._winners.move_to_end(fingerprint)
+            cached = winners.get(field) if winners else None
+
+        if cached is not None:
+            found = run(selectors[cached])
+            if found is not None:
+                self.hits += 1
+                return found
+
+        self.misses += 1
+        # Запомненный селектор только что ничего не нашел: повторно его не запускаем
+        index, found = run_cascade(selectors, run, skip=cached)
+        if index is not None:
+            with self._lock:
+                winners = self._winners.get(fingerprint)
+                if winners is None:
+                    winners = self._winners[fingerprint] = {}
+                    if len(self._winners) > self.max_templates:
+                        self._winners.popitem(last=False)
+                else:
+                    self._winners.move_to_end(fingerprint)
+                winners[field] = index
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов"""
+        return {'templates': len(self._winners), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,104 @@
+"""
+Шардирование обхода: разбиение работы между независимыми воркерами (процессами
+или машинами с общим каталогом) и слияние их результатов
+"""
+
+import json
+import zlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .storage import ArticleSink
+from .near_duplicates import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(url: str, count: int) -> int:
+    """Шард URL: стабильный хэш (одинаковый во всех процессах и на всех машинах)"""
+    return zlib.crc32(url.encode('utf-8')) % count
+
+
+def owns_page(page: int, index: int, count: int) -> bool:
+    """Страница листинга принадлежит шарду index: страницы раздаются по кругу (1 - шарду 0)"""
+    return (page - 1) % count == index
+
+
+def shard_paths(directory: str, index: int, count: int) -> Dict[str, str]:
+    """
+    Файлы шарда в общем каталоге
+
+    Returns:
+        Пути: sink (поток статей), frontier (состояние обхода), archive (архив HTML),
+        done (отметка о завершении)
+    """
+    base = Path(directory) / f'shard-{index:03d}-of-{count:03d}'
+    return {
+        'sink': f'{base}.jsonl',
+        'frontier': f'{base}.db',
+        'archive': f'{base}-archive',
+        'done': f'{base}.done.json',
+    }
+
+
+def mark_done(directory: str, index: int, count: int, stats: Dict):
+    """Отметка о завершении шарда (по ней слияние проверяет, что все воркеры закончили)"""
+    stats = dict(stats, finished_at=datetime.now().isoformat())
+    path = Path(shard_paths(directory, index, count)['done'])
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(stats, ensure_ascii=False), encoding='utf-8')
+    tmp.replace(path)
+
+
+def missing_shards(directory: str, count: int) -> List[int]:
+    """Номера шардов без отметки о завершении"""
+    return [index for index in range(count) if not Path(shard_paths(directory, index, count)['done']).exists()]
+
+
+def merge_shards(directory: str, count: int, output_path: str = 'rb_articles.jsonl',
+                 compression: Optional[str] = None, near_duplicates: bool = False) -> int:
+    """
+    Слияние потоков шардов в один с дедупликацией по URL
+
+    Шарды читаются по порядку, при повторе URL (статья попала на страницы листинга
+    двух шардов из-за сдвига пагинации) остается первая запись.
+
+    Args:
+        directory: Общий каталог шардов
+        count: Количество шардов
+        output_path: Итоговый файл JSON Lines (перезаписывается)
+        compression: Сжатие итогового файла: None, 'gzip' или 'zstd'
+        near_duplicates: Назначить cluster_id почти одинаковым статьям заново по всему
+                         корпусу (у шардов индексы свои и общих кластеров не видят)
+
+    Returns:
+        Количество статей в итоговом файле
+    """
+    seen = set()
+    duplicates = 0
+    dup_index = NearDuplicateIndex() if near_duplicates else None
+    sink = ArticleSink(output_path, compression)
+    try:
+        for shard in range(count):
+            path = shard_paths(directory, shard, count)['sink']
+            if not Path(path).exists():
+                logger.warning(f"Поток шарда {shard} ({path}) не найден")
+                continue
+            for article in ArticleSink.read(path):
+                url = article.get('url')
+                if url in seen:
+                    duplicates += 1
+                    continue
+                seen.add(url)
+                if dup_index is not None:
+                    dup_index.assign(article, keep=False)
+                sink.write(article)
+    finally:
+        sink.close()
+
+    logger.info(f"Слияние {count} шардов: в {output_path} записано {sink.written} статей, дубликатов {duplicates}")
+    if dup_index is not None:
+        logger.info(f"Кластеров почти одинаковых статей: {dup_index.stats()['clusters']}")
+    return sink.written
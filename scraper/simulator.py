@@ -0,0 +1,305 @@
+"""
+Локальный симулятор rb.ru: листинги, статьи, robots.txt и sitemap без обращения к сети
+(для бенчмарков и проверки скрапера целиком)
+"""
+
+import re
+import math
+import time
+import zlib
+import random
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .config import (BASE_URL, SECTIONS, FULL_URL_PATTERN, SIM_PAGES, SIM_ARTICLES_PER_PAGE,
+                     SIM_LATENCY, SIM_JITTER, SIM_ERROR_RATE, SIM_PARAGRAPHS, SIM_DUPLICATE_RATE)
+from .archive import PageArchive
+
+logger = logging.getLogger(__name__)
+
+_COMPANIES = ['Яндекс', 'Сбер', 'Т-Банк', 'VK', 'Ozon', 'Wildberries', 'Авито', 'МТС', 'OpenAI',
+              'Skyeng', 'Контур', 'hh.ru', '«Ромашка»', 'Selectel', 'Positive Technologies']
+_PEOPLE = ['Алексей Смирнов', 'Мария Иванова', 'Дмитрий Козлов', 'Анна Соколова', 'Игорь Волков',
+           'Екатерина Морозова', 'Павел Новиков', 'Ольга Лебедева']
+_TOPICS = ['финтех', 'маркетплейсы', 'искусственный интеллект', 'ритейл', 'логистика', 'кибербезопасность',
+           'EdTech', 'венчурный рынок']
+_TEMPLATES = [
+    '{company} привлекла {amount} млн рублей инвестиций от фонда {company2}.',
+    '{person}, основатель {company}, рассказал о планах компании на {year} год.',
+    'Выручка {company} за год выросла до ${amount} млн, следует из отчетности.',
+    'По словам {person}, рынок {topic} вырос на {pct}% за последний квартал.',
+    'Сделка между {company} и {company2} оценивается в {amount} млрд ₽.',
+    'Аналитики отмечают, что сегмент {topic} остается одним из самых быстрорастущих.',
+    'Компания планирует направить средства на развитие продукта и выход на новые рынки.',
+    'Эксперты ожидают, что конкуренция в сегменте {topic} усилится уже в следующем году.',
+]
+_BASE_DATE = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _article_segment(section: str) -> str:
+    """Сегмент пути URL статьи раздела (/neuro/ -> neuroprofiles: такие URL принимает скрапер)"""
+    segment = SECTIONS[section].strip('/')
+    return segment if re.match(FULL_URL_PATTERN, f'{BASE_URL}/{segment}/x/') else section
+
+
+class SiteSimulator:
+    """
+    HTTP сервер, отдающий страницы в разметке rb.ru
+
+    Листинги разделов (/news/, /news/?page=2, ...) ссылаются на статьи; после последней
+    страницы раздела листинг пустой, как на сайте. Статьи синтетические: заголовок, автор,
+    дата, абзацы с компаниями, суммами и людьми; содержимое определяется seed и путем,
+    поэтому одинаково во всех запусках. Вместо синтетических статей можно отдавать
+    записанные страницы из архива HTML (PageArchive): листинги тогда строятся по его URL.
+    Доля duplicate_rate статей вне /news/ повторяет текст новости с тем же номером
+    (перепечатка в другом разделе).
+
+    Задержка ответа - логнормальная (медиана latency, разброс jitter), доля error_rate
+    ответов - 500. Статьи отдаются с ETag и Last-Modified и отвечают 304 на условные запросы.
+    """
+
+    def __init__(self, pages: Optional[Dict[str, int]] = None, max_pages: int = SIM_PAGES,
+                 per_page: int = SIM_ARTICLES_PER_PAGE, latency: float = SIM_LATENCY,
+                 jitter: float = SIM_JITTER, error_rate: float = SIM_ERROR_RATE,
+                 paragraphs: int = SIM_PARAGRAPHS, duplicate_rate: float = SIM_DUPLICATE_RATE,
+                 archive_path: Optional[str] = None,
+                 seed: int = 0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            pages: Страниц листинга по разделам ({'news': 20}); остальным разделам - max_pages
+            max_pages: Страниц листинга в разделе по умолчанию
+            per_page: Статей на странице листинга
+            latency: Медиана задержки ответа (секунды, 0 - без задержки)
+            jitter: Разброс задержки (sigma логнормального распределения)
+            error_rate: Доля ответов 500
+            paragraphs: Медиана числа абзацев статьи (размер страниц распределен логнормально)
+            duplicate_rate: Доля статей вне /news/, перепечатывающих новость с тем же номером
+            archive_path: Архив HTML с записанными страницами вместо синтетических статей
+            seed: Начальное значение генератора содержимого, задержек и ошибок
+            host: Адрес сервера
+            port: Порт (0 - любой свободный)
+        """
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.paragraphs = paragraphs
+        self.duplicate_rate = duplicate_rate
+        self.seed = seed
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.archive = PageArchive(archive_path) if archive_path else None
+
+        # Путь листинга раздела -> URL статей по порядку страниц
+        self.listings: Dict[str, List[str]] = {}
+        if self.archive is not None:
+            self._load_archive()
+        else:
+            pages = pages or {}
+            for section, path in SECTIONS.items():
+                segment = _article_segment(section)
+                count = pages.get(section, max_pages) * per_page
+                self.listings[path] = [f'{BASE_URL}/{segment}/sim-{section}-{i:06d}/' for i in range(count)]
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    def _load_archive(self):
+        """Листинги по URL архива: статьи раздела в порядке URL"""
+        url_regex = re.compile(FULL_URL_PATTERN)
+        path_by_segment = {}
+        for section, path in SECTIONS.items():
+            path_by_segment[path.strip('/')] = path
+            path_by_segment[section] = path
+            path_by_segment[_article_segment(section)] = path
+        for url in sorted(self.archive.fetched_at()):
+            match = url_regex.match(url)
+            path = path_by_segment.get(match.group(1)) if match else None
+            if path:
+                self.listings.setdefault(path, []).append(url)
+        logger.info(f"Симулятор: {sum(map(len, self.listings.values()))} записанных страниц из {self.archive.path}")
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def articles(self) -> int:
+        """Сколько статей доступно через листинги"""
+        return sum(len(urls) for urls in self.listings.values())
+
+    def start(self) -> str:
+        """Запуск сервера в фоновом потоке; возвращает адрес для RBScraper(origin=...)"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='site-simulator', daemon=True)
+        self._thread.start()
+        logger.info(f"Симулятор rb.ru на {self.url}: {self.articles} статей, задержка {self.latency:g} с, "
+                    f"ошибок {self.error_rate:.0%}")
+        return self.url
+
+    def serve_forever(self):
+        """Запуск в текущем потоке (например, в отдельном процессе бенчмарка)"""
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def __enter__(self) -> 'SiteSimulator':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay(self) -> Tuple[float, bool]:
+        """Задержка ответа и признак ошибки для очередного запроса"""
+        with self._lock:
+            self.requests += 1
+            delay = self._random.lognormvariate(math.log(self.latency), self.jitter) if self.latency > 0 else 0.0
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def render(self, path: str, query: str = '') -> Optional[Tuple[str, str, Optional[datetime]]]:
+        """
+        Содержимое страницы по пути
+
+        Returns:
+            (тип содержимого, тело, время изменения или None) или None - страницы нет
+        """
+        if path == '/robots.txt':
+            return 'text/plain', f'User-agent: *\nSitemap: {BASE_URL}/sitemap.xml\n', None
+        if path == '/sitemap.xml':
+            return 'application/xml', self._render_sitemap(), None
+        if path in self.listings:
+            page = parse_qs(query).get('page', ['1'])[0]
+            return 'text/html', self._render_listing(path, int(page) if page.isdigit() else 1), None
+
+        url = BASE_URL + path
+        if self.archive is not None:
+            with self._lock:
+                html = self.archive.get(url)
+            return ('text/html', html, None) if html is not None else None
+        index = self._article_index(path)
+        if index is None:
+            return None
+        return 'text/html', self._render_article(path, index), _BASE_DATE - timedelta(hours=3 * index)
+
+    def _article_index(self, path: str) -> Optional[int]:
+        """Порядковый номер синтетической статьи по пути (/news/sim-news-000042/ -> 42)"""
+        slug = path.strip('/').rsplit('/', 1)[-1]
+        prefix, _, number = slug.rpartition('-')
+        if not prefix.startswith('sim-') or not number.isdigit():
+            return None
+        return int(number)
+
+    def _render_listing(self, path: str, page: int) -> str:
+        urls = self.listings[path][(page - 1) * self.per_page:page * self.per_page] if page >= 1 else []
+        cards = ''.join(
+            f'<div class="news-card"><a href="{url[len(BASE_URL):]}">Статья {escape(url.rstrip("/").rsplit("/", 1)[-1])}</a>'
+            f'<span class="card-date">{page}</span></div>'
+            for url in urls
+        )
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Раздел {escape(path)} | RB.RU</title>'
+                f'</head><body><header><nav><a href="/">RB.RU</a> <a href="/news/">Новости</a></nav></header>'
+                f'<main><section class="news-list">{cards}</section></main>'
+                f'<footer><a href="/about/">О проекте</a></footer></body></html>')
+
+    def _render_sitemap(self) -> str:
+        entries = ''.join(f'<url><loc>{url}</loc></url>' for urls in self.listings.values() for url in urls)
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>')
+
+    def _render_article(self, path: str, index: int) -> str:
+        """Синтетическая статья (одинаковая для одного пути и seed)"""
+        source = path
+        news_path = f'/{_article_segment("news")}/sim-news-{index:06d}/'
+        if (self.duplicate_rate and path != news_path
+                and random.Random(f'{self.seed}:duplicate:{path}').random() < self.duplicate_rate):
+            # Перепечатка: заголовок, лид и текст новости, разметка и дата - свои
+            source = news_path
+        rng = random.Random(f'{self.seed}:{source}')
+
+        def sentence() -> str:
+            companies = rng.sample(_COMPANIES, 2)
+            return rng.choice(_TEMPLATES).format(
+                company=companies[0], company2=companies[1], person=rng.choice(_PEOPLE),
+                topic=rng.choice(_TOPICS), amount=rng.randint(1, 999), pct=rng.randint(2, 90),
+                year=rng.randint(2024, 2027))
+
+        count = max(1, round(rng.lognormvariate(math.log(self.paragraphs), 0.5))) if self.paragraphs > 0 else 1
+        paragraphs = ''.join(f'<p>{" ".join(sentence() for _ in range(rng.randint(2, 6)))}</p>'
+                             for _ in range(count))
+        title = f'{rng.choice(_COMPANIES)}: {sentence().rstrip(".")}'
+        lead = sentence()
+        date = (_BASE_DATE - timedelta(hours=3 * index)).isoformat()
+        tags = ''.join(f'<a class="tag" href="/tags/{i}/">{escape(topic)}</a>'
+                       for i, topic in enumerate(rng.sample(_TOPICS, 3)))
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)} | RB.RU</title>'
+                f'<meta property="og:title" content="{escape(title)}">'
+                f'<meta property="og:description" content="{escape(lead)}">'
+                f'<meta property="article:published_time" content="{date}">'
+                f'<script>window.__STATE__ = {{"id": {index}}};</script></head><body>'
+                f'<header><nav><a href="/">RB.RU</a> <a class="tag" href="/tags/trends/">Тренды</a></nav></header>'
+                f'<nav class="breadcrumbs"><a href="/">Главная</a> <a href="{escape(path.split("/sim-")[0])}/">Раздел</a></nav>'
+                f'<article><h1 class="article-title">{escape(title)}</h1>'
+                f'<a class="author-link" href="/authors/{index % len(_PEOPLE)}/">{rng.choice(_PEOPLE)}</a>'
+                f'<time datetime="{date}">{date[:10]}</time>'
+                f'<div class="article-lead">{escape(lead)}</div>{paragraphs}'
+                f'<div class="tags-list">{tags}</div></article>'
+                f'<aside><a href="/news/">Читайте также</a></aside>'
+                f'<footer><a href="/about/">О проекте</a></footer></body></html>')
+
+    def _handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                delay, failed = simulator._delay()
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    return self._reply(500, 'text/plain', b'Internal Server Error')
+
+                parts = urlsplit(self.path)
+                page = simulator.render(parts.path, parts.query)
+                if page is None:
+                    return self._reply(404, 'text/plain', b'Not Found')
+                content_type, body, modified = page
+                data = body.encode('utf-8')
+                headers = {'ETag': f'"{zlib.crc32(data):08x}"'}
+                if modified is not None:
+                    headers['Last-Modified'] = format_datetime(modified, usegmt=True)
+                if self.headers.get('If-None-Match') == headers['ETag']:
+                    return self._reply(304, content_type, b'', headers)
+                self._reply(200, f'{content_type}; charset=utf-8', data, headers)
+
+            def _reply(self, status: int, content_type: str, data: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if data:
+                    self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Симулятор: {format % args}")
+
+        return Handler
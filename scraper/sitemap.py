@@ -0,0 +1,226 @@
+"""
+Поиск URL статей по sitemap и RSS/Atom лентам вместо обхода листингов
+"""
+
+import re
+import zlib
+import logging
+from collections import deque
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+from lxml import etree
+
+from .config import BASE_URL, SECTIONS, FULL_URL_PATTERN, SITEMAP_URLS, FEED_URLS, HTTP_CACHE_LISTING_TTL
+from .http_client import HTTPClient
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Сегмент пути URL статьи -> раздел (/columns/ - это opinions и т.д.)
+_SECTION_BY_SEGMENT = {path.strip('/'): section for section, path in SECTIONS.items()}
+_SECTION_BY_SEGMENT.update({section: section for section in SECTIONS})
+
+
+def _localname(el) -> str:
+    return etree.QName(el).localname
+
+
+def _child_text(el, *names: str) -> Optional[str]:
+    """Текст первого дочернего элемента с одним из имен (без учета пространства имен)"""
+    for child in el:
+        if isinstance(child.tag, str) and _localname(child) in names and child.text:
+            return child.text.strip()
+    return None
+
+
+def _feed_date(value: Optional[str]) -> Optional[str]:
+    """Дата из RSS (RFC 822) в ISO формате; ISO даты Atom и sitemap не меняются"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+def normalize_url(url: str) -> str:
+    """Нормализация как в HTMLParser.extract_article_links: без параметров, со слешем в конце"""
+    return url.strip().rstrip('/').split('?')[0] + '/'
+
+
+class SitemapDiscovery:
+    """
+    Потоковый разбор sitemap (в том числе индексов sitemap и .xml.gz) и RSS/Atom лент
+
+    XML разбирается инкрементально по мере загрузки, обработанные элементы сразу
+    удаляются из дерева, поэтому память не зависит от размера sitemap. Источником
+    может быть URL или локальный файл (сохраненные sitemap для работы без сети):
+    вложенные sitemap из локального индекса ищутся в том же каталоге по имени файла.
+    """
+
+    def __init__(self, http_client: Optional[HTTPClient] = None,
+                 sitemap_urls: Optional[List[str]] = SITEMAP_URLS,
+                 feed_urls: Iterable[str] = FEED_URLS, url_pattern: str = FULL_URL_PATTERN):
+        """
+        Args:
+            http_client: Клиент для загрузки (не нужен, если все источники - локальные файлы)
+            sitemap_urls: Sitemap или индексы sitemap; None - взять из robots.txt
+                          (если там нет - {BASE_URL}/sitemap.xml)
+            feed_urls: RSS/Atom ленты
+            url_pattern: Паттерн URL статей
+        """
+        self.http_client = http_client
+        self.sitemap_urls = sitemap_urls
+        self.feed_urls = list(feed_urls)
+        self.url_pattern = re.compile(url_pattern)
+        self.requests = 0
+
+    def _read_chunks(self, source: str) -> Iterator[bytes]:
+        """Сырые байты источника частями (локальный файл или HTTP)"""
+        path = Path(source[len('file://'):] if source.startswith('file://') else source)
+        if '://' not in source or source.startswith('file://'):
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        if self.http_client is None:
+            logger.warning(f"Пропускаю {source}: нет локального файла, а загрузка из сети выключена")
+            return
+        self.requests += 1
+        yield from self.http_client.fetch_stream(source, CHUNK_SIZE)
+
+    def _iter_xml_chunks(self, source: str) -> Iterator[bytes]:
+        """Байты XML источника; сжатые gzip файлы (.xml.gz) распаковываются на лету"""
+        decompressor = None
+        for chunk in self._read_chunks(source):
+            if decompressor is None and chunk.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
+
+    def iter_entries(self, source: str) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """
+        Записи одного документа
+
+        Yields:
+            Тройки (тип, url, дата): тип 'sitemap' для вложенного sitemap из индекса,
+            'page' для страницы из sitemap или ленты
+        """
+        parser = etree.XMLPullParser(events=('end',), recover=True, resolve_entities=False)
+        empty = True
+        for chunk in self._iter_xml_chunks(source):
+            empty = empty and not chunk
+            parser.feed(chunk)
+            yield from self._drain(parser)
+        if empty:
+            return
+        try:
+            parser.close()
+        except etree.XMLSyntaxError as e:
+            logger.warning(f"Ошибка разбора {source}: {e}")
+        yield from self._drain(parser)
+
+    @staticmethod
+    def _drain(parser) -> Iterator[Tuple[str, str, Optional[str]]]:
+        for _, el in parser.read_events():
+            if not isinstance(el.tag, str):
+                continue
+            name = _localname(el)
+            if name == 'url':
+                loc = _child_text(el, 'loc')
+                if loc:
+                    yield 'page', loc, _child_text(el, 'lastmod')
+            elif name == 'sitemap':
+                loc = _child_text(el, 'loc')
+                if loc:
+                    yield 'sitemap', loc, _child_text(el, 'lastmod')
+            elif name == 'item':
+                link = _child_text(el, 'link') or _child_text(el, 'guid')
+                if link:
+                    yield 'page', link, _feed_date(_child_text(el, 'pubDate', 'date'))
+            elif name == 'entry':
+                link = next((child.get('href') for child in el
+                             if isinstance(child.tag, str) and _localname(child) == 'link'
+                             and child.get('rel', 'alternate') == 'alternate'), None)
+                if link:
+                    yield 'page', link, _child_text(el, 'updated', 'published')
+            else:
+                continue
+            # Обработанная запись больше не нужна: освобождаем память
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+
+    def _resolve(self, parent: str, loc: str) -> str:
+        """Вложенный sitemap локального индекса ищется рядом с индексом по имени файла"""
+        if '://' in parent and not parent.startswith('file://'):
+            return loc
+        parent_path = Path(parent[len('file://'):] if parent.startswith('file://') else parent)
+        name = Path(urlparse(loc).path).name
+        local = parent_path.parent / name
+        return str(local) if name and local.exists() else loc
+
+    def sitemaps_from_robots(self) -> List[str]:
+        """Адреса sitemap из robots.txt"""
+        sitemaps = []
+        robots = None
+        if self.http_client:
+            self.requests += 1
+            robots = self.http_client.fetch_html(f"{BASE_URL}/robots.txt", retries=2, max_age=HTTP_CACHE_LISTING_TTL)
+        for line in (robots or '').splitlines():
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'sitemap' and value.strip():
+                sitemaps.append(value.strip())
+        return sitemaps or [f"{BASE_URL}/sitemap.xml"]
+
+    def iter_urls(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        URL статей из всех sitemap (с обходом индексов) и лент
+
+        Yields:
+            Пары (нормализованный URL статьи, дата изменения или None)
+        """
+        sitemap_urls = self.sitemap_urls if self.sitemap_urls is not None else self.sitemaps_from_robots()
+        queue = deque(list(sitemap_urls) + self.feed_urls)
+        visited = set()
+        while queue:
+            source = queue.popleft()
+            if source in visited:
+                continue
+            visited.add(source)
+            logger.info(f"Читаю {source}")
+            for kind, loc, lastmod in self.iter_entries(source):
+                if kind == 'sitemap':
+                    queue.append(self._resolve(source, loc))
+                elif self.url_pattern.match(loc.strip()):
+                    yield normalize_url(loc), lastmod
+
+    def discover(self) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        """
+        URL статей по разделам
+
+        Returns:
+            {раздел: [(url, дата изменения), ...]}; URL без повтора, при повторе берется
+            самая поздняя дата
+        """
+        lastmods: Dict[str, Optional[str]] = {}
+        for url, lastmod in self.iter_urls():
+            if url not in lastmods or (lastmod or '') > (lastmods[url] or ''):
+                lastmods[url] = lastmod
+
+        by_section: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        for url, lastmod in lastmods.items():
+            section = _SECTION_BY_SEGMENT.get(self.url_pattern.match(url).group(1))
+            if section:
+                by_section.setdefault(section, []).append((url, lastmod))
+
+        logger.info(f"Найдено {len(lastmods)} URL статей за {self.requests} запросов: "
+                    + ', '.join(f"{section} {len(entries)}" for section, entries in by_section.items()))
+        return by_section
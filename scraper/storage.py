@@ -1,20 +1,110 @@
+import io
+import os
+import gzip
 import json
+import time
 import logging
-from typing import List, Dict
+from itertools import chain, islice
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from .config import (DEFAULT_SINK_PATH, SINK_FLUSH_INTERVAL, SINK_FLUSH_SIZE, SINK_COMPRESSIONS,
+                     PARQUET_ROW_GROUP_SIZE, PARQUET_COMPRESSION)
+from .records import Article, dumps_json, loads_json, plain
 
 logger = logging.getLogger(__name__)
 
+CSV_CHUNK_SIZE = 1000
+
 
 class DataStorage:  
     @staticmethod
-    def save_to_json(articles: List[Dict], filename: str = 'rb_articles.json'):
+    def save_to_json(articles: Iterable[Dict], filename: str = 'rb_articles.json'):
+        # Пишем массив по одной статье, чтобы не держать весь JSON в памяти;
+        # результат совпадает с json.dump(articles, indent=2)
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, ensure_ascii=False, indent=2)
+            f.write('[')
+            count = 0
+            for article in articles:
+                encoded = json.dumps(article, ensure_ascii=False, indent=2, default=plain)
+                f.write(',\n  ' if count else '\n  ')
+                f.write(encoded.replace('\n', '\n  '))
+                count += 1
+            f.write('\n]' if count else ']')
         logger.info(f"Данные сохранены в {filename}")
     
     @staticmethod
-    def save_to_csv(articles: List[Dict], filename: str = 'rb_articles.csv'):
-        if not articles:
+    def load_articles(filename: str) -> Iterator[Article]:
+        """Статьи из прошлого результата: JSON массив (rb_articles.json), Parquet или поток JSON Lines"""
+        if filename.endswith('.json'):
+            with open(filename, encoding='utf-8') as f:
+                for article in json.load(f):
+                    yield Article.from_dict(article)
+            return
+        if filename.endswith('.parquet'):
+            yield from ParquetSink.read(filename)
+            return
+        yield from ArticleSink.read(filename)
+    
+    @staticmethod
+    def load_table(filename: str, columns: Optional[List[str]] = None,
+                   batch_size: int = PARQUET_ROW_GROUP_SIZE) -> 'pa.Table':
+        """
+        Корпус таблицей Arrow (только нужные колонки)
+
+        Parquet читается напрямую; JSON и поток JSON Lines разбираются по статьям
+        и собираются в колонки группами по batch_size.
+        """
+        if pa is None:
+            raise ImportError("Для колоночного чтения корпуса требуется библиотека pyarrow")
+        if filename.endswith('.parquet'):
+            return pq.read_table(filename, columns=columns)
+        schema = article_schema()
+        if columns is not None:
+            schema = pa.schema([schema.field(name) for name in columns])
+        articles = DataStorage.load_articles(filename)
+        batches = []
+        while True:
+            chunk = list(islice(articles, batch_size))
+            if not chunk:
+                break
+            batches.append(articles_to_batch(chunk, schema))
+        return pa.Table.from_batches(batches, schema=schema)
+    
+    @staticmethod
+    def article_to_csv_row(article: Dict) -> Dict:
+        return {
+            'url': article.get('url', ''),
+            'title': article.get('title', ''),
+            'content_type': article.get('content_type', ''),
+            'author': article.get('author', ''),
+            'date': article.get('date', ''),
+            'tags': '; '.join(article.get('tags', [])),
+            'categories': '; '.join(article.get('categories', [])),
+            'text': article.get('text', '')[:1000],  # Ограничиваем длину текста
+            'description': article.get('description', ''),
+            'companies': '; '.join(article.get('companies', [])),
+            'people': '; '.join(article.get('people', [])),
+            'money': '; '.join([f"{m.get('amount', '')} {m.get('multiplier', '')} {m.get('currency', '')}" for m in article.get('money', [])]),
+            'scraped_at': article.get('scraped_at', ''),
+            'cluster_id': article.get('cluster_id', '')
+        }
+    
+    @staticmethod
+    def save_to_csv(articles: Iterable[Dict], filename: str = 'rb_articles.csv'):
+        articles = iter(articles)
+        first = next(articles, None)
+        if first is None:
             logger.warning("Нет данных для сохранения")
             return
         
@@ -24,26 +114,277 @@ class DataStorage:
             logger.error("Для сохранения в CSV требуется библиотека pandas")
             return
         
-        csv_data = []
-        for article in articles:
-            row = {
-                'url': article.get('url', ''),
-                'title': article.get('title', ''),
-                'content_type': article.get('content_type', ''),
-                'author': article.get('author', ''),
-                'date': article.get('date', ''),
-                'tags': '; '.join(article.get('tags', [])),
-                'categories': '; '.join(article.get('categories', [])),
-                'text': article.get('text', '')[:1000],  # Ограничиваем длину текста
-                'description': article.get('description', ''),
-                'companies': '; '.join(article.get('companies', [])),
-                'people': '; '.join(article.get('people', [])),
-                'money': '; '.join([f"{m.get('amount', '')} {m.get('multiplier', '')} {m.get('currency', '')}" for m in article.get('money', [])]),
-                'scraped_at': article.get('scraped_at', '')
-            }
-            csv_data.append(row)
-        
-        df = pd.DataFrame(csv_data)
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        # Пишем частями, чтобы не строить DataFrame по всему корпусу
+        articles = chain([first], articles)
+        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+            header = True
+            while True:
+                chunk = [DataStorage.article_to_csv_row(a) for a in islice(articles, CSV_CHUNK_SIZE)]
+                if not chunk:
+                    break
+                pd.DataFrame(chunk).to_csv(f, index=False, header=header)
+                header = False
         logger.info(f"Данные сохранены в {filename}")
+    
+    @staticmethod
+    def save_to_parquet(articles: Iterable[Union[Article, Dict]], filename: str = 'rb_articles.parquet',
+                        row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> int:
+        """Сохранение в Parquet группами строк (в памяти не больше row_group_size статей)"""
+        sink = ParquetSink(filename, row_group_size)
+        try:
+            for article in articles:
+                sink.write(article)
+        finally:
+            sink.close()
+        logger.info(f"Данные сохранены в {filename}: {sink.written} статей")
+        return sink.written
+
+
+class ArticleSink:
+    """
+    Потоковая запись статей в JSON Lines (только дозапись)
+
+    Каждая статья кодируется один раз и попадает во внутренний буфер; буфер
+    сбрасывается на диск, когда в нем набирается flush_size статей или проходит
+    flush_interval секунд с прошлого сброса. При сжатии каждый сброс пишется
+    отдельным gzip/zstd фреймом, поэтому файл остается читаемым даже после падения.
+    Если задан mirror (ParquetSink), каждая статья пишется и в него. Если задан on_flush,
+    после каждого сброса он получает URL статей, которые теперь есть на диске.
+    """
+
+    def __init__(self, path: str = DEFAULT_SINK_PATH, compression: Optional[str] = None,
+                 flush_interval: float = SINK_FLUSH_INTERVAL, flush_size: int = SINK_FLUSH_SIZE,
+                 append: bool = False, mirror: Optional['ParquetSink'] = None,
+                 on_flush: Optional[Callable[[List[str]], None]] = None):
+        """
+        Args:
+            path: Путь к файлу .jsonl (.jsonl.gz / .jsonl.zst при сжатии)
+            compression: None, 'gzip' или 'zstd'
+            flush_interval: Максимальное время между сбросами буфера (секунды)
+            flush_size: Количество статей в буфере, после которого он сбрасывается
+            append: Дописывать в существующий файл (иначе файл перезаписывается)
+            mirror: Второй выход для тех же статей (колоночный корпус Parquet)
+            on_flush: Вызывается со списком URL записанных на диск статей после каждого сброса
+        """
+        if compression not in SINK_COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие {compression!r}, доступны: {SINK_COMPRESSIONS}")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("Для сжатия zstd требуется библиотека zstandard")
+
+        self.path = path
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.written = 0
+        self._buffer: List[bytes] = []
+        self._urls: List[str] = []
+        self._last_flush = time.monotonic()
+        self._file = open(path, 'ab' if append else 'wb')
+        self.mirror = mirror
+        self.on_flush = on_flush
+
+    def write(self, article: Union[Article, Dict]):
+        """Добавление статьи в поток (компактный JSON, одна строка)"""
+        self._buffer.append(dumps_json(article).encode('utf-8') + b'\n')
+        if self.on_flush is not None:
+            self._urls.append(article['url'])
+        if self.mirror is not None:
+            self.mirror.write(article)
+        if (len(self._buffer) >= self.flush_size or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Сброс буфера на диск
+
+        Returns:
+            Общее количество статей, записанных в файл
+        """
+        if self._buffer:
+            data = b''.join(self._buffer)
+            if self.compression == 'gzip':
+                data = gzip.compress(data)
+            elif self.compression == 'zstd':
+                data = zstandard.ZstdCompressor().compress(data)
+            self._file.write(data)
+            self._file.flush()
+            self.written += len(self._buffer)
+            self._buffer = []
+            if self.on_flush is not None:
+                urls, self._urls = self._urls, []
+                self.on_flush(urls)
+        self._last_flush = time.monotonic()
+        return self.written
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        if self.mirror is not None:
+            self.mirror.close()
+
+    def replace(self, path: str):
+        """
+        Перенос потока на место файла path (os.replace); поток остается открытым для дозаписи
+
+        Так прошлый результат заменяется новым целиком: до переноса он читается как был.
+        """
+        self.flush()
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+        self._file = open(path, 'ab')
+
+    @staticmethod
+    def read(path: str, compression: Optional[str] = None) -> Iterator[Article]:
+        """
+        Чтение статей из потока с дедупликацией по URL
+
+        Args:
+            path: Путь к файлу потока
+            compression: Сжатие файла (None - определить по расширению)
+
+        Yields:
+            Статьи в порядке записи (при повторе URL берется первая запись)
+        """
+        if compression is None:
+            if path.endswith('.gz'):
+                compression = 'gzip'
+            elif path.endswith('.zst'):
+                compression = 'zstd'
+
+        with open(path, 'rb') as raw:
+            if compression == 'gzip':
+                stream = gzip.GzipFile(fileobj=raw)
+            elif compression == 'zstd':
+                if zstandard is None:
+                    raise ImportError("Для чтения zstd требуется библиотека zstandard")
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            else:
+                stream = raw
+
+            seen = set()
+            try:
+                for line in io.TextIOWrapper(stream, encoding='utf-8'):
+                    if not line.strip():
+                        continue
+                    try:
+                        article = loads_json(line)
+                    except json.JSONDecodeError:
+                        # Недописанная последняя строка после аварийного завершения
+                        logger.warning(f"Пропущена поврежденная строка в {path}")
+                        continue
+                    url = article.url
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    yield article
+            except EOFError:
+                logger.warning(f"Файл {path} обрывается на незавершенном фрейме, прочитано {len(seen)} статей")
+
+    def export(self, json_filename: Optional[str] = 'rb_articles.json',
+               csv_filename: Optional[str] = 'rb_articles.csv', parquet_filename: Optional[str] = None):
+        """Построение итоговых JSON/CSV/Parquet из потока без загрузки корпуса в память"""
+        self.flush()
+        if json_filename:
+            DataStorage.save_to_json(self.read(self.path, self.compression), json_filename)
+        if csv_filename:
+            DataStorage.save_to_csv(self.read(self.path, self.compression), csv_filename)
+        if parquet_filename:
+            DataStorage.save_to_parquet(self.read(self.path, self.compression), parquet_filename)
+
+
+def article_schema() -> 'pa.Schema':
+    """Схема колоночного корпуса: строки, списки строк и список структур для сумм"""
+    strings = pa.list_(pa.string())
+    money = pa.list_(pa.struct([('amount', pa.string()), ('multiplier', pa.string()),
+                                ('currency', pa.string()), ('original', pa.string())]))
+    types = {'tags': strings, 'categories': strings, 'companies': strings, 'people': strings, 'money': money}
+    return pa.schema([(name, types.get(name, pa.string())) for name in Article.FIELDS])
+
+
+def articles_to_batch(articles: List[Article], schema: Optional['pa.Schema'] = None) -> 'pa.RecordBatch':
+    """Группа статей в колонки Arrow (schema - вся article_schema() или ее часть)"""
+    schema = schema or article_schema()
+    columns = {}
+    for name in schema.names:
+        if name == 'money':
+            columns[name] = [[money.to_dict() for money in article.money] for article in articles]
+        else:
+            columns[name] = [getattr(article, name) for article in articles]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+class ParquetSink:
+    """
+    Колоночный корпус статей в Parquet с записью группами строк
+
+    Статьи копятся в буфере и каждые row_group_size штук записываются отдельной группой
+    строк, так что память не зависит от размера корпуса. Текст хранится целиком, теги,
+    категории, компании и люди - списками строк, суммы - списком структур. Повтор URL
+    пропускается. Файл пишется во временный и появляется под своим именем только после
+    close(): до этого у Parquet нет оглавления, и читать его нельзя (надежная запись
+    во время обхода - поток JSON Lines).
+    """
+
+    def __init__(self, path: str = 'rb_articles.parquet', row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+                 compression: str = PARQUET_COMPRESSION):
+        """
+        Args:
+            path: Путь к файлу .parquet (перезаписывается при close)
+            row_group_size: Статей в группе строк
+            compression: Сжатие колонок Parquet ('zstd', 'snappy', 'gzip', 'none')
+        """
+        if pq is None:
+            raise ImportError("Для записи Parquet требуется библиотека pyarrow")
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = article_schema()
+        self.written = 0
+        self._buffer: List[Article] = []
+        self._seen = set()
+        self._tmp_path = f'{path}.tmp'
+        self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression=compression)
+
+    def write(self, article: Union[Article, Dict]):
+        article = Article.from_dict(article)
+        if article.url in self._seen:
+            return
+        self._seen.add(article.url)
+        self._buffer.append(article)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Запись буфера группой строк; возвращает количество записанных статей"""
+        if self._buffer:
+            self._writer.write_batch(self._batch(self._buffer), row_group_size=self.row_group_size)
+            self.written += len(self._buffer)
+            self._buffer = []
+        return self.written
+
+    def _batch(self, articles: List[Article]) -> 'pa.RecordBatch':
+        return articles_to_batch(articles, self.schema)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"Корпус Parquet {self.path}: {self.written} статей")
+
+    @staticmethod
+    def read(path: str, columns: Optional[List[str]] = None, batch_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[Article]:
+        """
+        Чтение статей из Parquet по группам строк
 
+        Args:
+            columns: Только эти поля (остальные поля записей будут пустыми)
+        """
+        if pq is None:
+            raise ImportError("Для чтения Parquet требуется библиотека pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            for row in batch.to_pylist():
+                yield Article.from_dict(row)
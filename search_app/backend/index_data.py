@@ -1,5 +1,5 @@
-import json
 import os
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
@@ -9,16 +9,25 @@ from elasticsearch.helpers import streaming_bulk
 from tqdm import tqdm
 from load_synonyms_for_index import get_synonyms_list
 
+ROOT_DIR = Path(__file__).parent.parent.parent
+# Записи статей и чтение результата скрапера берем из пакета scraper (без его HTTP зависимостей)
+sys.path.append(str(ROOT_DIR))
+from scraper.records import Article
+from scraper.storage import DataStorage
+
 ES_HOST = os.getenv("ELASTICSEARCH_HOST", "localhost")
 ES_PORT = int(os.getenv("ELASTICSEARCH_PORT", "9200"))
 ES_USE_SSL = os.getenv("ELASTICSEARCH_USE_SSL", "false").lower() == "true"
 ES_VERIFY_CERTS = os.getenv("ELASTICSEARCH_VERIFY_CERTS", "false").lower() == "true"
 ES_INDEX = "rb_articles"
-DATA_FILE = Path(__file__).parent.parent.parent / "rb_articles.json"
+# rb_articles.json или поток rb_articles.jsonl(.gz) - поток читается по одной статье
+DATA_FILE = Path(os.getenv("RB_ARTICLES_FILE", ROOT_DIR / "rb_articles.json"))
+# Индексировать только первую статью каждого кластера почти одинаковых (cluster_id) - индекс меньше
+SKIP_NEAR_DUPLICATES = os.getenv("RB_SKIP_NEAR_DUPLICATES", "false").lower() == "true"
 
 
-def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
-    processed = article.copy()
+def preprocess_article(article: Article) -> Dict[str, Any]:
+    processed = Article.from_dict(article).to_dict()
     
     if "date" in processed:
         date_str = processed.get("date", "")
@@ -51,6 +60,10 @@ def preprocess_article(article: Dict[str, Any]) -> Dict[str, Any]:
     if "scraped_at" not in processed or not processed["scraped_at"]:
         processed["scraped_at"] = datetime.now().isoformat()
     
+    # Корпус без кластеров (собран без near_duplicates): каждая статья - свой кластер
+    if not processed.get("cluster_id"):
+        processed["cluster_id"] = processed.get("url", "")
+    
     return processed
 
 
@@ -97,7 +110,8 @@ def create_index(es: Elasticsearch, index_name: str):
                         "original": {"type": "text"}
                     }
                 },
-                "scraped_at": {"type": "date"}
+                "scraped_at": {"type": "date"},
+                "cluster_id": {"type": "keyword"}
             }
         },
         "settings": {
@@ -142,12 +156,17 @@ def create_index(es: Elasticsearch, index_name: str):
 
 
 def index_articles(es: Elasticsearch, index_name: str, data_file: Path):
-    with open(data_file, 'r', encoding='utf-8') as f:
-        articles = json.load(f)
+    articles = DataStorage.load_articles(str(data_file))
+    
+    seen_clusters = set()
     
     def generate_actions():
         for article in articles:
             processed = preprocess_article(article)
+            if SKIP_NEAR_DUPLICATES:
+                if processed["cluster_id"] in seen_clusters:
+                    continue
+                seen_clusters.add(processed["cluster_id"])
             doc_id = processed.get("url", "").replace("/", "_").replace(":", "_")
             if not doc_id:
                 doc_id = f"article_{hash(str(processed))}"
@@ -160,7 +179,7 @@ def index_articles(es: Elasticsearch, index_name: str, data_file: Path):
     es_with_timeout = es.options(request_timeout=180)
     success_count = 0
     
-    with tqdm(total=len(articles), unit="статей", desc="Индексация") as pbar:
+    with tqdm(unit="статей", desc="Индексация") as pbar:
         for ok, response in streaming_bulk(
             es_with_timeout,
             generate_actions(),
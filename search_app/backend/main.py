@@ -25,6 +25,8 @@ ES_PORT = int(os.getenv("ELASTICSEARCH_PORT", "9200"))
 ES_USE_SSL = os.getenv("ELASTICSEARCH_USE_SSL", "false").lower() == "true"
 ES_VERIFY_CERTS = os.getenv("ELASTICSEARCH_VERIFY_CERTS", "false").lower() == "true"
 ES_INDEX = "rb_articles"
+# Сколько почти одинаковых статей показывать под результатом при сворачивании выдачи
+DUPLICATES_SHOWN = 3
 
 try:
     if ES_USE_SSL:
@@ -55,6 +57,7 @@ class SearchRequest(BaseModel):
     content_type: Optional[str] = None
     company: Optional[str] = None
     tag: Optional[str] = None
+    collapse_duplicates: bool = True
 
 
 class SearchResponse(BaseModel):
@@ -162,6 +165,19 @@ async def search(request: SearchRequest):
                     "term": {"tags.keyword": request.tag}
                 })
         
+        if request.collapse_duplicates:
+            # Почти одинаковые статьи (общий cluster_id) занимают в выдаче одно место;
+            # total - число кластеров, а не статей
+            query_body["collapse"] = {
+                "field": "cluster_id",
+                "inner_hits": {
+                    "name": "duplicates",
+                    "size": DUPLICATES_SHOWN + 1,
+                    "_source": ["url", "title", "content_type"]
+                }
+            }
+            query_body["aggs"] = {"clusters": {"cardinality": {"field": "cluster_id"}}}
+        
         response = es.search(index=ES_INDEX, body=query_body)
         
         # Форматируем результаты
@@ -183,10 +199,18 @@ async def search(request: SearchRequest):
                 "score": hit["_score"],
                 "highlight": hit.get("highlight", {})
             }
+            if request.collapse_duplicates:
+                inner = hit.get("inner_hits", {}).get("duplicates", {}).get("hits", {})
+                result["duplicates"] = [duplicate["_source"] for duplicate in inner.get("hits", [])
+                                        if duplicate["_id"] != hit["_id"]][:DUPLICATES_SHOWN]
             results.append(result)
         
+        total = response["hits"]["total"]["value"]
+        if request.collapse_duplicates:
+            total = response["aggregations"]["clusters"]["value"]
+        
         return SearchResponse(
-            total=response["hits"]["total"]["value"],
+            total=total,
             results=results,
             took=response["took"]
         )
@@ -204,7 +228,8 @@ async def search_get(
     from_: int = Query(0, ge=0, description="Смещение"),
     content_type: Optional[str] = Query(None, description="Фильтр по типу контента"),
     company: Optional[str] = Query(None, description="Фильтр по компании"),
-    tag: Optional[str] = Query(None, description="Фильтр по тегу")
+    tag: Optional[str] = Query(None, description="Фильтр по тегу"),
+    collapse_duplicates: bool = Query(True, description="Сворачивать почти одинаковые статьи (cluster_id)")
 ):
     """GET версия поиска"""
     request = SearchRequest(
@@ -213,7 +238,8 @@ async def search_get(
         from_=from_,
         content_type=content_type,
         company=company,
-        tag=tag
+        tag=tag,
+        collapse_duplicates=collapse_duplicates
     )
     return await search(request)
 
@@ -239,6 +265,9 @@ async def get_stats():
                 },
                 "top_tags": {
                     "terms": {"field": "tags.keyword", "size": 10}
+                },
+                "clusters": {
+                    "cardinality": {"field": "cluster_id"}
                 }
             }
         }
@@ -247,6 +276,7 @@ async def get_stats():
         
         return {
             "total_articles": stats["count"],
+            "clusters": aggs["aggregations"]["clusters"]["value"],
             "content_types": {bucket["key"]: bucket["doc_count"] 
                             for bucket in aggs["aggregations"]["content_types"]["buckets"]},
             "top_companies": [{"name": bucket["key"], "count": bucket["doc_count"]}
@@ -20,7 +20,8 @@ logger = logging.getLogger(__name__)
 
 def test_small_scrape():
     """Тест скрапера на большем количестве страниц"""
-    scraper = RBScraper(max_workers=5, delay=1.0)
+    # HTTP кэш: повторный запуск берет страницы с диска, а не скачивает их заново
+    scraper = RBScraper(max_workers=5, delay=1.0, http_cache_path='rb_http_cache.db')
     
     print("Тестирую скрапинг раздела 'news' на 10 страницах...")
     articles = scraper.scrape_section('news', max_pages=10)